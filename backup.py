@@ -0,0 +1,333 @@
+# Export and import of the bot's whole state
+#
+# A backup is a stream of JSON lines: a header, one line per recommendation,
+# queue entry, watchlist entry and timezone, then the event archive (the vote
+# history) as its title table followed by chunks of at most EVENT_BATCH
+# events, and a trailer with the number of records of each kind, so a
+# truncated file is caught. Files whose name ends in .gz are gzip-compressed.
+#
+# The history is never held in memory as a whole: an export reads the archive
+# one chunk at a time, and an import appends the events straight into a new
+# archive directory next to the live one. read_backup() validates the whole
+# file while staging it and leaves nothing behind when it fails; only after
+# it succeeded is the staged state swapped in, so an import is applied
+# completely or not at all.
+#
+#   python backup.py export backup.jsonl.gz
+#   python backup.py import backup.jsonl.gz     (with the bot stopped)
+
+import gzip
+import json
+import os
+import shutil
+import struct
+import time
+
+import event_archive
+
+FORMAT = "movie-night-backup"
+FORMAT_VERSION = 1
+EVENT_BATCH = 4096
+RECORD_TYPES = ("recommendation", "queue", "watchlist", "timezone", "event_titles", "events")
+
+class BackupError(Exception):
+    pass
+
+def open_backup(path, mode, compressed=None):
+    """Open a backup for text reading ("r") or writing ("w").
+
+    Writes are gzip-compressed if `compressed` is true (default: if the name
+    ends in .gz); reads recognise gzip by its magic number.
+    """
+    if mode == "r":
+        with open(path, "rb") as file:
+            compressed = file.read(2) == b"\x1f\x8b"
+    elif compressed is None:
+        compressed = path.endswith(".gz")
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+# Export
+
+def export_state(path, state, archive=None):
+    """Write `state` and the events of `archive` to a backup file.
+
+    Args:
+        path (str): The backup file; written aside and renamed once complete.
+        state (dict): "recommendations", "queue", "watchlist" and "timezones",
+            as stored in their JSON files.
+        archive (EventArchive): The vote history, or None.
+
+    Returns:
+        dict: The number of records written, by type.
+    """
+    counts = dict.fromkeys(RECORD_TYPES, 0)
+    counts["event_rows"] = 0
+    temporary = path + ".tmp"
+    with open_backup(temporary, "w", compressed=path.endswith(".gz")) as file:
+        def write(record):
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            if record["type"] in counts:
+                counts[record["type"]] += 1
+
+        write({"type": "header", "format": FORMAT, "version": FORMAT_VERSION, "created": int(time.time()),
+               "events": {str(event): name for event, name in event_archive.EVENT_NAMES.items()}})
+        for title, fields in state["recommendations"].items():
+            write({"type": "recommendation", "title": title, "entry": fields})
+        for kind in ("queue", "watchlist"):
+            for fields in state[kind]:
+                write({"type": kind, "entry": fields})
+        for user, zone in state["timezones"].items():
+            write({"type": "timezone", "user": user, "zone": zone})
+
+        if archive is not None:
+            titles, batches = archive.export_rows(EVENT_BATCH)
+            write({"type": "event_titles", "titles": titles})
+            for rows in batches:
+                write({"type": "events", "rows": [list(row) for row in rows]})
+                counts["event_rows"] += len(rows)
+
+        write({"type": "end", "counts": counts})
+    os.replace(temporary, path)
+    return counts
+
+# Import
+
+def _check(condition, line_number, message):
+    if not condition:
+        raise BackupError(f"Line {line_number}: {message}")
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Value ranges of the archive's row columns (event_archive.ROW)
+INT64 = range(-2**63, 2**63)
+UINT64 = range(2**64)
+
+def _check_entry(entry, line_number, with_votes):
+    _check(isinstance(entry, dict), line_number, "entry is not an object")
+    if not with_votes:
+        _check(isinstance(entry.get("title"), str) and entry["title"], line_number, "entry has no title")
+    for name in ("time", "watched_at", "recommended_at"):
+        _check(entry.get(name) is None or _is_int(entry[name]), line_number, f"{name} is not a unix time")
+    if with_votes:
+        voters = entry.get("voters", [])
+        vote_times = entry.get("vote_times", [None] * len(voters))
+        _check(_is_int(entry.get("votes", 0)), line_number, "votes is not a number")
+        _check(isinstance(voters, list) and all(_is_int(voter) for voter in voters), line_number,
+               "voters is not a list of member ids")
+        _check(isinstance(vote_times, list) and len(vote_times) == len(voters)
+               and all(at is None or _is_int(at) for at in vote_times), line_number,
+               "vote_times does not match voters")
+
+def read_backup(path, staging_dir=None, valid_timezone=None):
+    """Read and validate a backup, staging its events in a new archive directory.
+
+    Args:
+        path (str): The backup file.
+        staging_dir (str): Directory to stage the events in (must not exist),
+            or None to validate them only.
+        valid_timezone (callable): Returns whether a timezone name is valid.
+
+    Returns:
+        dict: "recommendations", "queue", "watchlist" and "timezones" in their
+        JSON file layout, "events" (the number staged) and "staging" (the
+        staged archive directory, or None if the backup has no history).
+
+    Raises:
+        BackupError: The file is not a complete, valid backup; nothing is
+            left staged.
+    """
+    if staging_dir is not None and os.path.exists(staging_dir):
+        raise BackupError(f"{staging_dir} already exists")
+    state = {"recommendations": {}, "queue": [], "watchlist": [], "timezones": {}}
+    counts = dict.fromkeys(RECORD_TYPES, 0)
+    counts["event_rows"] = 0
+    staging = None
+    titles = None
+    ended = False
+    try:
+        with open_backup(path, "r") as file:
+            for line_number, line in enumerate(file, start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise BackupError(f"Line {line_number}: not JSON")
+                _check(isinstance(record, dict) and isinstance(record.get("type"), str), line_number,
+                       "record has no type")
+                kind = record["type"]
+                _check(not ended, line_number, "data after the end of the backup")
+                if line_number == 1:
+                    _check(kind == "header" and record.get("format") == FORMAT, line_number,
+                           "not a movie night backup")
+                    _check(_is_int(record.get("version")) and record["version"] <= FORMAT_VERSION, line_number,
+                           f"backup format {record.get('version')} is newer than this bot understands")
+                    continue
+
+                if kind == "recommendation":
+                    title = record.get("title")
+                    _check(isinstance(title, str) and title, line_number, "recommendation has no title")
+                    _check(title not in state["recommendations"], line_number, f"{title} is recommended twice")
+                    _check_entry(record.get("entry"), line_number, with_votes=True)
+                    state["recommendations"][title] = record["entry"]
+                elif kind in ("queue", "watchlist"):
+                    _check_entry(record.get("entry"), line_number, with_votes=False)
+                    state[kind].append(record["entry"])
+                elif kind == "timezone":
+                    user, zone = record.get("user"), record.get("zone")
+                    _check(isinstance(user, str) and user.isdigit(), line_number, "timezone has no member id")
+                    _check(isinstance(zone, str) and (valid_timezone is None or valid_timezone(zone)), line_number,
+                           f"unknown timezone {zone!r}")
+                    state["timezones"][user] = zone
+                elif kind == "event_titles":
+                    _check(titles is None, line_number, "a second title table")
+                    titles = record.get("titles")
+                    _check(isinstance(titles, list) and all(isinstance(title, str) for title in titles), line_number,
+                           "title table is not a list of titles")
+                    if staging_dir is not None:
+                        staging = event_archive.EventArchive(staging_dir)
+                elif kind == "events":
+                    _check(titles is not None, line_number, "events before the title table")
+                    rows = record.get("rows")
+                    _check(isinstance(rows, list), line_number, "events without rows")
+                    for row in rows:
+                        _check(isinstance(row, list) and len(row) == 5 and all(_is_int(value) for value in row),
+                               line_number, "event row is not five numbers")
+                        timestamp, guild, user, movie, event = row
+                        _check(timestamp in INT64, line_number, "event time is out of range")
+                        _check(guild in UINT64 and user in UINT64, line_number,
+                               "event guild or member id is out of range")
+                        _check(0 <= movie < len(titles), line_number, "event refers to an unknown movie")
+                        _check(event in event_archive.EVENT_NAMES, line_number, f"unknown event type {event}")
+                        if staging is not None:
+                            staging.append(event, guild, user, titles[movie], timestamp=timestamp)
+                    if staging is not None:
+                        # One batch in memory at a time
+                        staging.flush()
+                    counts["event_rows"] += len(rows)
+                elif kind == "end":
+                    _check(record.get("counts") == counts, line_number,
+                           "record counts do not match the trailer; the backup is incomplete or was edited")
+                    ended = True
+                    continue
+                else:
+                    raise BackupError(f"Line {line_number}: unknown record type {kind!r}")
+                counts[kind] += 1
+        if not ended:
+            raise BackupError("The backup ends early (no trailer); it is incomplete")
+    except (OSError, EOFError, gzip.BadGzipFile, UnicodeDecodeError, struct.error,
+            event_archive.ArchiveError) as e:
+        discard_staging(staging_dir)
+        raise BackupError(f"Could not read the backup: {e}") from e
+    except BackupError:
+        discard_staging(staging_dir)
+        raise
+    if staging is not None:
+        # Even an empty history gets a directory, so it replaces the live one
+        os.makedirs(staging_dir, exist_ok=True)
+    state["events"] = counts["event_rows"]
+    state["staging"] = staging_dir if staging is not None else None
+    return state
+
+def discard_staging(staging_dir):
+    if staging_dir is not None:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def swap_in_archive(staging_dir, directory):
+    """Make the staged archive the live one; the old archive is kept aside and its path returned."""
+    kept = None
+    if os.path.exists(directory):
+        kept = f"{directory}.before-import-{int(time.time())}"
+        suffix = 1
+        while os.path.exists(kept):
+            kept = f"{directory}.before-import-{int(time.time())}-{suffix}"
+            suffix += 1
+        os.replace(directory, kept)
+    os.replace(staging_dir, directory)
+    return kept
+
+# Command line, for a stopped bot: the state files in the working directory
+
+STATE_FILES = {
+    "recommendations": ("recommendations.json", {}),
+    "queue": ("queue.json", []),
+    "watchlist": ("watchlist.json", []),
+    "timezones": ("timezones.json", {}),
+}
+STATS_FILE = "stats.json"
+VOTE_MESSAGES_FILE = "vote_messages.json"
+
+def read_state_file(filename, default):
+    import state_snapshot
+
+    data = state_snapshot.read_snapshot(filename)
+    if data is None:
+        try:
+            with open(filename, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = default
+    return data
+
+def read_state_files():
+    return {name: read_state_file(filename, default) for name, (filename, default) in STATE_FILES.items()}
+
+def write_state_file(filename, data):
+    import state_snapshot
+
+    with open(filename + ".tmp", "w") as file:
+        json.dump(data, file, indent=4)
+    os.replace(filename + ".tmp", filename)
+    # A snapshot left from before would be newer than the imported JSON
+    try:
+        os.remove(state_snapshot.snapshot_path(filename))
+    except FileNotFoundError:
+        pass
+
+def write_state_files(state):
+    from records import recommendations_from_json, movies_from_json
+    from stats import WatchStats
+
+    for name, (filename, _) in STATE_FILES.items():
+        write_state_file(filename, state[name])
+
+    # Derived from the lists, so redone for the imported ones the way !import does
+    stats = WatchStats.rebuild(recommendations_from_json(state["recommendations"]),
+                               movies_from_json(state["queue"]), movies_from_json(state["watchlist"]))
+    write_state_file(STATS_FILE, stats.to_dict())
+    vote_messages = read_state_file(VOTE_MESSAGES_FILE, {})
+    write_state_file(VOTE_MESSAGES_FILE, {message_id: title for message_id, title in vote_messages.items()
+                                          if title in state["recommendations"]})
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export or import the bot's state (run from the bot's directory).")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="Backup file (.jsonl, or .jsonl.gz for gzip)")
+    parser.add_argument("--events", default="events", help="Event archive directory (default: events)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.action == "export":
+        archive = event_archive.EventArchive(args.events) if os.path.isdir(args.events) else None
+        counts = export_state(args.path, read_state_files(), archive)
+        print(f"Exported {counts['recommendation']} recommendations, {counts['queue']} queued, "
+              f"{counts['watchlist']} watched, {counts['timezone']} timezones and {counts['event_rows']} events "
+              f"to {args.path} in {time.perf_counter() - started:.1f}s")
+        return
+
+    staging_dir = f"{args.events}.import-{int(time.time())}"
+    try:
+        state = read_backup(args.path, staging_dir)
+    except BackupError as e:
+        raise SystemExit(f"Import failed, nothing was changed: {e}")
+    kept = swap_in_archive(state["staging"], args.events) if state["staging"] else None
+    write_state_files(state)
+    print(f"Imported {len(state['recommendations'])} recommendations, {len(state['queue'])} queued, "
+          f"{len(state['watchlist'])} watched, {len(state['timezones'])} timezones and {state['events']} events "
+          f"in {time.perf_counter() - started:.1f}s" + (f"; the previous history is in {kept}" if kept else ""))
+
+if __name__ == "__main__":
+    main()
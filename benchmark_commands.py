@@ -0,0 +1,519 @@
+# Offline benchmark harness for the bot's command handlers
+#
+# Drives the real command coroutines from recommendation_bot.py with fake
+# Discord objects and a stubbed movie metadata source, against synthetic
+# stores of increasing size. Results are written as JSON so two revisions
+# can be compared:
+#
+#   python benchmark_commands.py --output before.json
+#   python benchmark_commands.py --output after.json --compare before.json
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, UTC
+
+import discord
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_COMMANDS = [
+    "recommend",
+    "vote_movie",
+    "add_to_queue",
+    "update_recommendation_channel",
+    "announce_scheduled_movies",
+]
+
+FAKE_KEYS = """\
+discord_bot_token: benchmark-token
+OMDB_api_token: benchmark-key
+GUILD_ID: 1
+"""
+
+# Fake Discord objects
+
+class FakeRole:
+    def __init__(self, name, role_id=1):
+        self.name = name
+        self.id = role_id
+
+class FakeUser:
+    def __init__(self, user_id, name, roles=()):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.roles = list(roles)
+        self.bot = False
+
+class FakeMessage:
+    def __init__(self, author, content=None, embed=None, channel=None, embeds=None):
+        self.id = id(self)
+        self.author = author
+        self.content = content
+        self.embeds = list(embeds) if embeds is not None else [embed] if embed is not None else []
+        self.channel = channel
+        self.guild = channel.guild if channel is not None else None
+        self.attachments = []
+        self.mentions = []
+        self.reactions = []
+        self.created_at = datetime.now(UTC)
+        self.edits = 0
+
+    async def edit(self, content=None, embed=None, embeds=None, **kwargs):
+        self.edits += 1
+        if embed is not None:
+            self.embeds = [embed]
+        if embeds is not None:
+            self.embeds = list(embeds)
+        if content is not None:
+            self.content = content
+        return self
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(emoji)
+
+    async def delete(self):
+        if self.channel is not None and self in self.channel.messages:
+            self.channel.messages.remove(self)
+
+class FakeChannel:
+    def __init__(self, channel_id, name, guild=None, bot_user=None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.bot_user = bot_user
+        self.messages = []
+
+    async def send(self, content=None, embed=None, view=None, embeds=None, **kwargs):
+        message = FakeMessage(self.bot_user, content=content, embed=embed, channel=self, embeds=embeds)
+        self.messages.append(message)
+        # Keep the channel from growing without bound over long runs
+        if len(self.messages) > 50:
+            del self.messages[:-50]
+        return message
+
+    async def fetch_message(self, message_id):
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        raise LookupError(message_id)
+
+    async def history(self, limit=100, **kwargs):
+        for message in reversed(self.messages[-limit:]):
+            yield message
+
+    def permissions_for(self, member):
+        if any(role.name == "recommend-admin" for role in getattr(member, "roles", [])):
+            return discord.Permissions.all()
+        return discord.Permissions.none()
+
+class FakeGuild:
+    def __init__(self, guild_id=1, bot_user=None):
+        self.id = guild_id
+        self.name = "benchmark"
+        self.roles = [FakeRole("recommend-admin", 10)]
+        self.text_channels = [
+            FakeChannel(100, "movie_night", self, bot_user),
+            FakeChannel(101, "movie-recommendations", self, bot_user),
+        ]
+        self.channels = self.text_channels
+
+    def get_channel(self, channel_id):
+        for channel in self.text_channels:
+            if channel.id == channel_id:
+                return channel
+        return None
+
+class FakeContext:
+    def __init__(self, author, channel, guild, command=None):
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.command = command
+        self.message = FakeMessage(author, channel=channel)
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        self.sent += 1
+        # Confirmation prompts resolve immediately so handlers never block
+        if view is not None and hasattr(view, "value"):
+            view.value = True
+            view.stop()
+        return await self.channel.send(content=content, embed=embed, view=view, **kwargs)
+
+# Synthetic state
+
+def fake_movie_details(movie_name):
+    """Stand-in for the IMDb + OMDb lookup that never touches the network."""
+    return {
+        "Title": movie_name,
+        "Year": "2001",
+        "Runtime": "120 min",
+        "Poster": "N/A",
+        "Plot": "Synthetic benchmark entry.",
+        "imdbID": "tt0000000",
+        "Response": "True",
+    }
+
+def synthetic_movie(i, recommender):
+    return {
+        "title": f"Synthetic Movie {i}",
+        "release_year": str(1950 + i % 75),
+        "runtime": f"{80 + i % 90} min",
+        "recommended_by": recommender,
+        "poster_url": "N/A",
+    }
+
+def build_store(size, scheduled):
+    """Build recommendations, queue and watchlist with `size` entries each."""
+    recommendations = {}
+    for i in range(size):
+        movie = synthetic_movie(i, f"member{i % 40}")
+        title = movie.pop("title")
+        voters = list(range(1000, 1000 + i % 7))
+        movie.update({"votes": len(voters), "voters": voters})
+        recommendations[title] = movie
+
+    # Only a handful of queue entries carry a time, like a real movie night queue
+    start = int(time.time()) + 3600
+    queue = []
+    for i in range(size):
+        movie = synthetic_movie(size + i, f"member{i % 40}")
+        if i < scheduled:
+            movie["time"] = start + i * 86400
+        queue.append(movie)
+
+    watchlist = [synthetic_movie(2 * size + i, f"member{i % 40}") for i in range(size)]
+    return recommendations, queue, watchlist
+
+def bytes_written():
+    """Bytes this process has passed to write(2) so far, or None if unknown."""
+    try:
+        with open("/proc/self/io", "r") as io_file:
+            for line in io_file:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Harness
+
+class Harness:
+    def __init__(self, workdir, scheduled):
+        self.workdir = workdir
+        self.scheduled = scheduled
+
+        with open(os.path.join(workdir, "keys.yaml"), "w") as keys_file:
+            keys_file.write(FAKE_KEYS)
+        aliases = os.path.join(REPO_DIR, "country_aliases.json")
+        if os.path.exists(aliases):
+            shutil.copy(aliases, workdir)
+
+        # The bot reads its config and state relative to the working directory
+        os.chdir(workdir)
+        if REPO_DIR not in sys.path:
+            sys.path.insert(0, REPO_DIR)
+        self.mod = importlib.import_module("recommendation_bot")
+        self.mod.fetch_movie_details = fake_movie_details
+
+        # Give the never-connected bot an identity so author checks work
+        bot_user = FakeUser(0, "Bidoof")
+        bot_user.bot = True
+        self.mod.bot._connection.user = bot_user
+        self.guild = FakeGuild(bot_user=bot_user)
+        self.mod.bot.get_guild = lambda guild_id: self.guild
+        self.command_channel = self.guild.text_channels[0]
+        self.board_channel = self.guild.text_channels[1]
+        self.admin = FakeUser(1, "bench-admin", [self.guild.roles[0]])
+
+    def ctx(self, author=None):
+        return FakeContext(author or self.admin, self.command_channel, self.guild)
+
+    async def load_store(self, size):
+        recommendations, queue, watchlist = build_store(size, self.scheduled)
+        self.queue_baseline = queue
+        self.mod.save_recommendations(self.mod.recommendations_from_json(recommendations))
+        self.mod.save_queue(self.mod.movies_from_json(queue))
+        self.mod.save_watchlist(self.mod.movies_from_json(watchlist))
+        # Inside the running loop the saves are only queued; reload once they landed
+        await self.mod.blocking_executor.flush()
+        self.mod.reload_lists()
+        self.board_channel.messages.clear()
+        self.mod.board_messages.clear()
+        self.mod.board_last_embeds.clear()
+
+    def restore_queue(self):
+        self.mod.queue[:] = self.mod.movies_from_json(self.queue_baseline)
+        self.mod.schedule.rebuild(self.mod.queue)
+        self.mod.save_queue(self.mod.queue)
+
+    def command(self, name):
+        """The handler behind a command, without its checks."""
+        return self.mod.bot.get_command(name).callback
+
+    def cases(self, size):
+        """Map command name -> (run(i), teardown(i), setup()) coroutine factories.
+
+        setup() runs once before a case is measured and returns a coroutine
+        factory that undoes it afterwards.
+        """
+        mod = self.mod
+
+        async def recommend(i):
+            await self.command("recommend")(self.ctx(), movie_name=f"Bench Pick {i}")
+
+        async def recommend_teardown(i):
+            if mod.recommendations.pop(f"Bench Pick {i}", None) is not None:
+                mod.save_recommendations(mod.recommendations)
+
+        async def recommend_setup():
+            # !recommend refuses new picks once there are 20, so leave room
+            # for one; otherwise larger sizes would only time the refusal
+            titles = list(mod.recommendations)
+            set_aside = {title: mod.recommendations.pop(title) for title in titles[19:]}
+
+            async def restore():
+                mod.recommendations.update(set_aside)
+                mod.save_recommendations(mod.recommendations)
+            return restore
+
+        async def vote_movie(i):
+            voter = FakeUser(500000 + i, f"voter{i}")
+            await self.command("vote")(self.ctx(voter), movie_name="Synthetic Movie 0")
+
+        async def add_to_queue(i):
+            await self.command("queue")(self.ctx(), movie_name=f"Synthetic Movie {i % size}")
+
+        async def add_to_queue_teardown(i):
+            title = f"Synthetic Movie {i % size}"
+            for index in range(len(mod.queue) - 1, -1, -1):
+                if mod.queue[index].title == title:
+                    movie = mod.queue.pop(index)
+                    movie.votes, movie.voters, movie.time = 0, [], None
+                    mod.recommendations[title] = movie
+                    mod.save_recommendations(mod.recommendations)
+                    mod.save_queue(mod.queue)
+                    break
+
+        sections = ["recommendations", "queue", "watchlist"]
+
+        async def update_recommendation_channel(i):
+            await mod.update_recommendation_channel(self.board_channel, section=sections[i % 3])
+
+        async def announce_scheduled_movies(i):
+            await mod.announce_scheduled_movies.coro()
+
+        async def announce_teardown(i):
+            self.restore_queue()
+
+        async def no_teardown(i):
+            pass
+
+        async def no_setup():
+            async def restore():
+                pass
+            return restore
+
+        return {
+            "recommend": (recommend, recommend_teardown, recommend_setup),
+            "vote_movie": (vote_movie, no_teardown, no_setup),
+            "add_to_queue": (add_to_queue, add_to_queue_teardown, no_setup),
+            "update_recommendation_channel": (update_recommendation_channel, no_teardown, no_setup),
+            "announce_scheduled_movies": (announce_scheduled_movies, announce_teardown, no_setup),
+        }
+
+    async def measure(self, run, teardown, iterations, warmup):
+        errors = {}
+
+        # Handler exceptions are counted rather than aborting the whole run,
+        # the same way discord.py logs them and keeps serving commands
+        async def guarded(i):
+            try:
+                await run(i)
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+
+        for i in range(warmup):
+            await guarded(-1 - i)
+            await self.mod.blocking_executor.flush()
+            await teardown(-1 - i)
+        errors.clear()
+
+        latencies = []
+        written = []
+        for i in range(iterations):
+            before = bytes_written()
+            gc.disable()
+            started = time.perf_counter_ns()
+            await guarded(i)
+            elapsed = time.perf_counter_ns() - started
+            gc.enable()
+            # State files are written on the executor after the handler returns
+            await self.mod.blocking_executor.flush()
+            after = bytes_written()
+            latencies.append(elapsed / 1e6)
+            if before is not None and after is not None:
+                written.append(after - before)
+            await teardown(i)
+
+        # Allocation pass runs separately so tracing overhead skews no timings
+        allocated = []
+        peaks = []
+        alloc_iterations = max(1, min(iterations, 5))
+        for i in range(alloc_iterations):
+            tracemalloc.start()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await guarded(iterations + i)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            allocated.append(current - baseline)
+            peaks.append(peak - baseline)
+            await self.mod.blocking_executor.flush()
+            await teardown(iterations + i)
+
+        return {
+            "iterations": iterations,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies),
+                "mean": statistics.fmean(latencies),
+            },
+            "retained_bytes": statistics.median(allocated),
+            "peak_alloc_bytes": max(peaks),
+            "disk_bytes_written": statistics.median(written) if written else None,
+            "errors": errors,
+        }
+
+    async def run(self, sizes, command_names, iterations, warmup):
+        await self.mod.load_command_extensions()
+        results = []
+        for size in sizes:
+            await self.load_store(size)
+            # What the handlers really ran against, so a report can be checked
+            loaded = {"recommendations": len(self.mod.recommendations), "queue": len(self.mod.queue),
+                      "watchlist": len(self.mod.watchlist)}
+            cases = self.cases(size)
+            # Fewer iterations for huge stores keeps a full run in minutes
+            size_iterations = max(3, min(iterations, iterations * 1000 // max(size, 1)))
+            for name in command_names:
+                run, teardown, setup = cases[name]
+                restore = await setup()
+                stats = await self.measure(run, teardown, size_iterations, warmup)
+                await restore()
+                stats.update({"command": name, "size": size, "loaded": loaded})
+                results.append(stats)
+                print(
+                    f"{name:32} size={size:<7} p50={stats['latency_ms']['p50']:.3f}ms "
+                    f"p99={stats['latency_ms']['p99']:.3f}ms "
+                    f"disk={stats['disk_bytes_written']} errors={sum(stats['errors'].values())}",
+                    file=sys.stderr
+                )
+            # Announcements drain the queue, so every size starts fresh
+            self.restore_queue()
+        # Finish queued writes while the working directory is still the scratch one
+        await self.mod.blocking_executor.flush()
+        return results
+
+def ran_at_size(result):
+    """Whether a result ran against a store with `size` entries in every list.
+
+    Reports written before load_store waited for its saves have no "loaded"
+    counts, and often ran against the store the previous size left behind.
+    """
+    loaded = result.get("loaded")
+    return loaded is not None and all(count == result["size"] for count in loaded.values())
+
+def compare(current, previous_path):
+    """Print p50 ratios between this run and a previous JSON report."""
+    with open(previous_path, "r") as file:
+        previous = json.load(file)
+    baseline = {(r["command"], r["size"]): r for r in previous["results"]}
+    print(f"Comparing against {previous.get('revision')}:", file=sys.stderr)
+    if any(not ran_at_size(r) for r in baseline.values()):
+        print("Rows marked * in the old report did not run against a store of their size; "
+              "regenerate it with this version before trusting those ratios.", file=sys.stderr)
+    for result in current["results"]:
+        old = baseline.get((result["command"], result["size"]))
+        if not old:
+            continue
+        old_p50 = old["latency_ms"]["p50"] or 0
+        new_p50 = result["latency_ms"]["p50"] or 0
+        ratio = new_p50 / old_p50 if old_p50 else float("inf")
+        flag = "" if ran_at_size(old) and ran_at_size(result) else " *"
+        print(
+            f"{result['command']:32} size={result['size']:<7} "
+            f"p50 {old_p50:.3f}ms -> {new_p50:.3f}ms (x{ratio:.2f}){flag}",
+            file=sys.stderr
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bot's command handlers offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Number of entries in each synthetic store")
+    parser.add_argument("--commands", nargs="+", default=DEFAULT_COMMANDS, choices=DEFAULT_COMMANDS)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--scheduled", type=int, default=25,
+                        help="How many queue entries get a scheduled time")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bot-bench-")
+    original_dir = os.getcwd()
+    try:
+        harness = Harness(workdir, args.scheduled)
+        results = asyncio.run(harness.run(args.sizes, args.commands, args.iterations, args.warmup))
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "created": int(time.time()),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
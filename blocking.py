@@ -0,0 +1,199 @@
+# Thread pool for blocking calls
+#
+# The IMDb search, the OMDb request, pycountry/pytz lookups and state file
+# writes all block. Running them on the event loop stalls the gateway
+# connection and every other command, so they go through a BlockingExecutor:
+# a bounded thread pool with a per-task timeout and a cap on how many tasks
+# may wait for a worker.
+#
+# When the awaiting command is cancelled or times out, a task that has not
+# started yet is dropped. A task that is already running cannot be
+# interrupted; it finishes on its thread and its result is discarded.
+#
+# State file writes are fire-and-forget: the caller hands over a copy of the
+# data (so later mutations cannot leak into it) and the write is queued. Writes to
+# the same file are coalesced, so a burst of saves only writes the newest
+# version. `flush()` waits for every queued write, e.g. before shutting down.
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+
+import metrics
+
+QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "bot_blocking_queue_depth", "Blocking tasks waiting for a worker thread."
+)
+RUNNING = metrics.REGISTRY.gauge(
+    "bot_blocking_tasks_running", "Blocking tasks currently running on a worker thread."
+)
+TASK_LATENCY = metrics.REGISTRY.histogram(
+    "bot_blocking_task_seconds", "Time from submitting a blocking task until its result.", ["task", "status"]
+)
+REJECTED = metrics.REGISTRY.counter(
+    "bot_blocking_rejected_total", "Blocking tasks refused because too many were already waiting.", ["task"]
+)
+
+class ExecutorBusy(Exception):
+    pass
+
+class BlockingTimeout(Exception):
+    pass
+
+class BlockingExecutor:
+    def __init__(self, max_workers=4, max_queued=32, timeout=20.0):
+        """
+        Args:
+            max_workers (int): Worker threads.
+            max_queued (int): Tasks allowed to wait for a worker before new ones are refused.
+            timeout (float): Default seconds to wait for a task's result.
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._writes = {}
+        self._write_locks = {}
+        self._pending_writes = set()
+
+    @property
+    def queued(self):
+        """Tasks waiting for a worker thread."""
+        return self._queued
+
+    def _started(self):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            QUEUE_DEPTH.set(self._queued)
+            RUNNING.set(self._running)
+
+    def _finished(self):
+        with self._lock:
+            self._running -= 1
+            RUNNING.set(self._running)
+
+    def _submit(self, task, func, args, kwargs):
+        with self._lock:
+            if self._queued >= self.max_queued:
+                REJECTED.labels(task).inc()
+                raise ExecutorBusy(f"Too many blocking tasks waiting ({self._queued}); refused {task}")
+            self._queued += 1
+            QUEUE_DEPTH.set(self._queued)
+
+        # Run in a copy of the caller's context so tracing spans nest under the command
+        context = contextvars.copy_context()
+
+        def call():
+            self._started()
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                self._finished()
+
+        future = self._pool.submit(call)
+        future.add_done_callback(self._dropped)
+        return future
+
+    def _dropped(self, future):
+        # A task cancelled before it started never reaches _started
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                QUEUE_DEPTH.set(self._queued)
+
+    async def run(self, func, *args, task=None, timeout=None, **kwargs):
+        """Run `func(*args, **kwargs)` on a worker thread and return its result.
+
+        Raises BlockingTimeout if it takes longer than `timeout` seconds and
+        ExecutorBusy if too many tasks are already waiting.
+        """
+        task = task or getattr(func, "__name__", "task")
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        future = self._submit(task, func, args, kwargs)
+        status = "error"
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            status = "ok"
+            return result
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise BlockingTimeout(f"{task} did not finish within {timeout:g}s")
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            # Drop the task if it never started (wait_for already cancelled the wrapper)
+            future.cancel()
+            TASK_LATENCY.labels(task, status).observe(time.perf_counter() - started)
+
+    def submit(self, func, *args, task=None):
+        """Run `func(*args)` in the background without waiting for it.
+
+        Returns False, instead of raising, when too many tasks are waiting.
+        """
+        task = task or getattr(func, "__name__", "task")
+        try:
+            future = self._submit(task, func, args, {})
+        except ExecutorBusy:
+            return False
+        future.add_done_callback(lambda done: self._background_done(task, done))
+        return True
+
+    def _background_done(self, task, future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error: Background task {task} failed: {future.exception()!r}")
+
+    def write(self, filename, write):
+        """Queue `write()` for `filename`, superseding any queued write to the same file.
+
+        Without a running event loop (command-line scripts, module import) the
+        write happens immediately. Inside the loop it only happens later, so
+        code that reads the file back must `await flush()` first.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            write()
+            return
+
+        with self._lock:
+            generation = self._writes.get(filename, (0, None))[0] + 1
+            self._writes[filename] = (generation, write)
+            file_lock = self._write_locks.setdefault(filename, threading.Lock())
+
+        def flush_file():
+            with file_lock:
+                with self._lock:
+                    latest, pending = self._writes.get(filename, (0, None))
+                    if latest != generation or pending is None:
+                        # A newer save is queued (or already written); it carries this data too
+                        return
+                    self._writes[filename] = (latest, None)
+                pending()
+
+        try:
+            future = self._submit(f"write {filename}", flush_file, (), {})
+        except ExecutorBusy:
+            # Never lose a save: write it in place rather than drop it
+            flush_file()
+            return
+        wrapped = asyncio.wrap_future(future, loop=loop)
+        self._pending_writes.add(wrapped)
+        wrapped.add_done_callback(self._write_done)
+
+    def _write_done(self, future):
+        self._pending_writes.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error: A state file write failed: {future.exception()!r}")
+
+    async def flush(self):
+        """Wait until every queued state file write has finished."""
+        while self._pending_writes:
+            await asyncio.gather(*list(self._pending_writes), return_exceptions=True)
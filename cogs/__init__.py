@@ -0,0 +1,22 @@
+# Command extensions
+#
+# Each module here holds one group of commands and is loaded as a discord.py
+# extension, so `!reload` can replace its code while the bot stays connected.
+# The commands keep no state of their own: the lists, board handles and
+# scheduler all live in the core module, which is never reloaded, so they
+# carry over a reload untouched. Extensions reach them through `core`, set
+# by the core module before the first extension is loaded.
+
+from discord.ext import commands
+
+core = None
+
+def add_commands(bot, namespace):
+    """Register every command defined in an extension module.
+
+    Unloading the extension removes them again (discord.py drops the
+    commands whose callbacks come from the unloaded module).
+    """
+    for value in list(namespace.values()):
+        if isinstance(value, commands.Command):
+            bot.add_command(value)
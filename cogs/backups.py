@@ -0,0 +1,93 @@
+# Backup commands (!export, !import)
+#
+# Loaded as an extension, so `!reload` can swap in new code without
+# restarting; the state it works on lives in the core module (`core`).
+
+import discord
+from discord.ext import commands
+import os
+import time
+import backup
+
+from cogs import add_commands, core
+
+def describe(recommendations, queued, watched, timezones, events):
+    return (f"{recommendations} recommendations, {queued} queued and {watched} watched movies, "
+            f"{timezones} timezones and {events} vote history events")
+
+@commands.command(name="export")
+@core.has_recommend_admin()
+async def export_state(ctx, compression: str = "gz"):
+    """Export recommendations, queue, watchlist, timezones and vote history as a backup file."""
+    if not await core.check_channel(ctx):
+        return
+
+    if compression not in ("gz", "jsonl"):
+        await ctx.send("Usage: `!export [gz|jsonl]` (gzip-compressed by default).")
+        return
+
+    await ctx.send("Exporting the bot's state; commands keep working in the meantime.")
+    path, counts = await core.export_backup(compress=compression == "gz")
+    summary = describe(counts["recommendation"], counts["queue"], counts["watchlist"], counts["timezone"],
+                       counts["event_rows"])
+
+    size = os.path.getsize(path)
+    limit = ctx.guild.filesize_limit if ctx.guild else 10 * 1024 * 1024
+    if size <= limit:
+        await ctx.send(f"Exported {summary}.", file=discord.File(path))
+    else:
+        await ctx.send(f"Exported {summary}. The file is too large to upload here ({size / 2**20:.1f} MiB); "
+                       f"it is on the bot's host as `{path}`.")
+
+@commands.command(name="import")
+@core.has_recommend_admin()
+async def import_state(ctx, filename: str = ""):
+    """Replace the bot's state with a backup, attached to the command or named from the exports directory."""
+    if not await core.check_channel(ctx):
+        return
+
+    if ctx.message.attachments:
+        attachment = ctx.message.attachments[0]
+        os.makedirs(core.EXPORT_DIR, exist_ok=True)
+        path = os.path.join(core.EXPORT_DIR, f"upload-{int(time.time())}-{os.path.basename(attachment.filename)}")
+        await attachment.save(path)
+    elif filename:
+        # Only files in the exports directory can be named
+        path = os.path.join(core.EXPORT_DIR, os.path.basename(filename))
+        if not os.path.isfile(path):
+            await ctx.send(f"There is no backup called `{os.path.basename(filename)}` in `{core.EXPORT_DIR}`.")
+            return
+    else:
+        await ctx.send("Attach a backup to `!import`, or name one from the exports directory: `!import <file>`.")
+        return
+
+    await ctx.send("Checking the backup; commands keep working in the meantime.")
+    try:
+        state = await core.stage_import(path)
+    except backup.BackupError as e:
+        await ctx.send(f"That backup cannot be imported, nothing was changed: {e}")
+        return
+    summary = describe(len(state["recommendations"]), len(state["queue"]), len(state["watchlist"]),
+                       len(state["timezones"]), state["events"])
+
+    view = core.ConfirmationView(author=ctx.author, action="import the backup")
+    await ctx.send(
+        f"The backup holds {summary}. Importing it replaces the current recommendations, queue, watched list, "
+        f"timezones" + (" and vote history" if state["staging"] else "") + ". Continue?",
+        view=view,
+    )
+    await view.wait()
+    if view.value is not True:
+        await core.blocking_executor.run(backup.discard_staging, state["staging"])
+        await ctx.send("Import cancelled, nothing was changed.")
+        return
+
+    kept = await core.apply_import(state)
+
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        await core.update_recommendation_channel(channel)
+    await ctx.send(f"Imported {summary}." + (f" The previous vote history is kept in `{kept}`." if kept else ""))
+
+async def setup(bot):
+    add_commands(bot, globals())
@@ -0,0 +1,105 @@
+# Display commands (!dr, !dq, !dw, !stats)
+
+import discord
+from discord.ext import commands
+import rendering
+from pagination import FilterError, MovieFilter, PaginatorView, QueuePages, WatchlistPages
+
+from cogs import add_commands, core
+
+@commands.command(name="displayrec", aliases=['dr', 'display'])
+async def display_recommendations(ctx):
+    # Ensure recommendations exist
+    if not core.recommendations:
+        await ctx.send("No recommendations available at the moment.")
+        return
+
+    # Create an embed for the top 5 recommendations, in the order set with !ranking
+    embed = discord.Embed(title="Top 5 Movie Recommendations", color=discord.Color.blue())
+    for field in rendering.top_recommendation_fields(core.recommendations,
+                                                     ranked=core.ranked_recommendations(ctx.guild)):
+        embed.add_field(**field)
+
+    # Send the embed
+    await ctx.send(embed=embed)
+
+@commands.command(name="displayqueue", aliases=['dq', 'displayq'])
+async def display_queue(ctx, *, filters: str = ""):
+    """Browse the queue a page at a time, optionally filtered by `by:` and `year:`."""
+    if not core.queue:
+        await ctx.send("The queue is empty.")
+        return
+
+    try:
+        movie_filter = MovieFilter.parse(filters)
+    except FilterError as e:
+        await ctx.send(str(e))
+        return
+
+    view = PaginatorView(ctx.author, QueuePages(core.queue, movie_filter), "Movie Queue",
+                         discord.Color.green(), "No queued movies match these filters.")
+    await ctx.send(embed=view.render(), view=view)
+
+@commands.command(name="displaywatchlist", aliases=['dw', 'displayw'])
+async def display_watchlist(ctx, *, filters: str = ""):
+    """Browse the watchlist newest first, optionally filtered by `by:`, `year:`, `after:` and `before:`."""
+    if not core.watchlist:
+        await ctx.send("The watchlist is empty.")
+        return
+
+    try:
+        movie_filter = MovieFilter.parse(filters)
+    except FilterError as e:
+        await ctx.send(str(e))
+        return
+
+    view = PaginatorView(ctx.author, WatchlistPages(core.watchlist, movie_filter), "Movies Watched List",
+                         discord.Color.purple(), "No watched movies match these filters.")
+    await ctx.send(embed=view.render(), view=view)
+
+@commands.command(name="stats")
+async def show_stats(ctx):
+    """Watch history statistics, from the incrementally kept aggregates."""
+    if not await core.check_channel(ctx):
+        return
+
+    stats = core.watch_stats
+    embed = discord.Embed(title="Movie Night Stats", color=discord.Color.gold())
+
+    average = stats.average_runtime
+    hours, minutes = divmod(stats.runtime_total, 60)
+    embed.add_field(
+        name="Watched",
+        value=(
+            f"Movies: {stats.watched}\n"
+            f"Total runtime: {hours}h {minutes}m\n"
+            f"Average runtime: {f'{average:.0f} min' if average is not None else 'N/A'}"
+        ),
+        inline=False
+    )
+
+    rate = stats.acceptance_rate
+    embed.add_field(
+        name="Acceptance rate",
+        value=(f"{rate:.0%} of {sum(stats.recommended.values())} recommendations were watched"
+               if rate is not None else "No recommendations yet"),
+        inline=False
+    )
+
+    recommenders = "\n".join(
+        f"{member}: {count} recommended, {stats.accepted[member]} watched ({stats.member_acceptance(member):.0%})"
+        for member, count in stats.recommended.most_common(5)
+    )
+    embed.add_field(name="Top recommenders", value=recommenders or "None yet", inline=False)
+
+    voted = "\n".join(f"{member}: {votes} votes" for member, votes in stats.votes_received.most_common(5) if votes)
+    embed.add_field(name="Most voted members", value=voted or "No votes yet", inline=False)
+
+    months = "\n".join(f"{month}: {count}" for month, count in sorted(stats.by_month.items())[-6:])
+    embed.add_field(name="Watched per month", value=months or "No dated entries yet", inline=False)
+    embed.set_footer(text="Counts everything that ever passed through the bot; deleted and cleared entries stay counted.")
+
+    await ctx.send(embed=embed)
+
+async def setup(bot):
+    add_commands(bot, globals())
@@ -0,0 +1,106 @@
+# The user and admin manuals (!h, !ha)
+
+from discord.ext import commands
+
+from cogs import add_commands, core
+
+@commands.command(name='manual_admin', aliases=['ha', 'commands_admin'])
+@core.has_recommend_admin()
+async def get_admin_manual(ctx):
+
+    if not await core.check_channel(ctx):
+        return
+
+    manual_string = """
+```
+ADMIN ONLY COMMANDS
+-------------------------
+Timezone Commands
+-------------------------
+country_code_timezones | cctz <Country Code>   -> Get timezone for country code
+country_name_timezones | cntz <Country Name>   -> Get timezone for country by name
+settime | time <Timezone>                      -> Set Timezone of recommend bot admin
+addtime | at "<Movie Name>" "DD-MM-YYYY HH:MM" -> Schedule a movie
+freeslot | fs <hours> ["DD-MM-YYYY HH:MM"]    -> Find the next free slot in your timezone
+
+-------------------------
+Recommendation Commands
+-------------------------
+delete | del <Movie Name>                     -> Remove movie from recommendation
+ballot                                        -> Post vote messages for older recommendations
+ranking | rank [votes|hot|decay]              -> Show or set how recommendations are ranked
+clearrec                                      -> Clear Recommendations
+
+-------------------------
+Queue Commands
+-------------------------
+queue | q <Movie Name>                        -> Move movie to Queue
+announce | am                                 -> Announce movie to watch
+deleteq | delq <Movie Name>                   -> Remove movie from Queue
+clearq                                        -> Clear Queue
+
+-------------------------
+Watched List Commands
+-------------------------
+watched | w <Movie Name>                      -> Move movie Watched List
+deletew | delw <Movie Name>                   -> Remove movie from Watched List
+clearw                                        -> Clear Watched list
+
+-------------------------
+Maintenance Commands
+-------------------------
+shutdown | exit | quit | close                -> Shutdown bot
+reload | rl [extension]                       -> Reload command code without restarting
+stalls                                        -> Show commands that blocked the bot
+export [gz|jsonl]                             -> Export all lists, timezones and vote history
+import [file]                                 -> Replace the bot's state with an attached backup
+manual_admin | commands_admin | ha            -> Get admin manual
+manual | commands | h                         -> Get manual
+```
+    """
+
+    # Try sending the message to the user's DM
+    await ctx.send(manual_string)
+
+@commands.command(name='manual', aliases=['h', 'commands'])
+async def get_manual(ctx):
+
+    if not await core.check_channel(ctx):
+        return
+
+    manual_string = """
+```
+-------------------------
+Recommendation Commands
+-------------------------
+recommend | r <Movie Name>        -> Recommend a movie for Movie Night
+vote <Movie Name>                 -> Vote for a movie in the recommendation list
+                                     (or react with 👍 on its recommendation message)
+delete | del <Movie Name>         -> Remove movie from recommendation
+
+-------------------------
+Display Commands
+-------------------------
+displayrec | dr | display         -> Display Top 5 Recommendations (as ranked by !ranking)
+displayqueue | dq | displayq [filters]      -> Browse Queued Movies
+displaywatchlist | dw | displayw [filters]  -> Browse Watched Movies, newest first
+    filters: by:<name> year:<YYYY or YYYY-YYYY>
+             after:<DD-MM-YYYY> before:<DD-MM-YYYY> (watched date)
+next_movie | upcoming | nm        -> Display upcoming movie in queue
+schedule | sched [weeks]          -> Display the schedule week by week (default 4)
+freeslot | fs <hours> ["DD-MM-YYYY HH:MM"] -> Find the next free slot of that length
+stats                             -> Display watch history statistics
+
+-------------------------
+Maintenance Commands
+-------------------------
+manual | commands | h             -> Get manual
+manual_admin | commands_admin| ha -> Get Admin Only commands
+```
+    """
+
+    # Try sending the message to the user's DM
+    await ctx.send(manual_string)
+
+async def setup(bot):
+    add_commands(bot, globals())
@@ -0,0 +1,112 @@
+# Queue commands (!q, !am, !delq, !clearq)
+
+import discord
+from discord.ext import commands
+from records import Movie
+import event_archive
+import tracing
+
+from cogs import add_commands, core
+
+@commands.command(name="queue", aliases=['q'])
+@core.has_recommend_admin()
+async def add_to_queue(ctx, *, movie_name):
+
+    if not await core.check_channel(ctx):
+        return
+
+    if movie_name not in core.recommendations:
+        await ctx.send(f"The movie `{movie_name}` is not in the recommendations list.")
+        return
+
+    # Add the movie to the queue, inheriting details from recommendations
+    with tracing.span("state.mutation", action="queue"):
+        movie = core.recommendations.pop(movie_name)
+        core.queue.append(Movie(
+            title=movie_name,
+            year=movie.year,
+            runtime_minutes=movie.runtime_minutes,
+            recommended_by=movie.recommended_by,
+            poster_url=movie.poster_url
+        ))
+    core.save_recommendations(core.recommendations)
+    core.save_queue(core.queue)
+
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        await core.update_recommendation_channel(channel, section='queue')
+
+    await ctx.send(f"The movie `{movie_name}` has been added to the queue.")
+
+@commands.command(name="announce", aliases=['am'])
+@core.has_recommend_admin()
+async def announce_playing_movie(ctx, *, movie_name: str):
+    # Check if the movie is in the queue
+    if not await core.check_channel(ctx):
+        return
+
+    movie_to_watch = next((movie for movie in core.queue if movie.title == movie_name), None)
+    
+    if not movie_to_watch:
+        await ctx.send(f"The movie `{movie_name}` is not in the queue!")
+        return
+
+    # Create the announcement embed
+    embed = discord.Embed(
+        title="🎥 Now Playing 🎥",
+        description=f"**{movie_to_watch.title}** (Released: {movie_to_watch.release_year})\n"
+                    f"Runtime: {movie_to_watch.runtime}\n"
+                    f"Recommended by: {movie_to_watch.recommended_by}",
+        color=discord.Color.blue()
+    )
+    embed.set_image(url=movie_to_watch.poster_url)
+    await ctx.send(embed=embed)
+
+
+@commands.command(name="deleteq", aliases=['delq'])
+@core.has_recommend_admin()
+async def remove_from_queue(ctx, *, movie_name: str):
+
+    # Check if the movie is in the queue
+    if not await core.check_channel(ctx):
+        return
+
+    movie_to_remove = next((movie for movie in core.queue if movie.title == movie_name), None)
+
+    if movie_to_remove:
+        # Remove the movie from the queue
+        core.queue.remove(movie_to_remove)
+        core.schedule.remove(movie_to_remove)
+        core.archive_events(ctx, event_archive.DEQUEUED, [movie_to_remove.title])
+        core.save_queue(core.queue)
+
+        # Update the recommendation channel with the latest data
+        channel = core.board_channel(ctx.guild)
+        if channel:
+            await core.update_recommendation_channel(channel, section="queue")
+
+        await ctx.send(f"The movie `{movie_name}` has been removed from the queue.")
+    else:
+        await ctx.send(f"The movie `{movie_name}` is not in the queue.")
+
+@commands.command(name="clearq")
+@core.has_recommend_admin()
+async def clear_queue(ctx):
+
+    if not await core.check_channel(ctx):
+        return
+
+    core.archive_events(ctx, event_archive.DEQUEUED, [movie.title for movie in core.queue])
+    core.queue.clear()
+    core.schedule.clear()
+    core.save_queue(core.queue)
+
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        # Update only the queue section
+        await core.update_recommendation_channel(channel, section="queue")
+
+    await ctx.send("The queue has been cleared.")
+
+async def setup(bot):
+    add_commands(bot, globals())
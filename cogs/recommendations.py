@@ -0,0 +1,230 @@
+# Recommendation commands (!r, !vote, !ballot, !ranking, !del, !clearrec)
+
+import discord
+from discord.ext import commands
+import time
+from records import Movie
+import ranking
+import rendering
+import event_archive
+import tracing
+
+from cogs import add_commands, core
+
+@commands.command(name="recommend", aliases=['r'])
+async def recommend(ctx, *, movie_name: str):
+    
+    if not await core.check_channel(ctx):
+        return
+
+    if len(core.recommendations) >= 20:
+        await ctx.send("The recommendations list is full (20 movies). Please wait until some movies are removed before recommending more.")
+        return
+
+    movie_data = await core.blocking_executor.run(
+        core.fetch_movie_details, movie_name, task="metadata", timeout=float(core.METADATA_BUDGET)
+    )
+    
+    movie_in_queue = next((movie for movie in core.queue if movie.title == movie_data.get('Title', 'N/A')), None)
+
+    if movie_in_queue:
+        if movie_in_queue.time:
+            await ctx.send(f"The movie `{movie_name}` is already in queue scheduled at <t:{movie_in_queue.time}:f>")
+        else:
+            await ctx.send(f"The movie `{movie_name}` is already in queue.")
+        return
+
+    if movie_data.get('Title', 'N/A') in core.watched_titles:
+        await ctx.send(f"{movie_name} has already been watched. Ask admins for rewatching.")
+        return
+    
+    if movie_data.get("Response") == "True":
+        if movie_data.get('Title', 'N/A') not in core.recommendations:
+            # Fetch necessary details
+            movie = Movie.from_omdb(movie_data, ctx.author.name)
+            movie.recommended_at = int(time.time())
+            movie_title = movie.title
+            plot = movie_data.get("Plot", "No plot information available.")
+            imdb_id = movie_data.get("imdbID", None)
+
+            imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "No IMDb link available"
+
+            
+            # Store the movie details along with votes and recommender
+            with tracing.span("state.mutation", action="recommend"):
+                core.recommendations[movie_title] = movie
+                core.watch_stats.record_recommendation(movie)
+            core.archive_events(ctx, event_archive.RECOMMENDED, [movie_title])
+
+            core.save_recommendations(core.recommendations)
+            core.save_stats()
+
+            # Update the recommendation channel with the new movie
+            channel = core.board_channel(ctx.guild)
+            if channel:
+                await core.update_recommendation_channel(channel, section='recommendations')
+            embed = discord.Embed(
+                title=movie_title,
+                description=plot,
+                color=discord.Color.blue(),
+                url=imdb_url
+            )
+            embed.add_field(name="Runtime", value=movie.runtime, inline=True)
+            embed.add_field(name="Release Year", value=movie.release_year, inline=True)
+            embed.add_field(name="Recommended By", value=ctx.author.name, inline=True)
+            embed.set_thumbnail(url=movie.poster_url)
+
+            await ctx.send(f"'{movie_name}' has been added to the recommendations!")
+            await core.post_vote_message(ctx, embed, movie_title)
+        else:
+            # Movie already recommended, handle voting
+            movie = core.recommendations[movie_data.get('Title', 'N/A')]
+            
+            if ctx.author.id in movie.voters:
+                await ctx.send(f"You've already voted for '{movie_name}'. You can only vote once.")
+                return
+            
+            # Check if the user is the recommender
+            if ctx.author.name == movie.recommended_by:
+                await ctx.send(f"You cannot vote for your own recommendation, '{movie_name}'.")
+                return
+
+            # Add the user to the voters list and increment the vote
+            movie.add_vote(ctx.author.id, int(time.time()))
+            core.watch_stats.record_vote(movie)
+            core.archive_events(ctx, event_archive.VOTED, [movie.title])
+            core.save_recommendations(core.recommendations)
+            core.save_stats()
+
+            await ctx.send(f"You've voted for '{movie_name}'. It now has {movie.votes} votes.")
+    else:
+        await ctx.send("Sorry, I couldn't find that movie.")
+
+@commands.command(name="vote")
+async def vote_movie(ctx, *, movie_name: str):
+
+    if not await core.check_channel(ctx):
+        return
+
+    if movie_name in core.recommendations:
+        movie = core.recommendations[movie_name]
+         
+        if ctx.author.id in movie.voters:
+            await ctx.send(f"You've already voted for '{movie_name}'. You can only vote once.")
+            return
+        
+        # Check if the user is the recommender
+        if ctx.author.name == movie.recommended_by:
+            await ctx.send(f"You cannot vote for your own recommendation, '{movie_name}'.")
+            return
+        
+        # Add the user to the voters list and increment the vote
+        with tracing.span("state.mutation", action="vote"):
+            movie.add_vote(ctx.author.id, int(time.time()))
+            core.watch_stats.record_vote(movie)
+        core.archive_events(ctx, event_archive.VOTED, [movie_name])
+        core.save_recommendations(core.recommendations)
+        core.save_stats()
+        
+        # Update the recommendation channel with the new movie
+        channel = core.board_channel(ctx.guild)
+        if channel:
+            await core.update_recommendation_channel(channel, section='recommendations')
+            
+        await ctx.send(f"Thank you! You've voted for '{movie_name}'. It now has {movie.votes} votes.")
+    else:
+        await ctx.send(f"The movie `{movie_name}` is not in the recommended list.")
+
+@commands.command(name="ballot")
+@core.has_recommend_admin()
+async def post_ballot(ctx):
+    """Post a vote message for every recommendation that does not have one yet."""
+    if not await core.check_channel(ctx):
+        return
+
+    with_message = set(core.vote_messages.values())
+    missing = [movie for movie in rendering.by_votes(core.recommendations) if movie.title not in with_message]
+    if not missing:
+        await ctx.send("Every recommendation already has a vote message.")
+        return
+
+    for movie in missing:
+        embed = discord.Embed(
+            title=movie.title,
+            description=f"Released: {movie.release_year} · Runtime: {movie.runtime}",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Recommended By", value=movie.recommended_by, inline=True)
+        if movie.poster_url and movie.poster_url != "N/A":
+            embed.set_thumbnail(url=movie.poster_url)
+        await core.post_vote_message(ctx, embed, movie.title)
+
+@commands.command(name="ranking", aliases=["rank"])
+@core.has_recommend_admin()
+async def set_ranking(ctx, mode: str = ""):
+    """Show or set how this guild's board and !dr rank the recommendations."""
+    if not await core.check_channel(ctx):
+        return
+
+    modes = ", ".join(f"`{name}` ({description})" for name, description in ranking.MODE_DESCRIPTIONS.items())
+    if not mode:
+        current = core.ranking_mode(ctx.guild)
+        await ctx.send(f"Recommendations are ranked by `{current}`. Available: {modes}")
+        return
+    mode = mode.lower()
+    if mode not in ranking.MODES:
+        await ctx.send(f"Unknown ranking `{mode}`. Available: {modes}")
+        return
+
+    core.ranking_modes[ctx.guild.id] = mode
+    core.save_ranking_modes()
+
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        await core.update_recommendation_channel(channel, section="recommendations")
+    await ctx.send(f"Recommendations are now ranked by {ranking.MODE_DESCRIPTIONS[mode]} (`{mode}`).")
+
+# Remove a movie recommendation (User can remove only their own recommendations)
+@commands.command(name="delete", aliases=['del'])
+async def remove_recommendation(ctx, *, movie_name: str):
+    if not await core.check_channel(ctx):
+        return
+
+    if movie_name in core.recommendations:
+        # Check if the user who is requesting removal is the one who recommended it or has admin privileges
+        if core.recommendations[movie_name].recommended_by == ctx.author.name or core.guild_directory.is_admin(ctx.guild, ctx.author):
+            del core.recommendations[movie_name]
+            core.archive_events(ctx, event_archive.REMOVED, [movie_name])
+            core.save_recommendations(core.recommendations)
+
+            # Update the recommendation channel
+            channel = core.board_channel(ctx.guild)
+            if channel:
+                await core.update_recommendation_channel(channel, section='recommendations')
+
+            await ctx.send(f"'{movie_name}' has been removed from the recommendations.")
+        else:
+            await ctx.send(f"You cannot remove '{movie_name}' because you did not recommend it.")
+    else:
+        await ctx.send(f"'{movie_name}' is not in the recommendations list.")
+
+@commands.command(name="clearrec")
+@core.has_recommend_admin()
+async def clear_recommendation(ctx):
+
+    if not await core.check_channel(ctx):
+        return
+    
+    core.archive_events(ctx, event_archive.CLEARED, list(core.recommendations))
+    core.recommendations.clear()
+    core.save_recommendations(core.recommendations)
+        
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        # Update only the recommendations section
+        await core.update_recommendation_channel(channel, section="recommendations")
+
+    await ctx.send("All recommendation are cleared.")
+
+async def setup(bot):
+    add_commands(bot, globals())
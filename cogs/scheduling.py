@@ -0,0 +1,236 @@
+# Timezone and scheduling commands (!cctz, !cntz, !settime, !addtime, !nm, !freeslot, !schedule)
+
+import discord
+from discord.ext import commands
+from datetime import datetime, timedelta
+import time
+import rendering
+from embed_layout import group_messages, number_parts, pack_blocks
+
+from cogs import add_commands, core
+
+@commands.command(name="country_code_timezones", aliases=["cctz", "timezones_by_country_code"])
+async def countrycode_timezones(ctx, country_code: str):
+    """
+    Get a list of timezones for a specific country.
+    """
+    if not await core.check_channel(ctx):
+        return
+
+    timezones = await core.blocking_executor.run(core.get_timezones_by_country, country_code)
+    
+    if isinstance(timezones, list):
+        timezone_list = "\n".join(timezones)
+        await ctx.send(f"Timezones for `{country_code.upper()}`:\n```\n{timezone_list}\n```")
+    else:
+        await ctx.send(timezones)
+
+@commands.command(name="country_name_timezones", aliases=["cntz", "timezones_by_country_name"])
+async def countryname_timezones(ctx, *, country_name: str):
+    """
+    Get a list of timezones for a specific country by name.
+    """
+    if not await core.check_channel(ctx):
+        return
+
+    timezones = await core.blocking_executor.run(core.get_timezones_by_country_name, country_name)
+    
+    if isinstance(timezones, list):
+        timezone_list = "\n".join(timezones)
+        await ctx.send(f"Timezones for `{country_name.title()}`:\n```\n{timezone_list}\n```")
+    else:
+        await ctx.send(timezones)
+
+# Command to set timezone
+@commands.command(name="settime", aliases=['time'])
+@core.has_recommend_admin()
+async def set_timezone(ctx, timezone: str):
+    """Set the admin's timezone."""
+    if not await core.check_channel(ctx):
+        return
+
+    # Validate the timezone
+    if await core.blocking_executor.run(core.get_timezone, timezone) is None:
+        await ctx.send(f"Invalid timezone: `{timezone}`. Please use a valid timezone.")
+        return
+
+    # Load existing timezones
+    timezones = await core.blocking_executor.run(core.load_timezones)
+
+    # Update the timezone for the admin
+    timezones[str(ctx.author.id)] = timezone
+
+    # Save the updated timezones
+    core.save_timezones(timezones)
+
+    await ctx.send(f"Your timezone has been set to `{timezone}`.")
+
+async def author_timezone(ctx):
+    """The timezone set with !settime by the command's author (UTC if none), or None if it is invalid."""
+    timezones = await core.blocking_executor.run(core.load_timezones)
+    return await core.blocking_executor.run(core.get_timezone, timezones.get(str(ctx.author.id), "UTC"))
+
+def describe_overlaps(overlaps):
+    return ", ".join(f"`{movie.title}` (<t:{start}:f> – <t:{end}:t>)" for start, end, movie in reversed(overlaps))
+
+# Command to add time to a movie
+@commands.command(name="addtime", aliases=['at'])
+@core.has_recommend_admin()
+async def add_time(ctx, movie_name: str, local_time: str):
+    """Add time to a movie using the admin's timezone."""
+    if not await core.check_channel(ctx):
+        return
+    
+    try:
+        # Load the admin's timezone
+        user_timezone = await author_timezone(ctx)
+        if user_timezone is None:
+            await ctx.send("There was an error with your timezone settings. Please reconfigure using `!set_timezone`.")
+            return
+
+        # Parse the local time and localize it
+        naive_time = datetime.strptime(local_time, "%d-%m-%Y %H:%M")
+        aware_time = user_timezone.localize(naive_time)
+        unix_time = int(aware_time.timestamp())
+
+        for movie in core.queue:
+            if movie.title.lower() == movie_name.lower():
+                break
+        else:
+            await ctx.send(f"Movie `{movie_name}` not found in the queue.")
+            return
+
+        # Check the screening against the rest of the schedule
+        start, end = core.schedule.interval(movie, unix_time)
+        overlaps = core.schedule.conflicts(start, end, ignore=movie)
+        if overlaps and core.SCHEDULE_OVERLAPS == "reject":
+            await ctx.send(f"`{movie.title}` would overlap {describe_overlaps(overlaps)}. "
+                           f"Use `!freeslot` to find a free time.")
+            return
+
+        movie.time = unix_time
+        core.schedule.add(movie)
+        core.save_queue(core.queue)
+
+        # Update the recommendation channel with the latest data
+        channel = core.board_channel(ctx.guild)
+        if channel:
+            await core.update_recommendation_channel(channel, section="queue")
+
+        # Notify the user
+        embed = discord.Embed(
+            title=f"🎥 Time for `{movie.title}` set to <t:{unix_time}:F> 🎥 in <t:{unix_time}:R>",
+            description=f"**{movie.title}** (Released: {movie.release_year})\n"
+                        f"Runtime: {movie.runtime}\n"
+                        f"Recommended by: {movie.recommended_by}",
+            color=discord.Color.blue()
+        )
+        if overlaps:
+            embed.add_field(name="⚠️ Overlaps", value=describe_overlaps(overlaps)[:1024], inline=False)
+        await ctx.send(embed=embed)
+
+    except ValueError:
+        await ctx.send("Invalid time format. Please use `DD-MM-YYYY HH:MM`.")
+
+@commands.command(name="freeslot", aliases=["fs"])
+async def free_slot(ctx, hours: float, *, after: str = None):
+    """Find the first time with `hours` free in the schedule, from now or from `after` (DD-MM-YYYY HH:MM)."""
+    if not await core.check_channel(ctx):
+        return
+
+    if not 0 < hours <= 24:
+        await ctx.send("Please give a length between 0 and 24 hours, e.g. `!freeslot 2.5`.")
+        return
+
+    user_timezone = await author_timezone(ctx)
+    if user_timezone is None:
+        await ctx.send("There was an error with your timezone settings. Please reconfigure using `!set_timezone`.")
+        return
+
+    start = time.time()
+    if after:
+        try:
+            start = max(start, user_timezone.localize(datetime.strptime(after.strip('"'), "%d-%m-%Y %H:%M")).timestamp())
+        except ValueError:
+            await ctx.send("Invalid time format. Please use `DD-MM-YYYY HH:MM`.")
+            return
+
+    # Screenings are scheduled to the minute, so starting on a whole minute keeps the slot on one
+    slot = core.schedule.free_slot(-(-int(start) // 60) * 60, int(hours * 3600))
+    local_time = datetime.fromtimestamp(slot, user_timezone).strftime("%d-%m-%Y %H:%M")
+    await ctx.send(f"The next free {hours:g}-hour slot starts <t:{slot}:F> (<t:{slot}:R>): "
+                   f"`{local_time}` in {user_timezone.zone}.")
+
+@commands.command(name="schedule", aliases=["sched"])
+async def show_schedule(ctx, weeks: int = 4):
+    """Show the scheduled movies week by week (Monday to Sunday in the author's timezone)."""
+    if not await core.check_channel(ctx):
+        return
+
+    weeks = max(1, min(weeks, 12))
+    user_timezone = await author_timezone(ctx)
+    if user_timezone is None:
+        await ctx.send("There was an error with your timezone settings. Please reconfigure using `!set_timezone`.")
+        return
+
+    today = datetime.now(user_timezone).date()
+    monday = today - timedelta(days=today.weekday())
+    bounds = [int(user_timezone.localize(datetime.combine(monday + timedelta(weeks=week), datetime.min.time()))
+                  .timestamp()) for week in range(weeks + 1)]
+
+    blocks = []
+    latest_end = None
+    for week in range(weeks):
+        lines = [f"**Week of {(monday + timedelta(weeks=week)).strftime('%a %d %b')}**"]
+        for start, end, movie in core.schedule.between(bounds[week], bounds[week + 1]):
+            local_start = datetime.fromtimestamp(start, user_timezone)
+            local_end = datetime.fromtimestamp(end, user_timezone)
+            clash = " ⚠️" if latest_end is not None and start < latest_end else ""
+            latest_end = end if latest_end is None else max(latest_end, end)
+            lines.append(f"`{local_start.strftime('%a %d %H:%M')}–{local_end.strftime('%H:%M')}` "
+                         f"**{movie.title}**{clash}")
+        if len(lines) == 1:
+            lines[0] += " – nothing scheduled"
+        blocks.append("\n".join(lines))
+
+    title = f"Schedule for the next {weeks} week{'s' if weeks > 1 else ''}"
+    embeds = pack_blocks(title, blocks, discord.Color.blue(), separator="\n\n",
+                         footer=f"Times in {user_timezone.zone}; ⚠️ overlaps an earlier screening")
+    for payload in number_parts(group_messages(embeds), title):
+        await ctx.send(embeds=payload)
+
+@commands.command(name="next_movie", aliases=["upcoming", "nm"])
+async def show_next_movie(ctx):
+    """Show the next upcoming movie in the queue based on the scheduled time, including the poster."""
+    if not core.queue:
+        await ctx.send("The queue is empty.")
+        return
+
+    # Filter movies with a valid time and sort by time
+    upcoming_movies = sorted(
+        (movie for movie in core.queue if movie.time),
+        key=lambda m: m.time
+    )
+
+    if upcoming_movies:
+        next_movie = upcoming_movies[0]
+        embed = discord.Embed(
+            title="Next Upcoming Movie",
+            description=(
+                f"**{next_movie.title}**\n"
+                f"{rendering.queued_details(next_movie)}"
+                f"**Starts in <t:{next_movie.time}:R>**\n"
+            ),
+            color=discord.Color.blue()
+        )
+
+        # Add the poster URL if available
+        if next_movie.poster_url:
+            embed.set_image(url=next_movie.poster_url)
+
+        await ctx.send(embed=embed)
+    else:
+        await ctx.send("No upcoming movies are scheduled in the queue.")
+
+async def setup(bot):
+    add_commands(bot, globals())
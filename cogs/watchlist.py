@@ -0,0 +1,191 @@
+# Watched list commands (!w, !delw, !clearw)
+
+import time
+from discord.ext import commands
+from records import Movie
+import tracing
+
+from cogs import add_commands, core
+
+@commands.command(name="watched", aliases=['w'])
+@core.has_recommend_admin()
+async def add_to_watchlist(ctx, *, movie_name):
+    """Add a movie to the watchlist, checking queue, recommendations, or searching."""
+
+    if not await core.check_channel(ctx):
+        return
+
+    # Search for the movie
+    movie_data = await core.blocking_executor.run(
+        core.fetch_movie_details, movie_name, task="metadata", timeout=float(core.METADATA_BUDGET)
+    ) 
+    found = Movie.from_omdb(movie_data, ctx.author.name)
+    movie_title = found.title
+
+    # Check if the movie exists in the queue
+    for movie in core.queue:
+        if movie.title.lower() == movie_title.lower():
+            with tracing.span("state.mutation", action="queue_to_watchlist"):
+                core.queue.remove(movie)
+                core.schedule.remove(movie)
+                movie.time = None
+                movie.watched_at = int(time.time())
+                core.watchlist.append(movie)
+            core.save_queue(core.queue)
+            core.save_watchlist(core.watchlist)
+            core.watched_titles.append(movie.title)
+            core.watch_stats.record_watched(movie, from_recommendation=True)
+            core.save_stats()
+            await ctx.send(f"The movie `{movie_name}` has been moved from the queue to the watchlist.")
+            
+            # Update recommendation channel
+            channel = core.board_channel(ctx.guild)
+            if channel:
+                await core.update_recommendation_channel(channel, section='watchlist')
+            return
+
+    # Check if the movie exists in recommendations
+    if movie_title in core.recommendations:
+        # Pop up a confirmation window
+        view = core.ConfirmationView(author=ctx.author, action="move the movie to the watchlist")
+        message = await ctx.send(
+            f"The movie `{movie_title}` is in recommendations. Do you want to move it to the watchlist?",
+            view=view,
+        )
+        with tracing.span("confirmation.wait"):
+            await view.wait()
+            tracing.set_attribute("confirmed", view.value)
+
+        if view.value is True:
+            with tracing.span("state.mutation", action="recommendation_to_watchlist"):
+                movie = core.recommendations.pop(movie_title)
+                movie.watched_at = int(time.time())
+                core.watchlist.append(movie)
+            core.save_recommendations(core.recommendations)
+            core.save_watchlist(core.watchlist)
+            core.watched_titles.append(movie.title)
+            core.watch_stats.record_watched(movie, from_recommendation=True)
+            core.save_stats()
+            await ctx.send(f"The movie `{movie_name}` has been moved from recommendations to the watchlist.")
+            
+            # Update recommendation channel
+            channel = core.board_channel(ctx.guild)
+            if channel:
+                await core.update_recommendation_channel(channel, section='watchlist')
+        elif view.value is None:
+            await ctx.send("No response received. Action cancelled.")
+        return
+
+    if movie_data.get("Response") == "True":
+        view = core.ConfirmationView(author=ctx.author, action="add the movie directly to the watchlist")
+        message = await ctx.send(
+            f"Found `{movie_title}` (Release year: {found.release_year}, Runtime: {found.runtime}). "
+            f"Do you want to add it to the watchlist?",
+            view=view,
+        )
+        with tracing.span("confirmation.wait"):
+            await view.wait()
+            tracing.set_attribute("confirmed", view.value)
+
+        if view.value is True:
+            with tracing.span("state.mutation", action="add_to_watchlist"):
+                found.watched_at = int(time.time())
+                found.added_directly = True
+                core.watchlist.append(found)
+            core.save_watchlist(core.watchlist)
+            core.watched_titles.append(found.title)
+            # Added directly by an admin, so it was never a recommendation
+            core.watch_stats.record_watched(found, from_recommendation=not found.added_directly)
+            core.save_stats()
+            await ctx.send(f"The movie `{movie_title}` has been added to the watchlist.")
+            
+            # Update recommendation channel
+            channel = core.board_channel(ctx.guild)
+            if channel:
+                await core.update_recommendation_channel(channel, section='watchlist')
+        elif view.value is None:
+            await ctx.send("No response received. Action cancelled.")
+    else:
+        await ctx.send(f"No results found for `{movie_name}`.")
+
+# @bot.command(name="watched", aliases=['w'])
+# @has_recommend_admin()
+# async def add_to_watchlist(ctx, *, movie_name):
+
+#     global watched_titles
+#     if not await check_channel(ctx):
+#         return
+    
+#     for movie in queue:
+#         if movie["title"] == movie_name:
+#             movie_data = movie
+#             queue.remove(movie)
+#             break
+#     else:
+#         await ctx.send(f"The movie `{movie_name}` is not in the queue.")
+#         return
+
+#     # Add the movie to the watchlist, inheriting details from queue
+#     watchlist.append({
+#         "title": movie_data["title"],
+#         "release_year": movie_data["release_year"],
+#         "runtime": movie_data["runtime"],
+#         "recommended_by": movie_data["recommended_by"],
+#         "poster_url": movie_data["poster_url"]
+#     })
+#     save_queue(queue)
+#     save_watchlist(watchlist)
+#     watched_titles = watched_titles.append(movie_name)
+
+#     channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
+#     if channel:
+#         await update_recommendation_channel(channel, section='watchlist')
+
+#     await ctx.send(f"The movie `{movie_name}` has been moved to the watchlist.")
+
+@commands.command(name="deletew", aliases=['delw'])
+@core.has_recommend_admin()
+async def remove_from_watchlist(ctx, *, movie_name: str):
+
+    if not await core.check_channel(ctx):
+        return
+
+    # Check if the movie is in the watchlist
+    movie_to_remove = next((movie for movie in core.watchlist if movie.title == movie_name), None)
+
+    if movie_to_remove:
+        # Remove the movie from the watchlist
+        core.watchlist.remove(movie_to_remove)
+        core.save_watchlist(core.watchlist)
+        core.watched_titles = [movie.title for movie in core.watchlist]
+        # The stats keep it, like everything else that was ever watched (see stats.py)
+
+        # Update the recommendation channel with the latest data
+        channel = core.board_channel(ctx.guild)
+        if channel:
+            await core.update_recommendation_channel(channel, section="watchlist")
+
+        await ctx.send(f"The movie `{movie_name}` has been removed from the watchlist.")
+    else:
+        await ctx.send(f"The movie `{movie_name}` is not in the watchlist.")
+
+@commands.command(name="clearw")
+@commands.has_permissions(administrator=True)
+async def clear_watchlist(ctx):
+
+    if not await core.check_channel(ctx):
+        return
+
+    core.watchlist.clear()
+    core.save_watchlist(core.watchlist)
+    core.watched_titles = []
+
+    channel = core.board_channel(ctx.guild)
+    if channel:
+        # Update only the watchlist section
+        await core.update_recommendation_channel(channel, section="watchlist")
+
+    await ctx.send("The watched list has been cleared.")
+
+async def setup(bot):
+    add_commands(bot, globals())
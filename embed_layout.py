@@ -0,0 +1,98 @@
+# Fitting long text into Discord embeds
+#
+# Discord rejects an embed (and so the whole send or edit) when any part of it
+# is over its documented limit, and a message may carry at most ten embeds
+# with 6000 characters between them. `pack_blocks` fills embed descriptions
+# with whole entries up to those limits, and `group_messages` spreads the
+# resulting embeds over as many messages as they need.
+
+import discord
+
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 4096
+FIELD_COUNT_LIMIT = 25
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FOOTER_LIMIT = 2048
+EMBED_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE = 10
+
+# Room kept for a part suffix such as " (12/12)" added to titles after packing
+TITLE_SUFFIX_RESERVE = 10
+
+def truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def embed_size(embed):
+    """Characters that count towards the 6000 character limit."""
+    size = len(embed.title or "") + len(embed.description or "")
+    for field in embed.fields:
+        size += len(field.name or "") + len(field.value or "")
+    size += len(embed.footer.text or "") if embed.footer else 0
+    size += len(embed.author.name or "") if embed.author else 0
+    return size
+
+def pack_blocks(title, blocks, color, separator="\n", footer=None, empty_text=None):
+    """Fill embed descriptions with `blocks` (one per entry), never splitting a block.
+
+    Returns a list of embeds; only the first one carries the title. A block
+    that alone is over the description limit is truncated.
+    """
+    footer = truncate(footer, FOOTER_LIMIT) if footer else None
+    reserve = min(len(title), TITLE_LIMIT - TITLE_SUFFIX_RESERVE) + TITLE_SUFFIX_RESERVE
+    if footer:
+        reserve += len(footer)
+    limit = min(DESCRIPTION_LIMIT, EMBED_TOTAL_LIMIT - reserve)
+
+    descriptions = []
+    current = []
+    current_size = 0
+    for block in blocks:
+        block = truncate(block, limit)
+        added = len(block) + (len(separator) if current else 0)
+        if current and current_size + added > limit:
+            descriptions.append(separator.join(current))
+            current = []
+            current_size = 0
+            added = len(block)
+        current.append(block)
+        current_size += added
+    if current:
+        descriptions.append(separator.join(current))
+    if not descriptions:
+        descriptions.append(empty_text or "")
+
+    embeds = []
+    for index, description in enumerate(descriptions):
+        embed = discord.Embed(color=color, description=description)
+        if index == 0:
+            embed.title = truncate(title, TITLE_LIMIT - TITLE_SUFFIX_RESERVE)
+        embeds.append(embed)
+    if footer:
+        embeds[-1].set_footer(text=footer)
+    return embeds
+
+def group_messages(embeds):
+    """Split embeds into per-message lists within the count and total size limits."""
+    messages = []
+    current = []
+    current_size = 0
+    for embed in embeds:
+        size = embed_size(embed)
+        if current and (len(current) == EMBEDS_PER_MESSAGE or current_size + size > EMBED_TOTAL_LIMIT):
+            messages.append(current)
+            current = []
+            current_size = 0
+        current.append(embed)
+        current_size += size
+    if current:
+        messages.append(current)
+    return messages
+
+def number_parts(messages, title):
+    """Title the first embed of every message "<title> (k/n)" when there is more than one."""
+    if len(messages) < 2:
+        return messages
+    for number, embeds in enumerate(messages, start=1):
+        embeds[0].title = f"{truncate(title, TITLE_LIMIT - TITLE_SUFFIX_RESERVE)} ({number}/{len(messages)})"
+    return messages
@@ -0,0 +1,461 @@
+# Append-only archive of recommendation, vote and removal events
+#
+# Recommendations, votes and queue entries are thrown away when a movie is
+# removed or a list is cleared; the archive keeps a record of every such
+# event so the history can still be analysed afterwards. Each event is a row
+# of fixed-width columns:
+#
+#   timestamp  int64   unix seconds
+#   guild      uint64  guild id (0 outside a guild)
+#   user       uint64  member id
+#   movie      uint32  index into movies.json (titles are stored once)
+#   event      uint8   RECOMMENDED, VOTED, ...
+#
+# New events are appended to `tail.rows` (row layout, cheap to append). Once
+# the tail holds `chunk_rows` events it is sealed into an immutable columnar
+# chunk, `chunk-NNNNNN.col`: a header (row count and timestamp range) followed
+# by each column as one contiguous little-endian array. Queries memory-map the
+# chunks and filter them with NumPy, so scanning years of events never builds
+# a Python object per event, and chunks outside a time range are skipped
+# from their header alone.
+#
+# Writing only needs the standard library; queries need NumPy.
+#
+#   python event_archive.py events
+#   python event_archive.py --benchmark 1000000
+
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORMAT_VERSION = 1
+CHUNK_MAGIC = b"BDEC"
+TAIL_MAGIC = b"BDET"
+# magic, version, rows, first timestamp, last timestamp
+CHUNK_HEADER = struct.Struct("<4sHxxQqq")
+# magic, version, index of the chunk this tail will be sealed into
+TAIL_HEADER = struct.Struct("<4sHxxQ")
+ROW = struct.Struct("<qQQIB3x")
+
+RECOMMENDED = 1
+VOTED = 2
+REMOVED = 3
+CLEARED = 4
+DEQUEUED = 5
+UNVOTED = 6
+
+EVENT_NAMES = {
+    RECOMMENDED: "recommended",
+    VOTED: "voted",
+    REMOVED: "removed",
+    CLEARED: "cleared",
+    DEQUEUED: "dequeued",
+    UNVOTED: "unvoted",
+}
+
+def _typecode(size, signed):
+    return next(code for code in ("bhilq" if signed else "BHILQ") if array.array(code).itemsize == size)
+
+# name, array typecode, NumPy dtype
+COLUMNS = (
+    ("timestamp", _typecode(8, True), "<i8"),
+    ("guild", _typecode(8, False), "<u8"),
+    ("user", _typecode(8, False), "<u8"),
+    ("movie", _typecode(4, False), "<u4"),
+    ("event", _typecode(1, False), "u1"),
+)
+
+class ArchiveError(Exception):
+    pass
+
+def _require_numpy():
+    if np is None:
+        raise ArchiveError("Querying the event archive needs numpy, which is not installed")
+
+def _column_offsets(rows):
+    """Byte offset of each column in a chunk with `rows` rows (8-byte aligned)."""
+    offsets = []
+    offset = CHUNK_HEADER.size
+    for _, typecode, _ in COLUMNS:
+        offset = (offset + 7) // 8 * 8
+        offsets.append(offset)
+        offset += rows * array.array(typecode).itemsize
+    return offsets
+
+def _row_dtype():
+    return np.dtype({
+        "names": [name for name, _, _ in COLUMNS],
+        "formats": [dtype for _, _, dtype in COLUMNS],
+        "offsets": [0, 8, 16, 24, 28],
+        "itemsize": ROW.size,
+    })
+
+def _replace(path, payload):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(payload)
+    os.replace(temporary, path)
+
+class EventArchive:
+    def __init__(self, directory, chunk_rows=65536):
+        """
+        Args:
+            directory (str): Where the chunks, tail and movie titles are kept; created on the first flush.
+            chunk_rows (int): Events per sealed chunk.
+        """
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.tail_path = os.path.join(directory, "tail.rows")
+        self.titles_path = os.path.join(directory, "movies.json")
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._titles_saved = 0
+        self._mapped = {}
+
+        try:
+            with open(self.titles_path, "r") as file:
+                self.titles = json.load(file)
+        except FileNotFoundError:
+            self.titles = []
+        self._titles_saved = len(self.titles)
+        self._ids = {self.key(title): index for index, title in enumerate(self.titles)}
+        self._next_chunk = self._recover_tail()
+
+    @staticmethod
+    def key(title):
+        return " ".join(title.lower().split())
+
+    def chunk_path(self, index):
+        return os.path.join(self.directory, f"chunk-{index:06d}.col")
+
+    def chunk_paths(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names)
+                if name.startswith("chunk-") and name.endswith(".col")]
+
+    def _recover_tail(self):
+        """Index of the next chunk to seal; drops a tail that was sealed just before a crash."""
+        chunks = self.chunk_paths()
+        next_chunk = int(os.path.basename(chunks[-1])[6:12]) + 1 if chunks else 0
+        try:
+            with open(self.tail_path, "rb") as file:
+                header = file.read(TAIL_HEADER.size)
+        except FileNotFoundError:
+            return next_chunk
+        if len(header) < TAIL_HEADER.size:
+            os.remove(self.tail_path)
+            return next_chunk
+        magic, version, chunk = TAIL_HEADER.unpack(header)
+        if magic != TAIL_MAGIC or version > FORMAT_VERSION:
+            raise ArchiveError(f"{self.tail_path} is not an event archive tail this bot can read")
+        if os.path.exists(self.chunk_path(chunk)):
+            # The chunk was written but the tail was not reset yet
+            os.remove(self.tail_path)
+            return next_chunk
+        # Drop a row cut short by a crash mid-append
+        rows = (os.path.getsize(self.tail_path) - TAIL_HEADER.size) // ROW.size
+        os.truncate(self.tail_path, TAIL_HEADER.size + rows * ROW.size)
+        return chunk
+
+    def movie_id(self, title):
+        """The movie column value for `title`, registering the title if it is new."""
+        key = self.key(title)
+        with self._lock:
+            movie = self._ids.get(key)
+            if movie is None:
+                movie = self._ids[key] = len(self.titles)
+                self.titles.append(title)
+            return movie
+
+    def append(self, event, guild, user, title, timestamp=None):
+        """Record an event in memory; `flush()` makes it durable."""
+        row = (int(time.time() if timestamp is None else timestamp), guild or 0, user or 0, self.movie_id(title), event)
+        with self._lock:
+            self._pending.append(row)
+
+    def flush(self):
+        """Append the pending events to the tail, sealing it into a chunk when it is full."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                titles = list(self.titles) if len(self.titles) > self._titles_saved else None
+            if not rows and titles is None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            # Titles first, so a row never refers to a title that was not saved
+            if titles is not None:
+                _replace(self.titles_path, json.dumps(titles).encode("utf-8"))
+                self._titles_saved = len(titles)
+            if not rows:
+                return
+
+            if not os.path.exists(self.tail_path):
+                _replace(self.tail_path, TAIL_HEADER.pack(TAIL_MAGIC, FORMAT_VERSION, self._next_chunk))
+            with open(self.tail_path, "ab") as file:
+                file.write(b"".join(ROW.pack(*row) for row in rows))
+                size = file.tell()
+            if (size - TAIL_HEADER.size) // ROW.size >= self.chunk_rows:
+                self._seal()
+
+    def _seal(self):
+        with open(self.tail_path, "rb") as file:
+            raw = file.read()[TAIL_HEADER.size:]
+        rows = list(ROW.iter_unpack(raw[:len(raw) // ROW.size * ROW.size]))
+        columns = [array.array(typecode, values) for (_, typecode, _), values in zip(COLUMNS, zip(*rows))]
+        if sys.byteorder != "little":
+            for column in columns:
+                column.byteswap()
+
+        timestamps = columns[0]
+        parts = [CHUNK_HEADER.pack(CHUNK_MAGIC, FORMAT_VERSION, len(rows), min(timestamps), max(timestamps))]
+        written = CHUNK_HEADER.size
+        for offset, column in zip(_column_offsets(len(rows)), columns):
+            parts.append(b"\0" * (offset - written))
+            parts.append(column.tobytes())
+            written = offset + len(parts[-1])
+        _replace(self.chunk_path(self._next_chunk), b"".join(parts))
+
+        self._next_chunk += 1
+        _replace(self.tail_path, TAIL_HEADER.pack(TAIL_MAGIC, FORMAT_VERSION, self._next_chunk))
+
+    # Queries
+
+    def _map_chunk(self, path):
+        """(rows, first timestamp, last timestamp, columns) of a sealed chunk, memory-mapped."""
+        mapped = self._mapped.get(path)
+        if mapped is not None:
+            return mapped
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, first, last = CHUNK_HEADER.unpack_from(buffer)
+        if magic != CHUNK_MAGIC or version > FORMAT_VERSION:
+            raise ArchiveError(f"{path} is not an event archive chunk this bot can read")
+        columns = {
+            name: np.frombuffer(buffer, dtype=dtype, count=rows, offset=offset)
+            for (name, _, dtype), offset in zip(COLUMNS, _column_offsets(rows))
+        }
+        # Sealed chunks never change, so their mappings are kept for later queries
+        mapped = self._mapped[path] = (rows, first, last, columns)
+        return mapped
+
+    def scan(self, since=None, until=None):
+        """Yield the events as dicts of column arrays, one per chunk.
+
+        Sealed chunks are memory-mapped; chunks entirely outside
+        [since, until) are skipped without being read.
+        """
+        _require_numpy()
+        for path in self.chunk_paths():
+            rows, first, last, columns = self._map_chunk(path)
+            if (since is not None and last < since) or (until is not None and first >= until):
+                continue
+            yield columns
+
+        try:
+            tail = np.fromfile(self.tail_path, dtype=_row_dtype(), offset=TAIL_HEADER.size)
+        except FileNotFoundError:
+            tail = None
+        if tail is not None and len(tail):
+            yield {name: tail[name] for name, _, _ in COLUMNS}
+
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            rows = np.array(pending, dtype=[(name, dtype) for name, _, dtype in COLUMNS])
+            yield {name: rows[name] for name, _, _ in COLUMNS}
+
+    def select(self, event=None, since=None, until=None, guild=None, user=None, movie=None):
+        """Yield (columns, mask) per chunk for the events matching every given filter.
+
+        `event` may be one event type or a collection of them, `movie` a title.
+        """
+        movie_id = None
+        if movie is not None:
+            movie_id = self._ids.get(self.key(movie))
+            if movie_id is None:
+                return
+        events = None
+        if event is not None:
+            events = np.asarray(sorted(event) if isinstance(event, (set, frozenset, list, tuple)) else [event], dtype="u1")
+        for columns in self.scan(since, until):
+            mask = np.ones(len(columns["timestamp"]), dtype=bool)
+            if events is not None:
+                mask &= np.isin(columns["event"], events)
+            if since is not None:
+                mask &= columns["timestamp"] >= since
+            if until is not None:
+                mask &= columns["timestamp"] < until
+            if guild is not None:
+                mask &= columns["guild"] == guild
+            if user is not None:
+                mask &= columns["user"] == user
+            if movie_id is not None:
+                mask &= columns["movie"] == movie_id
+            yield columns, mask
+
+    def count(self, **filters):
+        """Number of events matching `filters` (see select())."""
+        return int(sum(np.count_nonzero(mask) for _, mask in self.select(**filters)))
+
+    def movie_counts(self, limit=None, **filters):
+        """[(title, events)] for the matching events, most frequent first."""
+        totals = np.zeros(len(self.titles), dtype=np.int64)
+        for columns, mask in self.select(**filters):
+            counts = np.bincount(columns["movie"][mask], minlength=len(totals))
+            totals[:len(counts)] += counts[:len(totals)]
+        order = np.argsort(totals, kind="stable")[::-1]
+        order = order[totals[order] > 0][:limit]
+        return [(self.titles[index], int(totals[index])) for index in order]
+
+    def user_counts(self, limit=None, **filters):
+        """[(user id, events)] for the matching events, most frequent first."""
+        totals = {}
+        for columns, mask in self.select(**filters):
+            users, counts = np.unique(columns["user"][mask], return_counts=True)
+            for user, count in zip(users.tolist(), counts.tolist()):
+                totals[user] = totals.get(user, 0) + count
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def event_counts(self, **filters):
+        """{event name: events} for the matching events."""
+        totals = np.zeros(256, dtype=np.int64)
+        for columns, mask in self.select(**filters):
+            totals += np.bincount(columns["event"][mask], minlength=256)
+        return {name: int(totals[event]) for event, name in EVENT_NAMES.items() if totals[event]}
+
+    # Export
+
+    def export_rows(self, batch=4096):
+        """Take a point-in-time view of the archive to read it one batch at a time.
+
+        Returns (titles, batches): the title table the movie column indexes,
+        and an iterator of lists of up to `batch` (timestamp, guild, user,
+        movie, event) tuples, oldest first. Only the standard library is
+        needed, and events appended afterwards are left out.
+        """
+        with self._flush_lock:
+            chunks = self.chunk_paths()
+            try:
+                tail = open(self.tail_path, "rb")
+            except FileNotFoundError:
+                tail = None
+            # A seal replaces the tail file, so the open handle keeps this view's rows
+            tail_size = os.fstat(tail.fileno()).st_size if tail is not None else 0
+            with self._lock:
+                titles = list(self.titles)
+                pending = list(self._pending)
+        return titles, self._export_batches(chunks, tail, tail_size, pending, batch)
+
+    def _export_batches(self, chunks, tail, tail_size, pending, batch):
+        for path in chunks:
+            with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                magic, version, rows, first, last = CHUNK_HEADER.unpack_from(buffer)
+                if magic != CHUNK_MAGIC or version > FORMAT_VERSION:
+                    raise ArchiveError(f"{path} is not an event archive chunk this bot can read")
+                offsets = _column_offsets(rows)
+                for start in range(0, rows, batch):
+                    count = min(batch, rows - start)
+                    columns = []
+                    for (_, typecode, _), offset in zip(COLUMNS, offsets):
+                        column = array.array(typecode)
+                        size = column.itemsize
+                        column.frombytes(buffer[offset + start * size:offset + (start + count) * size])
+                        if sys.byteorder != "little":
+                            column.byteswap()
+                        columns.append(column)
+                    yield list(zip(*columns))
+
+        if tail is not None:
+            with tail:
+                tail.seek(TAIL_HEADER.size)
+                remaining = (tail_size - TAIL_HEADER.size) // ROW.size
+                while remaining > 0:
+                    count = min(batch, remaining)
+                    yield list(ROW.iter_unpack(tail.read(count * ROW.size)))
+                    remaining -= count
+
+        for start in range(0, len(pending), batch):
+            yield pending[start:start + batch]
+
+def _summary(directory, limit):
+    archive = EventArchive(directory)
+    started = time.perf_counter()
+    events = archive.event_counts()
+    print(f"{sum(events.values())} events in {len(archive.chunk_paths())} chunks: {events}")
+    print("Most voted movies:")
+    for title, votes in archive.movie_counts(limit=limit, event=VOTED):
+        print(f"  {votes:>8}  {title}")
+    print("Most active voters:")
+    for user, votes in archive.user_counts(limit=limit, event=VOTED):
+        print(f"  {votes:>8}  {user}")
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+def _benchmark(events, chunk_rows):
+    import random
+    import shutil
+    import tempfile
+
+    workdir = tempfile.mkdtemp(prefix="bot-events-")
+    try:
+        archive = EventArchive(workdir, chunk_rows=chunk_rows)
+        started = time.perf_counter()
+        # Five years of events, 200 members voting on 5000 movies
+        now = int(time.time())
+        first = now - 5 * 365 * 86400
+        titles = [f"Synthetic Movie {index}" for index in range(5000)]
+        for index in range(events):
+            archive.append(random.choice((RECOMMENDED, VOTED, VOTED, VOTED, REMOVED)), 1, random.randrange(200),
+                           random.choice(titles), timestamp=first + index * (now - first) // events)
+            if index % chunk_rows == chunk_rows - 1:
+                archive.flush()
+        archive.flush()
+        print(f"Wrote {events} events in {time.perf_counter() - started:.1f}s: "
+              f"{sum(os.path.getsize(path) for path in archive.chunk_paths()) / events:.1f} B/event")
+
+        archive = EventArchive(workdir, chunk_rows=chunk_rows)
+        queries = {
+            "count votes": lambda: archive.count(event=VOTED),
+            "votes last 90 days": lambda: archive.count(event=VOTED, since=now - 90 * 86400),
+            "one member's votes": lambda: archive.count(event=VOTED, user=7),
+            "one movie's history": lambda: archive.count(movie="Synthetic Movie 42"),
+            "top 10 movies": lambda: archive.movie_counts(limit=10, event=VOTED),
+            "top 10 voters": lambda: archive.user_counts(limit=10, event=VOTED),
+        }
+        for name, query in queries.items():
+            query()
+            best = float("inf")
+            for _ in range(5):
+                started = time.perf_counter()
+                query()
+                best = min(best, time.perf_counter() - started)
+            print(f"{name:22} {best * 1000:8.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise an event archive, or benchmark queries on a synthetic one.")
+    parser.add_argument("directory", nargs="?", default="events")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--benchmark", type=int, metavar="EVENTS", help="Benchmark queries over this many synthetic events")
+    parser.add_argument("--chunk-rows", type=int, default=65536)
+    args = parser.parse_args()
+    if args.benchmark:
+        _benchmark(args.benchmark, args.chunk_rows)
+    else:
+        _summary(args.directory, args.limit)
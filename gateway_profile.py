@@ -0,0 +1,191 @@
+# Gateway intents and cache settings
+#
+# The "default" profile is what the bot has always used: discord.py's default
+# intents plus message content, a 1000-message cache and the default member
+# cache. The bot only reads prefix commands from one channel, so most of that
+# is never used. The "low_memory" profile subscribes only to what the bot
+# handles (guilds for roles and channels, guild messages and their content,
+# reactions for votes), keeps a small message cache, caches no members and
+# never chunks member lists.
+#
+# Compare the two on a synthetic large guild (each profile is measured in a
+# fresh process):
+#
+#   python gateway_profile.py --members 20000 --channels 500 --messages 20000
+
+import gc
+import json
+import subprocess
+import sys
+
+import discord
+
+PROFILES = ("default", "low_memory")
+LOW_MEMORY_MESSAGE_CACHE = 100
+
+def intents_for(profile):
+    if profile == "low_memory":
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.message_content = True
+        intents.guild_reactions = True
+        return intents
+    intents = discord.Intents.default()
+    intents.messages = True
+    intents.message_content = True
+    return intents
+
+def client_options(profile, message_cache_size=None):
+    """Keyword arguments for the bot's constructor under a gateway profile.
+
+    Args:
+        profile (str): "default" or "low_memory".
+        message_cache_size (int): Messages to keep cached; 0 disables the cache.
+            Defaults to 1000 (default) or LOW_MEMORY_MESSAGE_CACHE (low_memory).
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown gateway profile {profile!r}; expected one of {', '.join(PROFILES)}")
+    intents = intents_for(profile)
+    options = {"intents": intents}
+    if profile == "low_memory":
+        options.update(
+            max_messages=LOW_MEMORY_MESSAGE_CACHE,
+            member_cache_flags=discord.MemberCacheFlags.none(),
+            chunk_guilds_at_startup=False,
+        )
+    if message_cache_size is not None:
+        # discord.py treats max_messages <= 0 as the default, None disables the cache
+        options["max_messages"] = int(message_cache_size) or None
+    return options
+
+# Synthetic large guild
+
+def _snowflake(n):
+    return str(10**17 + n)
+
+def _user(n):
+    return {"id": _snowflake(n), "username": f"member{n}", "discriminator": "0", "global_name": f"Member {n}",
+            "avatar": "a" * 32, "bot": False}
+
+def _member(n, roles):
+    return {"user": _user(n), "roles": roles, "joined_at": "2024-01-01T00:00:00+00:00", "nick": None,
+            "deaf": False, "mute": False, "flags": 0}
+
+def build_guild(members, channels, roles):
+    guild_id = _snowflake(0)
+    role_ids = [_snowflake(1_000_000 + n) for n in range(roles)]
+    channel_ids = [_snowflake(2_000_000 + n) for n in range(channels)]
+    voice_ids = channel_ids[: max(1, channels // 10)]
+    in_voice = range(1, min(members, 200) + 1)
+    return {
+        "id": guild_id,
+        "name": "Synthetic guild",
+        "owner_id": _snowflake(1),
+        "member_count": members,
+        "large": True,
+        "features": [],
+        "roles": [{"id": role_id, "name": f"role{n}", "permissions": "0", "position": n, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False} for n, role_id in enumerate(role_ids)],
+        "channels": [{"id": channel_id, "name": f"channel-{n}", "type": 2 if channel_id in voice_ids else 0,
+                      "position": n, "permission_overwrites": [], "guild_id": guild_id,
+                      "bitrate": 64000, "user_limit": 0, "rtc_region": None}
+                     for n, channel_id in enumerate(channel_ids)],
+        "emojis": [{"id": _snowflake(3_000_000 + n), "name": f"emoji{n}", "roles": [], "require_colons": True,
+                    "managed": False, "animated": False, "available": True} for n in range(min(members // 50, 500))],
+        "stickers": [{"id": _snowflake(4_000_000 + n), "name": f"sticker{n}", "description": "", "tags": "x",
+                      "type": 2, "format_type": 1, "available": True, "guild_id": guild_id} for n in range(60)],
+        # A large guild's GUILD_CREATE carries the members in voice channels
+        "voice_states": [{"user_id": _snowflake(n), "channel_id": voice_ids[n % len(voice_ids)], "session_id": "s",
+                          "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                          "self_video": False, "suppress": False, "request_to_speak_timestamp": None,
+                          "member": _member(n, role_ids[:2])} for n in in_voice],
+        "members": [_member(n, role_ids[:2]) for n in in_voice],
+        "threads": [],
+    }, channel_ids, role_ids
+
+def _message(n, guild_id, channel_ids, role_ids, members):
+    author = 1 + n % members
+    return {
+        "id": _snowflake(10_000_000 + n), "channel_id": channel_ids[n % len(channel_ids)], "guild_id": guild_id,
+        "author": _user(author), "member": {k: v for k, v in _member(author, role_ids[:2]).items() if k != "user"},
+        "content": f"Synthetic chatter message number {n} " * 3, "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False, "type": 0,
+    }
+
+def _rss_kib():
+    with open("/proc/self/status", "r") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def _measure(profile, members, channels, roles, messages):
+    """Feed a synthetic guild and message traffic to a client; returns RSS figures in KiB."""
+    import asyncio
+
+    async def run():
+        options = client_options(profile)
+        client = discord.Client(**options)
+        state = client._connection
+        intents = options["intents"]
+        gc.collect()
+        before = _rss_kib()
+        state.user = discord.ClientUser(state=state, data=_user(members + 1))
+        guild, channel_ids, role_ids = build_guild(members, channels, roles)
+        if not intents.voice_states:
+            # Without the voice states intent Discord leaves voice states out
+            guild["voice_states"] = []
+        state._add_guild_from_data(guild)
+        guild_id = guild["id"]
+        del guild
+        # Messages are built one at a time, so only what the caches keep adds to RSS
+        if intents.guild_messages:
+            for n in range(messages):
+                state.parse_message_create(_message(n, guild_id, channel_ids, role_ids, members))
+        gc.collect()
+        after = _rss_kib()
+        return {
+            "profile": profile,
+            "rss_kib": after,
+            "cache_kib": after - before,
+            "cached_messages": len(state._messages or ()),
+            "cached_members": sum(len(g.members) for g in state.guilds),
+            "cached_emojis": len(state._emojis),
+        }
+
+    return asyncio.run(run())
+
+def compare(members, channels, roles, messages):
+    results = []
+    for profile in PROFILES:
+        # A fresh interpreter per profile, so one run's heap does not inflate the other's RSS
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", profile, "--members", str(members), "--channels", str(channels),
+             "--roles", str(roles), "--messages", str(messages)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    for result in results:
+        print(f"{result['profile']:11} RSS {result['rss_kib'] / 1024:7.1f} MiB   "
+              f"gateway caches +{result['cache_kib'] / 1024:6.1f} MiB   "
+              f"messages={result['cached_messages']} members={result['cached_members']} "
+              f"emojis={result['cached_emojis']}")
+    default, low = results
+    print(f"low_memory saves {(default['rss_kib'] - low['rss_kib']) / 1024:.1f} MiB of RSS")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare gateway cache memory between profiles.")
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--roles", type=int, default=250)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--measure", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.members, args.channels, args.roles, args.messages)))
+    else:
+        compare(args.members, args.channels, args.roles, args.messages)
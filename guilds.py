@@ -0,0 +1,127 @@
+# Per-guild resolution of the bot's roles and channels
+#
+# The admin role and the bot's channels are configured by name or by ID.
+# GuildDirectory resolves each of them to an ID once per guild and answers
+# later checks with a dict lookup. Resolved IDs are remembered (guilds.json),
+# so a role or channel keeps working after it is renamed, also across
+# restarts, until its configured value changes.
+#
+# Whether a member holds the admin role is cached per member. The bot drops
+# cached entries from its member, role and channel update events; because
+# member updates are only delivered with the privileged members intent,
+# cached member results also expire after `member_ttl` seconds.
+
+import time
+
+class GuildDirectory:
+    def __init__(self, roles, channels, overrides=None, saved=None, on_change=None, member_ttl=300.0):
+        """
+        Args:
+            roles (dict): Role key -> configured role name or ID, e.g. {"admin": "recommend-admin"}.
+            channels (dict): Channel key -> configured channel name or ID, e.g. {"commands": "movie_night"}.
+            overrides (dict): Guild ID -> {key: name or ID}, replacing the defaults in that guild.
+            saved (dict): IDs resolved in earlier runs, as returned by to_dict().
+            on_change (callable): Called after a new resolution, so the IDs can be saved.
+            member_ttl (float): Seconds a member's cached admin result is trusted.
+        """
+        self.roles = dict(roles)
+        self.channels = dict(channels)
+        self.overrides = {int(guild_id): dict(values) for guild_id, values in (overrides or {}).items()}
+        self.saved = {int(guild_id): {key: tuple(entry) for key, entry in values.items()}
+                      for guild_id, values in (saved or {}).items()}
+        self.on_change = on_change
+        self.member_ttl = member_ttl
+        # guild id -> key -> resolved id (None if nothing matches)
+        self._ids = {}
+        # (guild id, member id) -> (is admin, cached at)
+        self._admins = {}
+
+    def to_dict(self):
+        return {str(guild_id): {key: list(entry) for key, entry in values.items()}
+                for guild_id, values in self.saved.items()}
+
+    def configured(self, guild_id, key):
+        """The configured name or ID for `key` in a guild."""
+        value = self.overrides.get(guild_id, {}).get(key)
+        if value is None:
+            value = self.roles.get(key, self.channels.get(key))
+        return value
+
+    def _resolve(self, guild, key, candidates):
+        value = self.configured(guild.id, key)
+        if value is None:
+            return None
+        by_id = {candidate.id: candidate for candidate in candidates}
+
+        # An ID resolved earlier for the same configured value wins, so renames keep working
+        saved = self.saved.get(guild.id, {}).get(key)
+        if saved is not None and saved[0] == value and saved[1] in by_id:
+            return saved[1]
+
+        if isinstance(value, int) or str(value).isdigit():
+            resolved = int(value) if int(value) in by_id else None
+        else:
+            resolved = next((candidate.id for candidate in candidates if candidate.name == value), None)
+        if resolved is not None and saved != (value, resolved):
+            self.saved.setdefault(guild.id, {})[key] = (value, resolved)
+            if self.on_change is not None:
+                self.on_change()
+        return resolved
+
+    def _lookup(self, guild, key, candidates):
+        ids = self._ids.setdefault(guild.id, {})
+        if key not in ids:
+            ids[key] = self._resolve(guild, key, candidates())
+        return ids[key]
+
+    def role_id(self, guild, key):
+        return self._lookup(guild, key, lambda: guild.roles)
+
+    def channel_id(self, guild, key):
+        return self._lookup(guild, key, lambda: guild.channels)
+
+    def channel(self, guild, key):
+        """The guild's channel for `key`, or None."""
+        channel_id = self.channel_id(guild, key)
+        return guild.get_channel(channel_id) if channel_id is not None else None
+
+    def channel_label(self, guild, key):
+        """Name to show users for a channel, resolved or not."""
+        channel = self.channel(guild, key) if guild is not None else None
+        return channel.name if channel is not None else str(self.configured(getattr(guild, "id", None), key))
+
+    def is_admin(self, guild, member):
+        """Whether `member` holds the guild's admin role."""
+        if guild is None:
+            return False
+        entry_key = (guild.id, member.id)
+        now = time.monotonic()
+        cached = self._admins.get(entry_key)
+        if cached is not None and now - cached[1] < self.member_ttl:
+            return cached[0]
+        role_id = self.role_id(guild, "admin")
+        allowed = role_id is not None and any(role.id == role_id for role in getattr(member, "roles", ()))
+        if len(self._admins) > 10_000:
+            self._admins.clear()
+        self._admins[entry_key] = (allowed, now)
+        return allowed
+
+    def in_channel(self, channel, key):
+        """Whether `channel` is the guild's channel for `key`."""
+        guild = getattr(channel, "guild", None)
+        return guild is not None and channel.id == self.channel_id(guild, key)
+
+    # Invalidation
+
+    def forget_member(self, guild_id, member_id):
+        self._admins.pop((guild_id, member_id), None)
+
+    def forget_ids(self, guild_id):
+        """Resolve the guild's roles and channels again on next use."""
+        self._ids.pop(guild_id, None)
+
+    def forget_guild(self, guild_id):
+        """Like forget_ids(), and also drop the guild's cached member results."""
+        self.forget_ids(guild_id)
+        for entry_key in [entry_key for entry_key in self._admins if entry_key[0] == guild_id]:
+            del self._admins[entry_key]
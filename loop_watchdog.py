@@ -0,0 +1,152 @@
+# Event-loop stall detector
+#
+# A heartbeat task on the event loop stamps the time every `interval`
+# seconds. A daemon thread watches the stamp, and when the loop has not
+# beaten for longer than `threshold` it grabs the loop thread's current
+# stack. That stack shows the code that is blocking the loop (a requests
+# call, a file write, an IMDb search), and walking it up to a known command
+# coroutine tells us which command triggered it.
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+
+LOOP_STALLS = metrics.REGISTRY.counter(
+    "bot_event_loop_stalls_total", "Times the event loop was blocked past the stall threshold.", ["command"]
+)
+
+class StallRecord:
+    __slots__ = ("command", "location", "count", "worst", "total", "stack")
+
+    def __init__(self, command, location):
+        self.command = command
+        self.location = location
+        self.count = 0
+        self.worst = 0.0
+        self.total = 0.0
+        self.stack = ""
+
+class LoopWatchdog:
+    def __init__(self, threshold=0.25, interval=0.05, resolve_command=None, source_paths=()):
+        """
+        Args:
+            threshold (float): Seconds without a heartbeat that count as a stall.
+            interval (float): Seconds between heartbeats and watchdog checks.
+            resolve_command (callable): Maps a frame to a command name, or None.
+            source_paths (list): Files, and directories of files, whose frames best
+                describe where a stall came from.
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.resolve_command = resolve_command
+        self.source_paths = [os.path.abspath(path) for path in source_paths]
+        self.records = {}
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._thread = None
+        self._heartbeat_task = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        stall_beat = None
+        captured = None
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            if stall_beat is not None:
+                # The loop beat again, so the stall is over
+                if last_beat != stall_beat:
+                    self._finish(captured, max(0.0, last_beat - stall_beat - self.interval))
+                    stall_beat = captured = None
+                continue
+
+            if time.monotonic() - last_beat > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stall_beat = last_beat
+                    captured = self._capture(frame)
+
+    def _capture(self, frame):
+        command = None
+        if self.resolve_command:
+            try:
+                command = self.resolve_command(frame)
+            except Exception:
+                command = None
+        command = command or "unknown"
+
+        stack = traceback.extract_stack(frame)
+        location = self._location(stack)
+        with self._lock:
+            record = self.records.get((command, location))
+            if record is None:
+                record = self.records[(command, location)] = StallRecord(command, location)
+            record.count += 1
+        LOOP_STALLS.labels(command).inc()
+        record_stack = "".join(traceback.format_list(stack[-8:]))
+        return record, record_stack
+
+    def _finish(self, captured, duration):
+        record, stack = captured
+        with self._lock:
+            record.total += duration
+            if duration >= record.worst:
+                record.worst = duration
+                record.stack = stack
+
+    def _location(self, stack):
+        # Prefer the deepest frame in the bot's own code, else the innermost one
+        chosen = stack[-1]
+        for entry in reversed(stack):
+            if self._is_source(os.path.abspath(entry.filename)):
+                chosen = entry
+                break
+        return f"{os.path.basename(chosen.filename)}:{chosen.lineno} in {chosen.name}"
+
+    def _is_source(self, filename):
+        return any(filename == path or filename.startswith(path + os.sep) for path in self.source_paths)
+
+    def top_offenders(self, limit=10):
+        """Stall records ordered by worst duration, then by count."""
+        with self._lock:
+            records = list(self.records.values())
+        return sorted(records, key=lambda r: (r.worst, r.count), reverse=True)[:limit]
+
+def frame_resolver(code_names):
+    """Build a resolver that walks a frame's callers looking for known code objects.
+
+    Args:
+        code_names (callable): Returns a dict mapping code objects to command names.
+    """
+    def resolve(frame):
+        names = code_names()
+        while frame is not None:
+            name = names.get(frame.f_code)
+            if name:
+                return name
+            frame = frame.f_back
+        return None
+    return resolve
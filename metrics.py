@@ -0,0 +1,295 @@
+# Minimal metrics registry with Prometheus text exposition
+#
+# Counters, gauges and histograms with labels, rendered in the Prometheus
+# text format and served from a small aiohttp endpoint on the bot's own
+# event loop. aiohttp already ships with discord.py, so nothing new is
+# needed to run it; aiohttp.web is only imported when the endpoint starts.
+#
+# Metrics are also updated from the blocking executor's worker threads
+# (state file writes, upstream calls), so every child guards its values with
+# a lock, as the Prometheus client does.
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast in-memory command to a slow upstream call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def _render_child(self, key, child):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+    def snapshot(self):
+        """(bucket counts, sum, count), read together."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child):
+        counts, total, observed = child.snapshot()
+        cumulative = 0
+        for bound, count in zip(child.buckets, counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {observed}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Metrics the bot reports
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "bot_command_duration_seconds", "Time spent running a command handler.", ["command", "status"]
+)
+COMMAND_ERRORS = REGISTRY.counter(
+    "bot_command_errors_total", "Commands that failed, including failed checks.", ["command", "error"]
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "bot_upstream_request_duration_seconds", "Latency of IMDb and OMDb lookups.", ["upstream"]
+)
+UPSTREAM_FAILURES = REGISTRY.counter(
+    "bot_upstream_failures_total", "IMDb and OMDb lookups that raised or returned an error.", ["upstream"]
+)
+UPSTREAM_NOT_FOUND = REGISTRY.counter(
+    "bot_upstream_not_found_total", "IMDb and OMDb lookups that worked but found no movie.", ["upstream"]
+)
+STORAGE_FLUSH_LATENCY = REGISTRY.histogram(
+    "bot_storage_flush_duration_seconds", "Time spent writing a state file.", ["file"]
+)
+STORAGE_FLUSH_BYTES = REGISTRY.counter(
+    "bot_storage_flush_bytes_total", "Bytes written to state files.", ["file"]
+)
+BOARD_EDITS = REGISTRY.counter(
+    "bot_board_edits_total", "Board message updates, by whether they were sent or skipped as unchanged.",
+    ["section", "result"]
+)
+SCHEDULER_LAG = REGISTRY.histogram(
+    "bot_announcement_lag_seconds", "Delay between a movie's scheduled time and its announcement.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900)
+)
+LOOP_LAG = REGISTRY.histogram(
+    "bot_event_loop_lag_seconds", "How late the event loop wakes a periodic probe."
+)
+LOOP_LAG_LAST = REGISTRY.gauge(
+    "bot_event_loop_lag_last_seconds", "Most recent event loop lag probe."
+)
+STARTUP_PHASE = REGISTRY.gauge(
+    "bot_startup_phase_seconds", "Time spent in each startup phase of the last start.", ["phase"]
+)
+
+@contextmanager
+def track_upstream(upstream):
+    """Time an upstream call and count it as failed if it raises."""
+    with UPSTREAM_LATENCY.labels(upstream).time():
+        try:
+            yield
+        except Exception:
+            UPSTREAM_FAILURES.labels(upstream).inc()
+            raise
+
+async def monitor_loop_lag(interval=0.5):
+    """Record how late the loop wakes a sleeping task, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+async def start_metrics_server(port, host="127.0.0.1", registry=REGISTRY):
+    """Serve `registry` at http://host:port/metrics and return the runner."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(
+            body=registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
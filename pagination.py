@@ -0,0 +1,212 @@
+# Paginated browsing of the watchlist and the queue
+#
+# A page source only ever looks at the entries it needs for the page being
+# shown: it walks the list lazily, skips entries that do not match the
+# filters, and stops as soon as it has one entry past the end of the page
+# (which tells it whether a next page exists). The index in the underlying
+# list where each page starts is remembered, so paging forward through a
+# filtered view resumes the scan where the previous page ended instead of
+# starting over.
+
+import heapq
+from datetime import datetime, UTC
+
+import discord
+from discord import Interaction
+from discord.ui import View, Button
+
+import rendering
+
+PAGE_SIZE = 5
+
+class FilterError(ValueError):
+    pass
+
+class MovieFilter:
+    """Filters given as `by:<name> year:<YYYY or YYYY-YYYY> after:<DD-MM-YYYY> before:<DD-MM-YYYY>`."""
+
+    __slots__ = ("recommended_by", "year_from", "year_to", "watched_after", "watched_before")
+
+    def __init__(self, recommended_by=None, year_from=None, year_to=None, watched_after=None, watched_before=None):
+        self.recommended_by = recommended_by
+        self.year_from = year_from
+        self.year_to = year_to
+        self.watched_after = watched_after
+        self.watched_before = watched_before
+
+    @classmethod
+    def parse(cls, text):
+        movie_filter = cls()
+        for token in (text or "").split():
+            key, _, value = token.partition(":")
+            key = key.lower()
+            if not value:
+                raise FilterError(f"Filter `{token}` needs a value, e.g. `by:alice`.")
+            if key == "by":
+                movie_filter.recommended_by = value.lower()
+            elif key == "year":
+                start, _, end = value.partition("-")
+                if not start.isdigit() or (end and not end.isdigit()):
+                    raise FilterError(f"Invalid year `{value}`. Use `year:2010` or `year:2000-2010`.")
+                movie_filter.year_from = int(start)
+                movie_filter.year_to = int(end) if end else int(start)
+            elif key in ("after", "before"):
+                try:
+                    day = datetime.strptime(value, "%d-%m-%Y").replace(tzinfo=UTC)
+                except ValueError:
+                    raise FilterError(f"Invalid date `{value}`. Use DD-MM-YYYY.")
+                if key == "after":
+                    movie_filter.watched_after = day.timestamp()
+                else:
+                    # Inclusive of the whole day
+                    movie_filter.watched_before = day.timestamp() + 86400
+            else:
+                raise FilterError(f"Unknown filter `{key}`. Use `by:`, `year:`, `after:` or `before:`.")
+        return movie_filter
+
+    def __bool__(self):
+        return any(getattr(self, name) is not None for name in self.__slots__)
+
+    def matches(self, movie):
+        if self.recommended_by is not None and (movie.recommended_by or "").lower() != self.recommended_by:
+            return False
+        if self.year_from is not None:
+            year = movie.year[0] if isinstance(movie.year, tuple) else movie.year
+            if year is None or not self.year_from <= year <= self.year_to:
+                return False
+        if self.watched_after is not None or self.watched_before is not None:
+            # Entries watched before dates were recorded never match a date filter
+            if movie.watched_at is None:
+                return False
+            if self.watched_after is not None and movie.watched_at < self.watched_after:
+                return False
+            if self.watched_before is not None and movie.watched_at >= self.watched_before:
+                return False
+        return True
+
+    def describe(self):
+        parts = []
+        if self.recommended_by is not None:
+            parts.append(f"by {self.recommended_by}")
+        if self.year_from is not None:
+            years = str(self.year_from) if self.year_from == self.year_to else f"{self.year_from}-{self.year_to}"
+            parts.append(f"year {years}")
+        if self.watched_after is not None:
+            parts.append(f"watched after {datetime.fromtimestamp(self.watched_after, UTC):%d-%m-%Y}")
+        if self.watched_before is not None:
+            parts.append(f"watched before {datetime.fromtimestamp(self.watched_before - 86400, UTC):%d-%m-%Y}")
+        return ", ".join(parts)
+
+class WatchlistPages:
+    """Newest-first pages of the watchlist."""
+
+    details = staticmethod(rendering.watched_details)
+
+    def __init__(self, watchlist, movie_filter, page_size=PAGE_SIZE):
+        self.watchlist = watchlist
+        self.filter = movie_filter
+        self.page_size = page_size
+        self._offsets = [0]
+        self._length = len(watchlist)
+
+    def total(self):
+        """Entry count when it is known without scanning (unfiltered views)."""
+        return None if self.filter else len(self.watchlist)
+
+    def get_page(self, page):
+        """Return (entries, has_next) for a zero-based page number."""
+        if len(self.watchlist) != self._length:
+            # The watchlist changed while browsing, so the remembered offsets are stale
+            self._offsets = [0]
+            self._length = len(self.watchlist)
+
+        # Resume from the nearest page whose start is already known
+        known = min(page, len(self._offsets) - 1)
+        position = self._offsets[known]
+        entries = []
+        last = len(self.watchlist) - 1
+        while position <= last:
+            movie = self.watchlist[last - position]
+            position += 1
+            if not self.filter.matches(movie):
+                continue
+            if len(entries) == self.page_size:
+                if known == page:
+                    # One match past the page: it starts the next one
+                    return entries, True
+                known += 1
+                if known == len(self._offsets):
+                    self._offsets.append(position - 1)
+                entries = []
+            entries.append(movie)
+        return (entries if known == page else []), False
+
+class QueuePages:
+    """Pages of the queue ordered by scheduled time, unscheduled entries last."""
+
+    details = staticmethod(rendering.queued_details)
+
+    def __init__(self, queue, movie_filter, page_size=PAGE_SIZE):
+        self.queue = queue
+        self.filter = movie_filter
+        self.page_size = page_size
+
+    def total(self):
+        return None if self.filter else len(self.queue)
+
+    def get_page(self, page):
+        start = page * self.page_size
+        matching = (movie for movie in self.queue if self.filter.matches(movie))
+        # Only the entries up to the end of this page (plus one) are ordered
+        head = heapq.nsmallest(start + self.page_size + 1, matching, key=lambda movie: movie.time or float("inf"))
+        return head[start:start + self.page_size], len(head) > start + self.page_size
+
+class PaginatorView(View):
+    def __init__(self, author, source, title, color, empty_message):
+        super().__init__(timeout=180)
+        self.author = author
+        self.source = source
+        self.title = title
+        self.color = color
+        self.empty_message = empty_message
+        self.page = 0
+        self.has_next = False
+
+    def render(self):
+        entries, self.has_next = self.source.get_page(self.page)
+        embed = discord.Embed(title=self.title, color=self.color)
+        if self.source.filter:
+            embed.description = f"Filtered: {self.source.filter.describe()}"
+        start = self.page * self.source.page_size
+        for number, movie in enumerate(entries, start=start + 1):
+            embed.add_field(**rendering.field(movie, number, self.source.details))
+        if not entries:
+            embed.add_field(name="Nothing here", value=self.empty_message, inline=False)
+
+        total = self.source.total()
+        if total is not None:
+            pages = max(1, -(-total // self.source.page_size))
+            embed.set_footer(text=f"Page {self.page + 1} of {pages} ({total} movies)")
+        else:
+            embed.set_footer(text=f"Page {self.page + 1}")
+
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = not self.has_next
+        return embed
+
+    async def _turn(self, interaction, step):
+        if interaction.user != self.author:
+            await interaction.response.send_message(
+                "These pages are not for you. Run the command yourself to browse.", ephemeral=True
+            )
+            return
+        self.page = max(0, self.page + step)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction: Interaction, button: Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction: Interaction, button: Button):
+        await self._turn(interaction, 1)
@@ -0,0 +1,89 @@
+# Ranking of the recommendations
+#
+# "votes" ranks by vote count, as the board always has. Two time-aware modes
+# let old picks sink instead of holding the top of the board forever:
+#
+# - "hot": Reddit's hot formula, log10(votes) plus the recommendation time
+#   scaled by `hot_seconds` (a 10x vote lead is worth being that much newer).
+# - "decay": every vote loses half its weight each `half_life` seconds, and
+#   entries rank by the sum of their votes' current weights. The
+#   recommendation itself counts as one vote, so a new pick is not buried
+#   under old ones with a single vote.
+#
+# Neither ordering changes just because time passes. A hot score only
+# depends on the votes and the recommendation time, and decaying every vote
+# by the same factor keeps the sums in the same order, so "decay" ranks by
+# the time-independent log2 of the sums scaled to a fixed epoch. An entry's
+# key therefore only has to be recomputed when the entry itself changes.
+# Ranking keeps the keys in a sorted list and, when asked for the order,
+# re-scores only the entries whose `version` moved since they were scored.
+
+import bisect
+import itertools
+import math
+
+MODES = ("votes", "hot", "decay")
+MODE_DESCRIPTIONS = {
+    "votes": "most votes",
+    "hot": "votes and how recent the recommendation is",
+    "decay": "recent votes",
+}
+
+# Reddit's epoch for hot scores (8 December 2005)
+HOT_EPOCH = 1134028003
+
+def hot_score(votes, recommended_at, hot_seconds):
+    order = math.log10(max(abs(votes), 1))
+    sign = 1 if votes > 0 else -1 if votes < 0 else 0
+    return sign * order + ((recommended_at or HOT_EPOCH) - HOT_EPOCH) / hot_seconds
+
+def decay_key(vote_times, half_life):
+    """log2 of the vote weights as of HOT_EPOCH; higher means more recent weight."""
+    exponents = [((at or HOT_EPOCH) - HOT_EPOCH) / half_life for at in vote_times]
+    top = max(exponents)
+    return top + math.log2(sum(2.0 ** (exponent - top) for exponent in exponents))
+
+class Ranking:
+    def __init__(self, mode="votes", half_life=72 * 3600, hot_seconds=45000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown ranking mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.half_life = half_life
+        self.hot_seconds = hot_seconds
+        # (-key, arrival, title), best first
+        self._entries = []
+        # title -> (movie, version scored, entry)
+        self._scored = {}
+        # Equal keys keep the order in which entries were first seen, like a stable sort
+        self._arrival = {}
+        self._counter = itertools.count()
+        self.rescored = 0
+
+    def key(self, movie):
+        if self.mode == "hot":
+            return hot_score(movie.votes, movie.recommended_at, self.hot_seconds)
+        if self.mode == "decay":
+            return decay_key([movie.recommended_at, *movie.vote_times], self.half_life)
+        return movie.votes
+
+    def _drop(self, title):
+        movie, version, entry = self._scored.pop(title)
+        del self._entries[bisect.bisect_left(self._entries, entry)]
+
+    def ordered(self, recommendations):
+        """The recommendations, best first."""
+        for title in [title for title in self._scored if title not in recommendations]:
+            self._drop(title)
+            self._arrival.pop(title, None)
+        for title, movie in recommendations.items():
+            scored = self._scored.get(title)
+            if scored is not None and scored[0] is movie and scored[1] == movie.version:
+                continue
+            if scored is not None:
+                self._drop(title)
+            arrival = self._arrival.setdefault(title, next(self._counter))
+            entry = (-self.key(movie), arrival, title)
+            bisect.insort(self._entries, entry)
+            self._scored[title] = (movie, movie.version, entry)
+            self.rescored += 1
+        return [self._scored[title][0] for _, _, title in self._entries]
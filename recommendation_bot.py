@@ -1,39 +1,226 @@
 # Setup section
 
+import time
+
+# Startup timing: each phase records how long it took since the previous one
+STARTUP_BEGAN = time.perf_counter()
+startup_timings = {}
+_startup_phase_began = STARTUP_BEGAN
+
+def end_startup_phase(name):
+    """Record the duration of the startup phase that just finished."""
+    global _startup_phase_began
+    now = time.perf_counter()
+    startup_timings[name] = now - _startup_phase_began
+    _startup_phase_began = now
+
 import yaml
-from box import ConfigBox
 
+# keys.yaml only has flat keys, so a plain dict is enough and avoids importing box
 with open('keys.yaml', 'r') as config_file:
-    config = ConfigBox(yaml.safe_load(config_file))
-DISCORD_TOKEN = config.discord_bot_token
-OMDB_API_KEY = config.OMDB_api_token
-YOUR_GUILD_ID = config.GUILD_ID
-
+    config = yaml.safe_load(config_file) or {}
+DISCORD_TOKEN = config["discord_bot_token"]
+OMDB_API_KEY = config["OMDB_api_token"]
+YOUR_GUILD_ID = config["GUILD_ID"]
+# Optional JSONL file that records every command for replay_commands.py
+COMMAND_LOG_FILE = config.get("command_log_file", None)
+# Optional local port for the Prometheus metrics endpoint
+METRICS_PORT = config.get("metrics_port", None)
+# Optional event loop stall threshold in milliseconds; enables the watchdog
+STALL_THRESHOLD_MS = config.get("stall_threshold_ms", None)
+# Optional span outputs: a rotating JSON lines file and/or an OTLP/HTTP collector
+TRACE_FILE = config.get("trace_file", None)
+TRACE_OTLP_ENDPOINT = config.get("trace_otlp_endpoint", None)
+# How state files are stored: "json" (default), "both" (JSON plus a binary
+# snapshot) or "snapshot" (binary snapshot only, see state_snapshot.py)
+STATE_FORMAT = config.get("state_format", "json")
+# Worker threads for blocking calls (IMDb/OMDb, country lookups, file writes)
+# and how many seconds a command waits for one before giving up
+BLOCKING_WORKERS = config.get("blocking_workers", 4)
+BLOCKING_TIMEOUT = config.get("blocking_timeout", 20)
+# Seconds a movie lookup may take, retries included, before the command gives up
+METADATA_BUDGET = config.get("metadata_budget", 8)
+# Optional per-class rate limits, e.g. {"lookup": {"user": [4, 60], "guild": [30, 60]}}
+# (tokens per seconds; see throttle.py for the classes and defaults)
+COMMAND_LIMITS = config.get("command_limits", None)
+# Off-peak UTC hours [start, end) in which stored movie metadata is
+# revalidated in the background (null disables it), and entries per batch
+REVALIDATION_HOURS = config.get("revalidation_hours", [3, 7])
+REVALIDATION_BATCH = config.get("revalidation_batch", 5)
+# Directory of the append-only recommendation/vote event archive (null disables it)
+EVENT_ARCHIVE_DIR = config.get("event_archive_dir", "events")
+# Admin role and the bot's channels, each by name or ID. The board channel
+# also gets the scheduled announcements unless announcement_channel is set.
+ADMIN_ROLE = config.get("admin_role", "recommend-admin")
+COMMAND_CHANNEL = config.get("command_channel", "movie_night")
+BOARD_CHANNEL = config.get("board_channel", "movie-recommendations")
+ANNOUNCEMENT_CHANNEL = config.get("announcement_channel", None)
+# Optional per-guild overrides, e.g. {123: {"commands": "bot-cmds", "board": 456, "admin": "mods"}}
+GUILD_SETTINGS = config.get("guild_settings", None)
+# Gateway intents and caches: "default" or "low_memory" (see gateway_profile.py),
+# and optionally how many messages discord.py keeps cached (0 disables it)
+GATEWAY_PROFILE = config.get("gateway_profile", "default")
+MESSAGE_CACHE_SIZE = config.get("message_cache_size", None)
+# What !addtime does when a screening would overlap another queued one
+# ("warn" or "reject"); movies without a runtime are assumed to last 2 hours
+SCHEDULE_OVERLAPS = config.get("schedule_overlaps", "warn")
+# Seconds reaction votes are collected before they are saved in one batch
+VOTE_FLUSH_SECONDS = config.get("vote_flush_seconds", 10)
+# How the recommendations are ranked unless an admin picks another mode for
+# their guild with !ranking: "votes", "hot" or "decay" (see ranking.py)
+RANKING_MODE = config.get("ranking_mode", "votes")
+RANKING_HALF_LIFE_HOURS = config.get("ranking_half_life_hours", 72)
+RANKING_HOT_SECONDS = config.get("ranking_hot_seconds", 45000)
+end_startup_phase("config")
+
+# imdb, pycountry, pytz and requests are imported inside the functions that use
+# them, so their import cost is paid by the first command that needs them
+# rather than by every restart.
 import discord
 from discord.ui import View, Button
 from discord import Interaction
 from discord.ext import commands, tasks
-import requests
 import json
-import pytz
-import pycountry
 import asyncio
+import re
+import os
+import sys
+import atexit
+import logging
+import logging.handlers
+import queue as queue_module
+import weakref
 from datetime import datetime, UTC
-from imdb import IMDb
+
+from embed_layout import group_messages, number_parts, pack_blocks
+from blocking import BlockingExecutor, BlockingTimeout, ExecutorBusy
+import metrics
+import state_snapshot
+from records import (
+    parse_year, movies_from_json, movies_to_json, recommendations_from_json, recommendations_to_json
+)
+import rendering
+from stats import WatchStats
+from gateway_profile import client_options
+from guilds import GuildDirectory
+from schedule import Schedule
+from votes import VOTE_EMOJI, VoteBuffer
+import ranking
+import backup
+import event_archive
+import tracing
+from upstream import MetadataClient, UpstreamError, UpstreamUnavailable
+from loop_watchdog import LoopWatchdog, frame_resolver
+from throttle import Throttle, Throttled
+import cogs
+end_startup_phase("imports")
 
 shutdown_in_progress = False
+metrics_runner = None
+loop_watchdog = None
+blocking_executor = BlockingExecutor(max_workers=int(BLOCKING_WORKERS), timeout=float(BLOCKING_TIMEOUT))
+
+# Commands that spend IMDb/OMDb quota, and cheap read-only ones; the rest
+# share the default budget
+command_throttle = Throttle(COMMAND_LIMITS, command_classes={
+    "recommend": "lookup",
+    "watched": "lookup",
+    "displayrec": "display",
+    "displayqueue": "display",
+    "displaywatchlist": "display",
+    "next_movie": "display",
+    "schedule": "display",
+    "freeslot": "display",
+    "manual": "display",
+    "manual_admin": "display",
+    "stats": "display",
+})
+
+# Last embeds sent to each board message, so unchanged edits can be skipped
+board_last_embeds = {}
+# Board channel id -> section -> that section's messages, in part order
+board_messages = {}
+board_lock = asyncio.Lock()
+BOARD_SECTIONS = ("recommendations", "queue", "watchlist")
+BOARD_SECTION_TITLES = {"Movie Recommendations": "recommendations", "Movie Queue": "queue", "Movies Watched list": "watchlist"}
+BOARD_TITLE = re.compile(r"^(.+?)(?: \((\d+)/\d+\))?$")
 
 # File to store recommendations, queue, and watchlist
 RECOMMENDATIONS_FILE = "recommendations.json"
 QUEUE_FILE = "queue.json"
 WATCHLIST_FILE = "watchlist.json"
 TIMEZONE_FILE = "timezones.json"
+STATS_FILE = "stats.json"
+GUILDS_FILE = "guilds.json"
+VOTE_MESSAGES_FILE = "vote_messages.json"
+RANKING_FILE = "ranking.json"
+# Where !export writes backups and !import looks for them
+EXPORT_DIR = "exports"
+history = event_archive.EventArchive(EVENT_ARCHIVE_DIR) if EVENT_ARCHIVE_DIR else None
 
 # Intents and bot setup
-intents = discord.Intents.default()
-intents.messages = True
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+gateway_options = client_options(GATEWAY_PROFILE, MESSAGE_CACHE_SIZE)
+
+class TracedContext(commands.Context):
+    """Context that records every reply as a span."""
+
+    async def send(self, *args, **kwargs):
+        with tracing.span("reply.send"):
+            return await super().send(*args, **kwargs)
+
+class MovieNightBot(commands.Bot):
+    """Bot that traces each command invocation as a span tree."""
+
+    async def setup_hook(self):
+        end_startup_phase("login")
+        # Load the saved state exactly once, before connecting to the gateway
+        reload_lists()
+        end_startup_phase("state")
+        await load_command_extensions()
+
+    async def get_context(self, origin, /, *, cls=TracedContext):
+        return await super().get_context(origin, cls=cls)
+
+    async def invoke(self, ctx):
+        with tracing.span(
+            "command",
+            command=ctx.invoked_with,
+            guild=ctx.guild.id if ctx.guild else None,
+            author=ctx.author.id
+        ) as span:
+            await super().invoke(ctx)
+            if span is not None:
+                span.set("failed", ctx.command_failed)
+
+    async def close(self):
+        # Save reaction votes still waiting for their batch, and let queued
+        # state file writes land before the process exits
+        if vote_flush_task is not None:
+            vote_flush_task.cancel()
+        await flush_votes(refresh_board=False)
+        await blocking_executor.flush()
+        await super().close()
+
+if TRACE_FILE:
+    tracing.add_exporter(tracing.JsonLinesExporter(TRACE_FILE))
+
+# Command log lines are appended by a logging queue thread, in order, so
+# logging a command never waits on the disk
+command_log = logging.getLogger("command_log")
+command_log.setLevel(logging.INFO)
+command_log.propagate = False
+if COMMAND_LOG_FILE:
+    command_log_records = queue_module.SimpleQueue()
+    command_log_handler = logging.FileHandler(COMMAND_LOG_FILE, mode="a")
+    command_log_handler.setFormatter(logging.Formatter("%(message)s"))
+    command_log.addHandler(logging.handlers.QueueHandler(command_log_records))
+    command_log_listener = logging.handlers.QueueListener(command_log_records, command_log_handler)
+    command_log_listener.start()
+    atexit.register(command_log_listener.stop)
+if TRACE_OTLP_ENDPOINT:
+    tracing.add_exporter(tracing.OtlpHttpExporter(TRACE_OTLP_ENDPOINT))
+
+bot = MovieNightBot(command_prefix="!", **gateway_options)
 
 # Helper functions
 
@@ -71,14 +258,25 @@ class ConfirmationView(View):
             )
 
 def has_recommend_admin():
-    """Custom check to see if the user has the 'recommend-admin' role."""
+    """Custom check to see if the user has the admin ('recommend-admin') role."""
     async def predicate(ctx):
-        return "recommend-admin" in [role.name for role in ctx.author.roles]
+        with tracing.span("check.permission"):
+            return guild_directory.is_admin(ctx.guild, ctx.author)
     return commands.check(predicate)
 
+_imdb_client = None
+
+# Create the IMDb client on first use and reuse it afterwards
+def get_imdb_client():
+    global _imdb_client
+    if _imdb_client is None:
+        from imdb import IMDb
+        _imdb_client = IMDb()
+    return _imdb_client
+
 # Helper function to get IMDB id from Movie name
 def get_imdb_id_from_name(movie_name):
-    ia = IMDb()
+    ia = get_imdb_client()
     # Search for the movie by name
     movies = ia.search_movie(movie_name)
     if movies:
@@ -88,12 +286,87 @@ def get_imdb_id_from_name(movie_name):
     else:
         return None
 
-# Helper function to fetch movie details from OMDb API
-def fetch_movie_details(movie_name):
-    movie_id = get_imdb_id_from_name(movie_name)
+# Helper function to look a movie up on IMDb and fetch its details from the
+# OMDb API, without caching or retries (see fetch_movie_details)
+def lookup_movie(movie_name, timeout):
+    with tracing.span("upstream.imdb"), metrics.track_upstream("imdb"):
+        try:
+            movie_id = get_imdb_id_from_name(movie_name)
+        except Exception as e:
+            raise UpstreamError(f"IMDb search failed: {e}")
+    if movie_id is None:
+        metrics.UPSTREAM_NOT_FOUND.labels("imdb").inc()
+        # Same shape as OMDb's own "not found" answer
+        return {"Response": "False", "Error": "Movie not found!"}
+
     url = f"http://www.omdbapi.com/?i=tt{movie_id}&apikey={OMDB_API_KEY}"
-    response = requests.get(url)
-    return response.json()
+    with tracing.span("upstream.omdb"), metrics.track_upstream("omdb"):
+        import requests
+        try:
+            response = requests.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            raise UpstreamError(f"OMDb request failed: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise UpstreamError(f"OMDb returned HTTP {response.status_code}")
+        try:
+            movie_data = response.json()
+        except ValueError:
+            raise UpstreamError(f"OMDb returned an unreadable response (HTTP {response.status_code})")
+    if movie_data.get("Response") != "True":
+        # A title nobody can find is a working lookup with no result, not an
+        # upstream failure; OMDb's other errors (bad key, request limit) are
+        if "not found" in str(movie_data.get("Error", "")).lower():
+            metrics.UPSTREAM_NOT_FOUND.labels("omdb").inc()
+        else:
+            metrics.UPSTREAM_FAILURES.labels("omdb").inc()
+    return movie_data
+
+metadata_client = MetadataClient(
+    lookup_movie,
+    background=lambda refresh: blocking_executor.submit(refresh, task="metadata refresh"),
+    budget=float(METADATA_BUDGET)
+)
+
+# Helper function to fetch movie details, through the cache, retries and
+# circuit breaker of metadata_client. Blocks, so commands run it on the
+# blocking executor.
+def fetch_movie_details(movie_name):
+    with tracing.span("metadata.lookup", query=movie_name):
+        return metadata_client.get(movie_name)
+
+# Write a state file in the configured format(s), recording how long it took
+# and how many bytes it wrote. `data` must be a fresh copy (the *_to_json
+# helpers build one): the write happens later, on the blocking executor.
+def write_state_file(filename, data):
+    def write():
+        written = 0
+        with tracing.span("persistence", file=filename) as span, metrics.STORAGE_FLUSH_LATENCY.labels(filename).time():
+            if STATE_FORMAT in ("json", "both"):
+                payload = json.dumps(data, indent=4)
+                # Write aside and rename, so a crash mid-write never leaves a torn file
+                with open(filename + ".tmp", "w") as file:
+                    file.write(payload)
+                os.replace(filename + ".tmp", filename)
+                written += len(payload)
+            if STATE_FORMAT in ("snapshot", "both"):
+                written += state_snapshot.write_snapshot(filename, data)
+            if span is not None:
+                span.set("bytes", written)
+        metrics.STORAGE_FLUSH_BYTES.labels(filename).inc(written)
+
+    blocking_executor.write(filename, write)
+
+# Read a state file from whichever of its snapshot and JSON is newer, so
+# switching state_format back to "json" does not load stale JSON
+def read_state_file(filename, default):
+    data = state_snapshot.read_snapshot(filename)
+    if data is not None:
+        return data
+    try:
+        with open(filename, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
 
 def load_country_aliases(filename='country_aliases.json'):
     try:
@@ -108,69 +381,149 @@ def load_country_aliases(filename='country_aliases.json'):
 
 # Load timezones from file
 def load_timezones():
-    try:
-        with open(TIMEZONE_FILE, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return {}
+    return read_state_file(TIMEZONE_FILE, {})
 
 # Save timezones to file
 def save_timezones(timezones):
-    with open(TIMEZONE_FILE, "w") as file:
-        json.dump(timezones, file, indent=4)
+    write_state_file(TIMEZONE_FILE, timezones)
 
 # Helper function to load recommendations from file
 def load_recommendations():
-    try:
-        with open(RECOMMENDATIONS_FILE, "r") as file:
-            loaded_json =  json.load(file)
-        # print(f"Loaded Recommendation: \n{loaded_json}")
-        return loaded_json
-    except FileNotFoundError:
-        return {}
+    loaded_json = read_state_file(RECOMMENDATIONS_FILE, {})
+    # print(f"Loaded Recommendation: \n{loaded_json}")
+    loaded = recommendations_from_json(loaded_json)
+    # Entries saved before recommendation and vote times were recorded count as
+    # made now; saved right away, so they are not made "now" again next start
+    now = int(time.time())
+    stamped = [movie.fill_missing_times(now) for movie in loaded.values()]
+    if any(stamped):
+        save_recommendations(loaded)
+    return loaded
 
 # Helper function to save recommendations to file
 def save_recommendations(data):
     # print(f"Saved Recommendations:\n{data}")
-    with open(RECOMMENDATIONS_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+    write_state_file(RECOMMENDATIONS_FILE, recommendations_to_json(data))
 
 # Load queue from file
 def load_queue():
-    try:
-        with open(QUEUE_FILE, "r") as file:
-            loaded_json =  json.load(file)
-        # print(f"Loaded Queue: \n{loaded_json}")
-        return loaded_json
-    except FileNotFoundError:
-        return []
+    loaded_json = read_state_file(QUEUE_FILE, [])
+    # print(f"Loaded Queue: \n{loaded_json}")
+    return movies_from_json(loaded_json)
 
 # Save queue to file
 def save_queue(data):
     # print(f"Saved Queue:\n{data}")
-    with open(QUEUE_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+    write_state_file(QUEUE_FILE, movies_to_json(data))
 
 # Load watchlist from file
 def load_watchlist():
-    try:
-        with open(WATCHLIST_FILE, "r") as file:
-            loaded_json =  json.load(file)
-        # print(f"Loaded Watched List: \n{loaded_json}")
-        return loaded_json
-    except FileNotFoundError:
-        return []
+    loaded_json = read_state_file(WATCHLIST_FILE, [])
+    # print(f"Loaded Watched List: \n{loaded_json}")
+    return movies_from_json(loaded_json)
 
 # Save watchlist to file
 def save_watchlist(data):
     # print(f"Saved Watched List:\n{data}")
-    with open(WATCHLIST_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+    write_state_file(WATCHLIST_FILE, movies_to_json(data))
+
+# Load the watch statistics, seeding them from the current state the first time
+def load_stats():
+    data = read_state_file(STATS_FILE, None)
+    if data is None:
+        stats = WatchStats.rebuild(recommendations, queue, watchlist)
+        write_state_file(STATS_FILE, stats.to_dict())
+        return stats
+    return WatchStats.from_dict(data)
+
+def save_stats():
+    write_state_file(STATS_FILE, watch_stats.to_dict())
+
+# Role and channel IDs resolved per guild, remembered so renames keep working
+def load_guilds():
+    return GuildDirectory(
+        roles={"admin": ADMIN_ROLE},
+        channels={
+            "commands": COMMAND_CHANNEL,
+            "board": BOARD_CHANNEL,
+            "announcements": ANNOUNCEMENT_CHANNEL or BOARD_CHANNEL,
+        },
+        overrides=GUILD_SETTINGS,
+        saved=read_state_file(GUILDS_FILE, {}),
+        on_change=save_guilds
+    )
+
+def save_guilds():
+    write_state_file(GUILDS_FILE, guild_directory.to_dict())
+
+# Message id -> title of the recommendation members vote on by reacting to it
+def load_vote_messages():
+    return {int(message_id): title for message_id, title in read_state_file(VOTE_MESSAGES_FILE, {}).items()}
+
+# Guild id -> ranking mode picked with !ranking
+def load_ranking_modes():
+    return {int(guild_id): mode for guild_id, mode in read_state_file(RANKING_FILE, {}).items()
+            if mode in ranking.MODES}
+
+def save_ranking_modes():
+    write_state_file(RANKING_FILE, {str(guild_id): mode for guild_id, mode in ranking_modes.items()})
+
+def ranking_mode(guild):
+    return ranking_modes.get(guild.id, RANKING_MODE) if guild is not None else RANKING_MODE
+
+def ranked_recommendations(guild):
+    """The recommendations in the order of the guild's ranking mode, best first."""
+    mode = ranking_mode(guild)
+    if mode not in rankings:
+        rankings[mode] = ranking.Ranking(mode, half_life=float(RANKING_HALF_LIFE_HOURS) * 3600,
+                                         hot_seconds=float(RANKING_HOT_SECONDS))
+    return rankings[mode].ordered(recommendations)
+
+def save_vote_messages():
+    # Messages of movies that left the recommendations no longer take votes
+    for message_id in [message_id for message_id, title in vote_messages.items() if title not in recommendations]:
+        del vote_messages[message_id]
+    write_state_file(VOTE_MESSAGES_FILE, {str(message_id): title for message_id, title in vote_messages.items()})
+
+def board_channel(guild):
+    """The guild's board channel (#movie-recommendations), or None."""
+    return guild_directory.channel(guild, "board") if guild is not None else None
+
+def first_channel(key):
+    """The first of the bot's guilds that has a channel for `key`, for the startup messages."""
+    for guild in bot.guilds:
+        channel = guild_directory.channel(guild, key)
+        if channel is not None:
+            return channel
+    return None
+
+# Events recorded while !import swaps the archive directories, as
+# (event, guild id, member id, title, unix time); None when no swap is running
+held_events = None
+
+def append_event(event, guild_id, user_id, title):
+    """Append an event to the archive, or hold it until an import's swap is done."""
+    if held_events is not None:
+        held_events.append((event, guild_id, user_id, title, int(time.time())))
+    elif history is not None:
+        history.append(event, guild_id, user_id, title)
+
+def queue_history_flush():
+    if history is not None and held_events is None:
+        blocking_executor.write(history.tail_path, history.flush)
+
+# Record events in the archive and queue them to be written
+def archive_events(ctx, event, titles):
+    guild_id = ctx.guild.id if ctx.guild else 0
+    for title in titles:
+        append_event(event, guild_id, ctx.author.id, title)
+    queue_history_flush()
 
 def reload_lists(name=None):
     """Function to reload the global lists that the bot uses"""
     # Reload the global variables
-    global recommendations, queue, watchlist, watched_titles
+    global recommendations, queue, watchlist, watched_titles, watch_stats, guild_directory, vote_messages
+    global ranking_modes
 
     # Block for recommendations reload
     if name == 'recommends' or name is None:
@@ -179,11 +532,27 @@ def reload_lists(name=None):
     # Block for queue reload
     if name == 'queue' or name is None:
         queue = load_queue()
+        schedule.rebuild(queue)
     
     # Block for watchlist reload
     if name == 'watchlist' or name is None:
         watchlist = load_watchlist()
-        watched_titles = [movie['title'] for movie in watchlist]
+        watched_titles = [movie.title for movie in watchlist]
+
+    if name is None:
+        watch_stats = load_stats()
+        guild_directory = load_guilds()
+        vote_messages = load_vote_messages()
+        ranking_modes = load_ranking_modes()
+
+def get_timezone(name):
+    """The pytz timezone called `name`, or None if there is no such timezone."""
+    import pytz
+
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return None
 
 def get_timezones_by_country(country_code):
     """
@@ -195,6 +564,8 @@ def get_timezones_by_country(country_code):
     Returns:
         list: A list of timezones for the country or an error message if invalid.
     """
+    import pytz
+
     try:
         # Convert country code to uppercase to handle case insensitivity
         country_code = country_code.upper()
@@ -218,12 +589,15 @@ def get_country_code(country_name):
     Returns:
         str: The country code if found, or None if the country is invalid.
     """
+    import pycountry
+
     # Normalize the input to lowercase
     country_name = country_name.lower()
 
     # Check if the country name is in the aliases
-    if country_name in COMMON_COUNTRY_ALIASES:
-        country_name = COMMON_COUNTRY_ALIASES[country_name]
+    aliases = get_country_aliases()
+    if country_name in aliases:
+        country_name = aliases[country_name]
 
     try:
         country = pycountry.countries.lookup(country_name)
@@ -241,6 +615,8 @@ def get_timezones_by_country_name(country_name):
     Returns:
         str: A list of timezones or an error message if invalid.
     """
+    import pytz
+
     # Get the country code from the name
     country_code = get_country_code(country_name)
     if not country_code:
@@ -253,714 +629,330 @@ def get_timezones_by_country_name(country_name):
     else:
         return f"No timezones found for country: `{country_name}`."
 
-# Initializing recommendations, queue, and watchlist
-recommendations = load_recommendations()
-queue = load_queue()
-watchlist = load_watchlist()
-watched_titles = [movie['title'] for movie in watchlist]
-
-# Load the country aliases from the JSON file
-COMMON_COUNTRY_ALIASES = load_country_aliases()
+# Recommendations, queue, and watchlist are loaded once in setup_hook, before
+# the bot connects
+recommendations = {}
+queue = []
+# Start and end of every scheduled movie in the queue; kept in step with the
+# queue wherever a movie's time changes or it leaves the queue
+schedule = Schedule()
+watchlist = []
+watched_titles = []
+watch_stats = WatchStats()
+guild_directory = None
+vote_messages = {}
+ranking_modes = {}
+# Mode -> ranking.Ranking, each keeping its order up to date as entries change
+rankings = {}
+# Reaction votes waiting for the next batch, and the task that will apply them
+vote_buffer = VoteBuffer()
+vote_flush_task = None
+
+# The country aliases are only needed by the timezone lookups
+COMMON_COUNTRY_ALIASES = None
+
+def get_country_aliases():
+    """Load the country aliases from the JSON file on first use."""
+    global COMMON_COUNTRY_ALIASES
+    if COMMON_COUNTRY_ALIASES is None:
+        COMMON_COUNTRY_ALIASES = load_country_aliases()
+    return COMMON_COUNTRY_ALIASES
 
 # Commands
+#
+# The command groups live in extensions under cogs/ (see cogs/__init__.py) so
+# they can be reloaded with !reload; they reach this module's state through
+# cogs.core. Everything below stays loaded for the life of the process.
+cogs.core = sys.modules[__name__]
+COMMAND_EXTENSIONS = (
+    "cogs.scheduling",
+    "cogs.movie_queue",
+    "cogs.watchlist",
+    "cogs.recommendations",
+    "cogs.display",
+    "cogs.backups",
+    "cogs.manual",
+)
+
+async def load_command_extensions():
+    for extension in COMMAND_EXTENSIONS:
+        if extension not in bot.extensions:
+            await bot.load_extension(extension)
 
-## Commands for time and scheduling
-
-@bot.command(name="country_code_timezones", aliases=["cctz", "timezones_by_country_code"])
-async def countrycode_timezones(ctx, country_code: str):
-    """
-    Get a list of timezones for a specific country.
-    """
-    if not await check_channel(ctx):
-        return
-
-    timezones = get_timezones_by_country(country_code)
-    
-    if isinstance(timezones, list):
-        timezone_list = "\n".join(timezones)
-        await ctx.send(f"Timezones for `{country_code.upper()}`:\n```\n{timezone_list}\n```")
-    else:
-        await ctx.send(timezones)
-
-@bot.command(name="country_name_timezones", aliases=["cntz", "timezones_by_country_name"])
-async def countryname_timezones(ctx, *, country_name: str):
-    """
-    Get a list of timezones for a specific country by name.
-    """
-    if not await check_channel(ctx):
-        return
-
-    timezones = get_timezones_by_country_name(country_name)
-    
-    if isinstance(timezones, list):
-        timezone_list = "\n".join(timezones)
-        await ctx.send(f"Timezones for `{country_name.title()}`:\n```\n{timezone_list}\n```")
-    else:
-        await ctx.send(timezones)
-
-# Command to set timezone
-@bot.command(name="settime", aliases=['time'])
-@has_recommend_admin()
-async def set_timezone(ctx, timezone: str):
-    """Set the admin's timezone."""
-    if not await check_channel(ctx):
-        return
-
-    try:
-        # Validate the timezone
-        pytz.timezone(timezone)
-
-        # Load existing timezones
-        timezones = load_timezones()
-
-        # Update the timezone for the admin
-        timezones[str(ctx.author.id)] = timezone
-
-        # Save the updated timezones
-        save_timezones(timezones)
-
-        await ctx.send(f"Your timezone has been set to `{timezone}`.")
-    except pytz.UnknownTimeZoneError:
-        await ctx.send(f"Invalid timezone: `{timezone}`. Please use a valid timezone.")
-
-# Command to add time to a movie
-@bot.command(name="addtime", aliases=['at'])
-@has_recommend_admin()
-async def add_time(ctx, movie_name: str, local_time: str):
-    """Add time to a movie using the admin's timezone."""
-    global queue
-    if not await check_channel(ctx):
-        return
-    
-    try:
-        # Load the admin's timezone
-        timezones = load_timezones()
-        admin_timezone = timezones.get(str(ctx.author.id), "UTC")  # Default to UTC if not set
-        user_timezone = pytz.timezone(admin_timezone)
-
-        # Parse the local time and localize it
-        naive_time = datetime.strptime(local_time, "%d-%m-%Y %H:%M")
-        aware_time = user_timezone.localize(naive_time)
-        unix_time = int(aware_time.timestamp())
-
-        for movie in queue:
-            if movie["title"].lower() == movie_name.lower():
-                movie["time"] = unix_time
-                break
-        else:
-            await ctx.send(f"Movie `{movie_name}` not found in the queue.")
-            return
-
-        save_queue(queue)
-
-        # Update the recommendation channel with the latest data
-        channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-        if channel:
-            await update_recommendation_channel(channel, section="queue")
-
-        # Notify the user
-        embed = discord.Embed(
-            title=f"🎥 Time for `{movie["title"]}` set to <t:{unix_time}:F> 🎥 in <t:{unix_time}:R>",
-            description=f"**{movie['title']}** (Released: {movie['release_year']})\n"
-                        f"Runtime: {movie['runtime']}\n"
-                        f"Recommended by: {movie['recommended_by']}",
-            color=discord.Color.blue()
-        )
-        await ctx.send(embed=embed)
-
-    except ValueError:
-        await ctx.send("Invalid time format. Please use `DD-MM-YYYY HH:MM`.")
-    except pytz.UnknownTimeZoneError:
-        await ctx.send("There was an error with your timezone settings. Please reconfigure using `!set_timezone`.")
-
-@bot.command(name="next_movie", aliases=["upcoming", "nm"])
-async def show_next_movie(ctx):
-    """Show the next upcoming movie in the queue based on the scheduled time, including the poster."""
-    if not queue:
-        await ctx.send("The queue is empty.")
-        return
+## Management commands and functions
 
-    # Filter movies with a valid time and sort by time
-    upcoming_movies = sorted(
-        (movie for movie in queue if "time" in movie and movie["time"]),
-        key=lambda m: m["time"]
-    )
+@tasks.loop(seconds=60)  # Check every 60 seconds
+async def announce_scheduled_movies():
+    current_time = datetime.now(UTC)  # Get the current time in UTC
+    due = schedule.due(current_time.timestamp())
+    if not due:
+        return  # Nothing has started since the last check
+
+    # Fetch the channel where the announcements will be sent
+    guild = bot.get_guild(YOUR_GUILD_ID)
+    announcement_channel = guild_directory.channel(guild, "announcements") if guild else None
+    # Take the movies out of the queue before announcing them (or once they
+    # are over), so a check that runs while an announcement is being sent
+    # does not announce them again
+    playing = []
+    removed = False
+    for movie in due:
+        start, end = schedule.interval(movie)
+        if current_time.timestamp() < end:
+            if not announcement_channel:
+                continue  # Nowhere to announce it yet; try again next minute
+            playing.append(movie)
+        schedule.remove(movie)
+        if movie in queue:
+            queue.remove(movie)
+        removed = True
+    if removed:
+        save_queue(queue)  # Save the updated queue
 
-    if upcoming_movies:
-        next_movie = upcoming_movies[0]
+    for movie in playing:
+        metrics.SCHEDULER_LAG.observe(max(0, current_time.timestamp() - movie.time))
+        # Create the announcement embed
         embed = discord.Embed(
-            title="Next Upcoming Movie",
-            description=(
-                f"**{next_movie['title']}**\n"
-                f"Release Year: {next_movie['release_year']}\n"
-                f"Runtime: {next_movie['runtime']} minutes\n"
-                f"Recommended By: {next_movie['recommended_by']}\n"
-                f"Scheduled At: <t:{next_movie['time']}:f>\n"
-                f"**Starts in <t:{next_movie['time']}:R>**\n"
-            ),
+            title="🎥 Now Playing 🎥",
+            description=f"**{movie.title}** (Released: {movie.release_year})\n"
+                        f"Runtime: {movie.runtime}\n"
+                        f"Recommended by: {movie.recommended_by}",
             color=discord.Color.blue()
         )
+        embed.set_image(url=movie.poster_url or "")
+        await announcement_channel.send(embed=embed)
 
-        # Add the poster URL if available
-        if "poster_url" in next_movie and next_movie["poster_url"]:
-            embed.set_image(url=next_movie["poster_url"])
-
-        await ctx.send(embed=embed)
-    else:
-        await ctx.send("No upcoming movies are scheduled in the queue.")
-
-
-## Commands for Queue
+# Reaction votes
 
-@bot.command(name="queue", aliases=['q'])
-@has_recommend_admin()
-async def add_to_queue(ctx, *, movie_name):
+# A burst this large is applied right away instead of waiting for the timer
+VOTE_BATCH_LIMIT = 200
 
-    if not await check_channel(ctx):
+async def post_vote_message(destination, embed, title):
+    """Send a recommendation's embed (to a channel or context) and make the message take votes by reaction."""
+    embed.set_footer(text=f"Votes: {recommendations[title].votes} · React with {VOTE_EMOJI} to vote")
+    message = await destination.send(embed=embed)
+    try:
+        await message.add_reaction(VOTE_EMOJI)
+    except discord.HTTPException as e:
+        # Members can still add the reaction themselves
+        print(f"Could not add the vote reaction to {title}: {e}")
+    vote_messages[message.id] = title
+    save_vote_messages()
+    return message
+
+def buffer_vote_reaction(payload):
+    """Queue a reaction on a vote message; the vote is applied with the next batch."""
+    global vote_flush_task
+    title = vote_messages.get(payload.message_id)
+    if title is None or str(payload.emoji) != VOTE_EMOJI or payload.user_id == bot.user.id:
         return
-
-    if movie_name not in recommendations:
-        await ctx.send(f"The movie `{movie_name}` is not in the recommendations list.")
+    guild_id = payload.guild_id or 0
+    if payload.event_type == "REACTION_ADD":
+        vote_buffer.add(title, guild_id, payload.user_id, payload.member.name if payload.member else None,
+                        int(time.time()))
+    else:
+        vote_buffer.remove(title, guild_id, payload.user_id)
+
+    if len(vote_buffer) >= VOTE_BATCH_LIMIT:
+        if vote_flush_task is not None:
+            vote_flush_task.cancel()
+        vote_flush_task = asyncio.create_task(flush_votes())
+    elif vote_flush_task is None:
+        vote_flush_task = asyncio.create_task(flush_votes(delay=float(VOTE_FLUSH_SECONDS)))
+
+async def flush_votes(delay=0, refresh_board=True):
+    """Apply the buffered reaction votes, then save and refresh the board once for all of them."""
+    global vote_flush_task
+    if delay:
+        await asyncio.sleep(delay)
+    if vote_flush_task is asyncio.current_task():
+        vote_flush_task = None
+
+    with tracing.span("state.mutation", action="reaction_votes") as span:
+        votes, retractions = vote_buffer.apply(recommendations)
+        for event, count, changes in ((event_archive.VOTED, 1, votes), (event_archive.UNVOTED, -1, retractions)):
+            for guild_id, user_id, movie in changes:
+                watch_stats.record_vote(movie, count=count)
+                append_event(event, guild_id, user_id, movie.title)
+        if span is not None:
+            span.set("votes", len(votes))
+            span.set("retractions", len(retractions))
+    if not votes and not retractions:
         return
-
-    # Add the movie to the queue, inheriting details from recommendations
-    movie_data = recommendations.pop(movie_name)
-    queue.append({
-        "title": movie_name,
-        "release_year": movie_data["release_year"],
-        "runtime": movie_data["runtime"],
-        "recommended_by": movie_data["recommended_by"],
-        "poster_url": movie_data["poster_url"]
-    })
+    queue_history_flush()
     save_recommendations(recommendations)
-    save_queue(queue)
-
-    channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-    if channel:
-        await update_recommendation_channel(channel, section='queue')
-
-    await ctx.send(f"The movie `{movie_name}` has been added to the queue.")
-
-@bot.command(name="announce", aliases=['am'])
-@has_recommend_admin()
-async def announce_playing_movie(ctx, *, movie_name: str):
-    # Check if the movie is in the queue
-    if not await check_channel(ctx):
-        return
-
-    movie_to_watch = next((movie for movie in queue if movie["title"] == movie_name), None)
-    
-    if not movie_to_watch:
-        await ctx.send(f"The movie `{movie_name}` is not in the queue!")
-        return
-
-    # Create the announcement embed
-    embed = discord.Embed(
-        title="🎥 Now Playing 🎥",
-        description=f"**{movie_to_watch['title']}** (Released: {movie_to_watch['release_year']})\n"
-                    f"Runtime: {movie_to_watch['runtime']}\n"
-                    f"Recommended by: {movie_to_watch['recommended_by']}",
-        color=discord.Color.blue()
-    )
-    embed.set_image(url=movie_to_watch["poster_url"])
-    await ctx.send(embed=embed)
+    save_stats()
 
-
-@bot.command(name="deleteq", aliases=['delq'])
-@has_recommend_admin()
-async def remove_from_queue(ctx, *, movie_name: str):
-
-    # Check if the movie is in the queue
-    if not await check_channel(ctx):
-        return
-
-    movie_to_remove = next((movie for movie in queue if movie["title"] == movie_name), None)
-
-    if movie_to_remove:
-        # Remove the movie from the queue
-        queue.remove(movie_to_remove)
-        save_queue(queue)
-
-        # Update the recommendation channel with the latest data
-        channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
+    if refresh_board:
+        channel = board_channel(bot.get_guild(YOUR_GUILD_ID))
         if channel:
-            await update_recommendation_channel(channel, section="queue")
-
-        await ctx.send(f"The movie `{movie_name}` has been removed from the queue.")
-    else:
-        await ctx.send(f"The movie `{movie_name}` is not in the queue.")
-
-@bot.command(name="clearq")
-@has_recommend_admin()
-async def clear_queue(ctx):
-
-    if not await check_channel(ctx):
-        return
-
-    queue.clear()
-    save_queue(queue)
-
-    channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-    if channel:
-        # Update only the queue section
-        await update_recommendation_channel(channel, section="queue")
-
-    await ctx.send("The queue has been cleared.")
-
-## Commands for Watchlist
-
-@bot.command(name="watched", aliases=['w'])
-@has_recommend_admin()
-async def add_to_watchlist(ctx, *, movie_name):
-    """Add a movie to the watchlist, checking queue, recommendations, or searching."""
-    global watched_titles
-
-    if not await check_channel(ctx):
-        return
-
-    # Search for the movie
-    movie_data = fetch_movie_details(movie_name) 
-    movie_title = movie_data.get("Title", "N/A")
-    runtime = movie_data.get("Runtime", "N/A")
-    poster_url = movie_data.get("Poster", None)
-    release_year = movie_data.get("Year", "N/A")
-
-    # Check if the movie exists in the queue
-    for movie in queue:
-        if movie["title"].lower() == movie_title.lower():
-            queue.remove(movie)
-            watchlist.append(movie)
-            save_queue(queue)
-            save_watchlist(watchlist)
-            watched_titles = watched_titles.append(movie_name)
-            await ctx.send(f"The movie `{movie_name}` has been moved from the queue to the watchlist.")
-            
-            # Update recommendation channel
-            channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-            if channel:
-                await update_recommendation_channel(channel, section='watchlist')
-            return
-
-    # Check if the movie exists in recommendations
-    if movie_title in recommendations:
-        # Pop up a confirmation window
-        view = ConfirmationView(author=ctx.author, action="move the movie to the watchlist")
-        message = await ctx.send(
-            f"The movie `{movie_title}` is in recommendations. Do you want to move it to the watchlist?",
-            view=view,
-        )
-        await view.wait()
-
-        if view.value is True:
-            movie_data = recommendations.pop(movie_name)
-            watchlist.append(movie_data)
-            save_recommendations(recommendations)
-            save_watchlist(watchlist)
-            watched_titles = watched_titles.append(movie_name)
-            await ctx.send(f"The movie `{movie_name}` has been moved from recommendations to the watchlist.")
-            
-            # Update recommendation channel
-            channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-            if channel:
-                await update_recommendation_channel(channel, section='watchlist')
-        elif view.value is None:
-            await ctx.send("No response received. Action cancelled.")
-        return
-
-    if movie_data:
-        view = ConfirmationView(author=ctx.author, action="add the movie directly to the watchlist")
-        message = await ctx.send(
-            f"Found `{movie_title}` (Release year: {release_year}, Runtime: {runtime} mins). "
-            f"Do you want to add it to the watchlist?",
-            view=view,
-        )
-        await view.wait()
-
-        if view.value is True:
-            watchlist.append({
-                "title": movie_title,
-                "release_year": release_year,
-                "runtime": runtime,
-                "recommended_by": ctx.author.name,
-                "poster_url": poster_url
-            })
-            save_watchlist(watchlist)
-            watched_titles = watched_titles.append(movie_name)
-            await ctx.send(f"The movie `{movie_title}` has been added to the watchlist.")
-            
-            # Update recommendation channel
-            channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-            if channel:
-                await update_recommendation_channel(channel, section='watchlist')
-        elif view.value is None:
-            await ctx.send("No response received. Action cancelled.")
-    else:
-        await ctx.send(f"No results found for `{movie_name}`.")
+            await update_recommendation_channel(channel, section="recommendations")
 
-# @bot.command(name="watched", aliases=['w'])
-# @has_recommend_admin()
-# async def add_to_watchlist(ctx, *, movie_name):
+# Backups (see backup.py)
 
-#     global watched_titles
-#     if not await check_channel(ctx):
-#         return
-    
-#     for movie in queue:
-#         if movie["title"] == movie_name:
-#             movie_data = movie
-#             queue.remove(movie)
-#             break
-#     else:
-#         await ctx.send(f"The movie `{movie_name}` is not in the queue.")
-#         return
-
-#     # Add the movie to the watchlist, inheriting details from queue
-#     watchlist.append({
-#         "title": movie_data["title"],
-#         "release_year": movie_data["release_year"],
-#         "runtime": movie_data["runtime"],
-#         "recommended_by": movie_data["recommended_by"],
-#         "poster_url": movie_data["poster_url"]
-#     })
-#     save_queue(queue)
-#     save_watchlist(watchlist)
-#     watched_titles = watched_titles.append(movie_name)
-
-#     channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-#     if channel:
-#         await update_recommendation_channel(channel, section='watchlist')
-
-#     await ctx.send(f"The movie `{movie_name}` has been moved to the watchlist.")
-
-@bot.command(name="deletew", aliases=['delw'])
-@has_recommend_admin()
-async def remove_from_watchlist(ctx, *, movie_name: str):
+# Exports and imports stream the whole vote history, so they may take longer than other blocking calls
+BACKUP_TIMEOUT = 600
 
-    global watched_titles
-    if not await check_channel(ctx):
-        return
+async def export_backup(compress=True):
+    """Write a backup of the current state to EXPORT_DIR on a worker; returns (path, record counts)."""
+    name = f"movie-night-{datetime.now(UTC):%Y%m%d-%H%M%S}.jsonl" + (".gz" if compress else "")
+    path = os.path.join(EXPORT_DIR, name)
+    # The lists are copied here, between commands; the writing happens on a worker
+    state = {
+        "recommendations": recommendations_to_json(recommendations),
+        "queue": movies_to_json(queue),
+        "watchlist": movies_to_json(watchlist),
+        "timezones": await blocking_executor.run(load_timezones),
+    }
+    archive = history
 
-    # Check if the movie is in the watchlist
-    movie_to_remove = next((movie for movie in watchlist if movie["title"] == movie_name), None)
+    def export():
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        return backup.export_state(path, state, archive)
 
-    if movie_to_remove:
-        # Remove the movie from the watchlist
-        watchlist.remove(movie_to_remove)
-        save_watchlist(watchlist)
-        watched_titles = [movie['title'] for movie in watchlist]
+    counts = await blocking_executor.run(export, task="export", timeout=float(BACKUP_TIMEOUT))
+    return path, counts
 
-        # Update the recommendation channel with the latest data
-        channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-        if channel:
-            await update_recommendation_channel(channel, section="watchlist")
-
-        await ctx.send(f"The movie `{movie_name}` has been removed from the watchlist.")
-    else:
-        await ctx.send(f"The movie `{movie_name}` is not in the watchlist.")
+async def stage_import(path):
+    """Validate a backup on a worker, staging its vote history next to the live archive.
 
-@bot.command(name="clearw")
-@commands.has_permissions(administrator=True)
-async def clear_watchlist(ctx):
-
-    global watched_titles
-    if not await check_channel(ctx):
-        return
+    Raises backup.BackupError if it cannot be imported; nothing is changed then.
+    """
+    staging_dir = f"{EVENT_ARCHIVE_DIR}.import-{int(time.time())}" if history is not None else None
+    return await blocking_executor.run(
+        backup.read_backup, path, staging_dir, lambda zone: get_timezone(zone) is not None,
+        task="import", timeout=float(BACKUP_TIMEOUT)
+    )
 
-    watchlist.clear()
+async def apply_import(state):
+    """Replace the bot's state with a staged import; returns where the previous history was kept."""
+    global history, held_events, recommendations, queue, watchlist, watched_titles, watch_stats
+    kept = None
+    if state["staging"] is not None:
+        # Hold new events, let the old archive's queued writes land, then swap
+        # the directories; the held events go into whichever archive is live after
+        held_events = []
+        try:
+            await blocking_executor.flush()
+            kept = await blocking_executor.run(backup.swap_in_archive, state["staging"], EVENT_ARCHIVE_DIR)
+            history = event_archive.EventArchive(EVENT_ARCHIVE_DIR)
+        except BaseException:
+            backup.discard_staging(state["staging"])
+            raise
+        finally:
+            held, held_events = held_events, None
+            for event, guild_id, user_id, title, at in held:
+                history.append(event, guild_id, user_id, title, timestamp=at)
+            queue_history_flush()
+
+    # Nothing below awaits, so no command runs against a half-imported state
+    with tracing.span("state.mutation", action="import"):
+        # Reactions waiting for their batch were cast on the replaced recommendations
+        vote_buffer.apply({})
+        recommendations = recommendations_from_json(state["recommendations"])
+        now = int(time.time())
+        for movie in recommendations.values():
+            movie.fill_missing_times(now)
+        queue = movies_from_json(state["queue"])
+        schedule.rebuild(queue)
+        watchlist = movies_from_json(state["watchlist"])
+        watched_titles = [movie.title for movie in watchlist]
+        watch_stats = WatchStats.rebuild(recommendations, queue, watchlist)
+    save_recommendations(recommendations)
+    save_queue(queue)
     save_watchlist(watchlist)
-    watched_titles = []
-
-    channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-    if channel:
-        # Update only the watchlist section
-        await update_recommendation_channel(channel, section="watchlist")
-
-    await ctx.send("The watched list has been cleared.")
-
-## Commands for Recommendations
-
-@bot.command(name="recommend", aliases=['r'])
-async def recommend(ctx, *, movie_name: str):
-    
-    global watched_titles
-    if not await check_channel(ctx):
-        return
-
-    if len(recommendations) >= 20:
-        await ctx.send("The recommendations list is full (20 movies). Please wait until some movies are removed before recommending more.")
-        return
-
-    movie_data = fetch_movie_details(movie_name)
-    
-    movie_in_queue = next((movie for movie in queue if movie["title"] == movie_data.get('Title', 'N/A')), None)
-
-    if movie_in_queue:
-        await ctx.send(f"The movie `{movie_name}` is already in queue scheduled at <t:{movie_data['time']}:f>")
-        return
-
-    if movie_data.get('Title', 'N/A') in watched_titles:
-        await ctx.send(f"{movie_name} has already been watched. Ask admins for rewatching.")
-        return
-    
-    if movie_data.get("Response") == "True":
-        if movie_data.get('Title', 'N/A') not in recommendations:
-            # Fetch necessary details
-            movie_title = movie_data.get("Title", "N/A")
-            runtime = movie_data.get("Runtime", "N/A")
-            poster_url = movie_data.get("Poster", None)
-            release_year = movie_data.get("Year", "N/A")
-            plot = movie_data.get("Plot", "No plot information available.")
-            imdb_id = movie_data.get("imdbID", None)
-
-            imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "No IMDb link available"
-
-            
-            # Store the movie details along with votes and recommender
-            recommendations[movie_title] = {
-                "recommended_by": ctx.author.name,
-                "votes": 0,
-                "voters": [],
-                "runtime": runtime,
-                "poster_url": poster_url,
-                "release_year": release_year
-            }
-
-            save_recommendations(recommendations)
-
-            # Update the recommendation channel with the new movie
-            channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-            if channel:
-                await update_recommendation_channel(channel, section='recommendations')
-            embed = discord.Embed(
-                title=movie_title,
-                description=plot,
-                color=discord.Color.blue(),
-                url=imdb_url
-            )
-            embed.add_field(name="Runtime", value=runtime, inline=True)
-            embed.add_field(name="Release Year", value=release_year, inline=True)
-            embed.add_field(name="Recommended By", value=ctx.author.name, inline=True)
-            embed.set_thumbnail(url=poster_url)
-            embed.set_footer(text=f"Votes: 0")
-
-            await ctx.send(f"'{movie_name}' has been added to the recommendations!")
-            await ctx.send(embed=embed)
-        else:
-            # Movie already recommended, handle voting
-            movie = recommendations[movie_name]
-            
-            if ctx.author.id in movie["voters"]:
-                await ctx.send(f"You've already voted for '{movie_name}'. You can only vote once.")
-                return
-            
-            # Check if the user is the recommender
-            if ctx.author.name == movie["recommended_by"]:
-                await ctx.send(f"You cannot vote for your own recommendation, '{movie_name}'.")
-                return
-
-            # Add the user to the voters list and increment the vote
-            movie["voters"].append(ctx.author.id)
-            movie["votes"] += 1
-            save_recommendations(recommendations)
-
-            await ctx.send(f"You've voted for '{movie_name}'. It now has {movie['votes']} votes.")
-    else:
-        await ctx.send("Sorry, I couldn't find that movie.")
-
-@bot.command(name="vote")
-async def vote_movie(ctx, *, movie_name: str):
-
-    global recommendations
-    if not await check_channel(ctx):
+    save_timezones(state["timezones"])
+    save_stats()
+    save_vote_messages()
+    return kept
+
+# Background metadata revalidation
+
+# Seconds between two lookups of one batch, to stay well inside the OMDb quota
+REVALIDATION_PACE = 3
+revalidation_cursor = 0
+# Incomplete entries already retried during the current walk, so one that
+# OMDb cannot complete does not take a slot in every batch
+revalidation_retried = weakref.WeakSet()
+
+def in_revalidation_hours(now):
+    if not REVALIDATION_HOURS:
+        return False
+    start, end = REVALIDATION_HOURS
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+def next_revalidation_batch(size):
+    """Pick the next entries to revalidate: incomplete ones first, then a rolling walk over the rest."""
+    global revalidation_cursor
+    entries = ([("recommendations", movie) for movie in recommendations.values()]
+               + [("queue", movie) for movie in queue]
+               + [("watchlist", movie) for movie in watchlist])
+    if not entries:
+        return []
+    batch = [entry for entry in entries
+             if entry[1].is_incomplete() and entry[1] not in revalidation_retried][:size]
+    for section, movie in batch:
+        revalidation_retried.add(movie)
+    while len(batch) < min(size, len(entries)):
+        if revalidation_cursor >= len(entries):
+            # A full walk is done; incomplete entries get another chance
+            revalidation_cursor = 0
+            revalidation_retried.clear()
+        entry = entries[revalidation_cursor]
+        revalidation_cursor += 1
+        if entry not in batch:
+            batch.append(entry)
+    return batch
+
+@tasks.loop(minutes=10)
+async def revalidate_metadata():
+    """Refresh year, runtime and poster of stored entries, one small batch per run."""
+    if not in_revalidation_hours(datetime.now(UTC)):
         return
-
-    if movie_name in recommendations:
-        movie = recommendations[movie_name]
-         
-        if ctx.author.id in movie["voters"]:
-            await ctx.send(f"You've already voted for '{movie_name}'. You can only vote once.")
-            return
-        
-        # Check if the user is the recommender
-        if ctx.author.name == movie["recommended_by"]:
-            await ctx.send(f"You cannot vote for your own recommendation, '{movie_name}'.")
-            return
-        
-        # Add the user to the voters list and increment the vote
-        movie["voters"].append(ctx.author.id)
-        movie["votes"] += 1
-        save_recommendations(recommendations)
-        
-        # Update the recommendation channel with the new movie
-        channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-        if channel:
-            await update_recommendation_channel(channel, section='recommendations')
-            
-        await ctx.send(f"Thank you! You've voted for '{movie_name}'. It now has {movie['votes']} votes.")
-    else:
-        await ctx.send(f"The movie `{movie_name}` is not in the recommended list.")
-
-# Remove a movie recommendation (User can remove only their own recommendations)
-@bot.command(name="delete", aliases=['del'])
-async def remove_recommendation(ctx, *, movie_name: str):
-    if not await check_channel(ctx):
+    # Low priority: leave the lookups to commands whenever they are waiting
+    if blocking_executor.queued or metadata_client.breaker.state != "closed":
         return
 
-    if movie_name in recommendations:
-        # Check if the user who is requesting removal is the one who recommended it or has admin privileges
-        if recommendations[movie_name]["recommended_by"] == ctx.author.name or ("recommend-admin" in [role.name for role in ctx.author.roles]):
-            del recommendations[movie_name]
-            save_recommendations(recommendations)
-
-            # Update the recommendation channel
-            channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
-            if channel:
-                await update_recommendation_channel(channel, section='recommendations')
-
-            await ctx.send(f"'{movie_name}' has been removed from the recommendations.")
-        else:
-            await ctx.send(f"You cannot remove '{movie_name}' because you did not recommend it.")
-    else:
-        await ctx.send(f"'{movie_name}' is not in the recommendations list.")
-
-@bot.command(name="clearrec")
-@has_recommend_admin()
-async def clear_recommendation(ctx):
-
-    global recommendations
-    if not await check_channel(ctx):
+    changed_sections = set()
+    with tracing.span("metadata.revalidate") as span:
+        for index, (section, movie) in enumerate(next_revalidation_batch(int(REVALIDATION_BATCH))):
+            if index:
+                await asyncio.sleep(REVALIDATION_PACE)
+            try:
+                movie_data = await blocking_executor.run(
+                    fetch_movie_details, movie.title, task="revalidate", timeout=float(METADATA_BUDGET)
+                )
+            except (UpstreamUnavailable, BlockingTimeout, ExecutorBusy) as e:
+                print(f"Stopping metadata revalidation for now: {e}")
+                break
+            # A title search can land on a remake; only patch the same movie
+            if movie_data.get("Response") != "True" or movie_data.get("Title", "").lower() != movie.title.lower():
+                continue
+            if movie.year is not None and parse_year(movie_data.get("Year")) not in (None, movie.year):
+                continue
+            if movie.patch_from_omdb(movie_data):
+                changed_sections.add(section)
+                if section == "queue" and movie.time:
+                    # The runtime may have changed, and with it the end of the screening
+                    schedule.add(movie)
+        if span is not None:
+            span.set("changed", sorted(changed_sections))
+
+    if not changed_sections:
         return
-    
-    recommendations.clear()
-    save_recommendations(recommendations)
-        
-    # Fetch the latest message from the channel
-    channel = discord.utils.get(ctx.guild.text_channels, name="movie-recommendations")
+    savers = {"recommendations": lambda: save_recommendations(recommendations),
+              "queue": lambda: save_queue(queue),
+              "watchlist": lambda: save_watchlist(watchlist)}
+    for section in changed_sections:
+        savers[section]()
+
+    # One board update per changed section for the whole batch
+    channel = board_channel(bot.get_guild(YOUR_GUILD_ID))
     if channel:
-        async for message in channel.history(limit=10):
-            if message.author == bot.user:
-                # Get the embed from the message
-                embed = message.embeds[0] if message.embeds else discord.Embed(title="Movie Recommendations", color=discord.Color.green())
-                
-                # Find and remove the recommendation field (index 0)
-                # Ensure that we only clear the "Recommendations" section
-                if len(embed.fields) > 0 and embed.fields[0].name == "Recommendations":
-                    embed.set_field_at(0, name="Recommendations", value="No movies recommended yet.", inline=False)
-
-                    # Edit the message to reflect the changes (only clearing the recommendation section)
-                    await message.edit(embed=embed)
-                    await ctx.send("The recommendation section has been cleared.")
-                    return
-
-    # If no appropriate message is found, send a message indicating nothing was found
-    await ctx.send("All recommendation are cleared.")
-
-## Display commands
-
-@bot.command(name="displayrec", aliases=['dr', 'display'])
-async def display_recommendations(ctx):
-    # Ensure recommendations exist
-    if not recommendations:
-        await ctx.send("No recommendations available at the moment.")
-        return
-
-    # Create an embed for the top 5 recommendations
-    embed = discord.Embed(title="Top 5 Movie Recommendations", color=discord.Color.blue())
-    
-    # Sort and display the top 5 recommendations by votes
-    top_recommendations = sorted(recommendations.items(), key=lambda item: item[1]['votes'], reverse=True)[:5]
-    for i, (name, data) in enumerate(top_recommendations, start=1):
-        embed.add_field(
-            name=f"{i}. {name}",
-            value=(
-                f"Release Year: {data['release_year']}\n"
-                f"Runtime: {data['runtime']}\n"
-                f"Recommended By: {data['recommended_by']}\n"
-                f"Votes: {data['votes']}\n"
-            ),
-            inline=False
-        )
-
-    # Send the embed
-    await ctx.send(embed=embed)
-
-@bot.command(name="displayqueue", aliases=['dq', 'displayq'])
-async def display_queue(ctx):
-    if not queue:
-        await ctx.send("The queue is empty.")
-        return
-
-    # Create an embed for the queue
-    embed = discord.Embed(title="Movie Queue", color=discord.Color.green())
-    sorted_queue = sorted(queue, key=lambda m: m.get('time', float('inf')))
-
-    for i, movie in enumerate(sorted_queue, start=1):
-        embed.add_field(
-            name=f"{i}. {movie['title']}",
-            value=(
-                f"Release Year: {movie['release_year']}\n"
-                f"Runtime: {movie['runtime']}\n"
-                f"Recommended By: {movie['recommended_by']}\n"
-                + (f"Scheduled At: <t:{movie['time']}:f>\n" if 'time' in movie and movie['time'] else "Movie Not Scheduled yet\n")
-            ),
-            inline=False
-        )
-
-    await ctx.send(embed=embed)
-
-@bot.command(name="displaywatchlist", aliases=['dw', 'displayw'])
-async def display_watchlist(ctx):
-    if not watchlist:
-        await ctx.send("The watchlist is empty.")
-        return
-
-    # Create an embed for the watchlist
-    embed = discord.Embed(title="Movies Watched List", color=discord.Color.purple())
-    for i, movie in enumerate(watchlist[-5:], start=1):
-        embed.add_field(
-            name=f"{i}. {movie['title']}",
-            value=(
-                f"Release Year: {movie['release_year']}\n"
-                f"Runtime: {movie['runtime']}\n"
-                f"Recommended By: {movie['recommended_by']}\n"
-            ),
-            inline=False
-        )
-
-    await ctx.send(embed=embed)
-
-## Management commands and functions
-
-@tasks.loop(seconds=60)  # Check every 60 seconds
-async def announce_scheduled_movies():
-    if not queue:
-        return  # Skip if the queue is empty
-
-    current_time = datetime.now(UTC)  # Get the current time in UTC
-    current_day_time_hour = (current_time.year, current_time.month, current_time.day, current_time.hour, current_time.minute)
-    for movie in queue[:]:  # Iterate over a copy of the queue to allow removal
-        if "time" in movie:
-            movie_time = datetime.utcfromtimestamp(movie["time"])
-            movie_day_time_hour = (movie_time.year, movie_time.month, movie_time.day, movie_time.hour, movie_time.minute)
-            # Fetch the channel where the announcements will be sent
-            guild = bot.get_guild(YOUR_GUILD_ID)  # Replace with your server's ID
-            announcement_channel = discord.utils.get(guild.text_channels, name="movie-recommendations")
-            
-            if announcement_channel and movie_day_time_hour == current_day_time_hour:
-                # Create the announcement embed
-                embed = discord.Embed(
-                    title="🎥 Now Playing 🎥",
-                    description=f"**{movie['title']}** (Released: {movie['release_year']})\n"
-                                f"Runtime: {movie['runtime']}\n"
-                                f"Recommended by: {movie['recommended_by']}",
-                    color=discord.Color.blue()
-                )
-                embed.set_image(url=movie.get("poster_url", ""))
-                await announcement_channel.send(embed=embed)
-
-            # Remove the movie from the queue after announcement
-            queue.remove(movie)
-            save_queue(queue)  # Save the updated queue
+        for section in sorted(changed_sections):
+            await update_recommendation_channel(channel, section=section)
 
 async def cycle_recommendation_channel(channel):
     sections = ["recommendations", "queue", "watchlist"]
@@ -980,94 +972,96 @@ async def cycle_recommendation_channel(channel):
         await asyncio.sleep(10)
 
 async def update_recommendation_channel(channel, section=None):
-
-    reload_lists(section)
-    async for message in channel.history(limit=10):
-        if message.author == bot.user:
-            embed = discord.Embed(color=discord.Color.green())
-
-            # Set the title based on the current section
-            if section == "recommendations":
-                embed.title = "Movie Recommendations"
-                if len(recommendations) > 0:
-                    recommendations_display = "\n".join(
-                        [f"**{name}**\nRelease year: {data['release_year']}\nRuntime: {data['runtime']}\nRecommended by: {data['recommended_by']}\nVotes: {data['votes']}\n"
-                         for name, data in sorted(recommendations.items(), key=lambda item: item[1]['votes'], reverse=True)]
-                    )
-                    embed.description = recommendations_display
-                else:
-                    embed.description = "No movies recommended yet."
-
-            elif section == "queue":
-                embed.title = "Movie Queue"
-                if queue:
-                    queue_display = "\n".join(
-                        [f"**{movie['title']}**\nRelease year: {movie['release_year']}\nRuntime: {movie['runtime']}\nRecommended by: {movie['recommended_by']}\n"
-                         f"{f'Scheduled at: <t:{movie['time']}:f>\n' if 'time' in movie and movie['time'] else ''}"
-                         for movie in sorted(queue, key=lambda m: m.get('time', float('inf')))]
-                    )
-                    embed.description = queue_display
-                else:
-                    embed.description = "The queue is empty."
-
-            elif section == "watchlist":
-                embed.title = "Movies Watched list"
-                if watchlist:
-                    if len(watchlist) > 10:
-                        watchlist_display = "\n".join(
-                            [f"**{movie['title']}**\nRelease year: {movie['release_year']}\nRuntime: {movie['runtime']}\nRecommended by: {movie['recommended_by']}\n"
-                             for movie in watchlist[-10]]
-                        )
-                    else:
-                        watchlist_display = "\n".join(
-                            [f"**{movie['title']}**\nRelease year: {movie['release_year']}\nRuntime: {movie['runtime']}\nRecommended by: {movie['recommended_by']}\n"
-                             for movie in watchlist]
-                        )
-                    embed.description = watchlist_display
-                else:
-                    embed.description = "The watchlist is empty."
-
-            # Edit the message with the updated embed
-            await message.edit(embed=embed)
-            return
-
-    # If no previous message exists, create a new embed and send it
-    embed = discord.Embed(color=discord.Color.green())
-    if section == "recommendations":
-        embed.title = "Movie Recommendations"
-        if len(recommendations) > 0:
-            recommendations_display = "\n".join(
-                [f"**{name}**\nRelease year: {data['release_year']}\nRuntime: {data['runtime']}\nRecommended by: {data['recommended_by']}\nVotes: {data['votes']}\n"
-                 for name, data in sorted(recommendations.items(), key=lambda item: item[1]['votes'], reverse=True)]
-            )
-            embed.description = recommendations_display
-        else:
-            embed.description = "No movies recommended yet."
-
-    elif section == "queue":
-        embed.title = "Movie Queue"
-        if queue:
-            queue_display = "\n".join(
-                [f"**{movie['title']}**\nRelease year: {movie['release_year']}\nRuntime: {movie['runtime']}\nRecommended by: {movie['recommended_by']}\n"
-                 f"{f'Scheduled at: <t:{movie['time']}:f>\n' if 'time' in movie and movie['time'] else ''}"
-                 for movie in sorted(queue, key=lambda m: m.get('time', float('inf')))]
-            )
-            embed.description = queue_display
-        else:
-            embed.description = "The queue is empty."
-
-    elif section == "watchlist":
-        embed.title = "Movies Watched list"
-        if watchlist:
-            watchlist_display = "\n".join(
-                [f"**{movie['title']}**\nRelease year: {movie['release_year']}\nRuntime: {movie['runtime']}\nRecommended by: {movie['recommended_by']}\n"
-                 for movie in watchlist[-10:]]
-            )
-            embed.description = watchlist_display
-        else:
-            embed.description = "The watchlist is empty."
-
-    await channel.send(embed=embed)
+    # Commands and the refresh cycle can overlap; one refresh at a time keeps
+    # them from both sending a new part for the same section
+    async with board_lock:
+        with tracing.span("board.refresh", section=section):
+            await refresh_board_message(channel, section)
+
+async def find_board_messages(channel):
+    """Map each section to its board messages in part order, scanning the channel once."""
+    if channel.id in board_messages:
+        return board_messages[channel.id]
+
+    found = {}
+    async for message in channel.history(limit=100):
+        if message.author != bot.user or not message.embeds:
+            continue
+        match = BOARD_TITLE.match(message.embeds[0].title or "")
+        if not match or match.group(1) not in BOARD_SECTION_TITLES:
+            continue
+        section = BOARD_SECTION_TITLES[match.group(1)]
+        part = int(match.group(2) or 1)
+        found.setdefault(section, []).append((part, message))
+        board_last_embeds[message.id] = [embed.to_dict() for embed in message.embeds]
+
+    sections = {}
+    for section, parts in found.items():
+        sections[section] = [message for part, message in sorted(parts, key=lambda item: item[0])]
+    board_messages[channel.id] = sections
+    return sections
+
+async def refresh_board_message(channel, section=None):
+    # The in-memory records are authoritative (every change is saved as it
+    # happens), so the board renders them without re-reading the files.
+    # Each section owns as many messages as its entries need, and only the
+    # messages whose content changed are edited.
+    sections = await find_board_messages(channel)
+    results = {"edited": 0, "skipped": 0, "sent": 0, "deleted": 0}
+
+    for name in ([section] if section else BOARD_SECTIONS):
+        ranked, ranked_by = None, None
+        if name == "recommendations":
+            ranked = ranked_recommendations(channel.guild)
+            mode = ranking_mode(channel.guild)
+            ranked_by = ranking.MODE_DESCRIPTIONS[mode] if mode != "votes" else None
+        title, blocks, empty_text, footer = rendering.board_section(
+            name, recommendations, queue, watchlist, ranked=ranked, ranked_by=ranked_by
+        )
+        embeds = pack_blocks(title, blocks, discord.Color.green(), footer=footer, empty_text=empty_text)
+        payloads = number_parts(group_messages(embeds), title)
+        messages = sections.setdefault(name, [])
+
+        for index, payload in enumerate(payloads):
+            rendered = [embed.to_dict() for embed in payload]
+            if index < len(messages):
+                message = messages[index]
+                if board_last_embeds.get(message.id) == rendered:
+                    metrics.BOARD_EDITS.labels(name, "skipped").inc()
+                    results["skipped"] += 1
+                    continue
+                try:
+                    await message.edit(embeds=payload)
+                    board_last_embeds[message.id] = rendered
+                    metrics.BOARD_EDITS.labels(name, "sent").inc()
+                    results["edited"] += 1
+                    continue
+                except discord.NotFound:
+                    # Deleted by hand; send a replacement in its place below
+                    board_last_embeds.pop(message.id, None)
+
+            message = await channel.send(embeds=payload)
+            board_last_embeds[message.id] = rendered
+            if index < len(messages):
+                messages[index] = message
+            else:
+                messages.append(message)
+            metrics.BOARD_EDITS.labels(name, "sent").inc()
+            results["sent"] += 1
+
+        # The section shrank: drop the messages it no longer needs
+        for message in messages[len(payloads):]:
+            board_last_embeds.pop(message.id, None)
+            try:
+                await message.delete()
+            except discord.NotFound:
+                pass
+            results["deleted"] += 1
+        del messages[len(payloads):]
+
+    for result, count in results.items():
+        if count:
+            tracing.set_attribute(result, count)
 
 # async def update_recommendation_channel(channel, section=None):
 #     # Fetch the latest message sent by the bot
@@ -1158,6 +1152,39 @@ async def update_recommendation_channel(channel, section=None):
 
 #     await channel.send(embed=embed)
 
+def command_code_names():
+    """Map the code of every command and background loop to its name, for stall attribution."""
+    names = {command.callback.__code__: command.qualified_name for command in bot.walk_commands()}
+    names[announce_scheduled_movies.coro.__code__] = "announce_scheduled_movies"
+    names[revalidate_metadata.coro.__code__] = "revalidate_metadata"
+    names[cycle_recommendation_channel.__code__] = "cycle_recommendation_channel"
+    return names
+
+@bot.command(name="stalls")
+@has_recommend_admin()
+async def show_stalls(ctx):
+    """Show the code that blocked the event loop, worst first."""
+    if not await check_channel(ctx):
+        return
+
+    if loop_watchdog is None:
+        await ctx.send("The stall watchdog is off. Set `stall_threshold_ms` in keys.yaml to enable it.")
+        return
+
+    offenders = loop_watchdog.top_offenders()
+    if not offenders:
+        await ctx.send(f"No event loop stalls over {STALL_THRESHOLD_MS} ms so far.")
+        return
+
+    lines = [f"{'Command':<24} {'Count':>5} {'Worst':>9}  Location"]
+    for record in offenders:
+        lines.append(f"{record.command:<24} {record.count:>5} {record.worst * 1000:>7.0f}ms  {record.location}")
+    worst = offenders[0]
+    await ctx.send(
+        "```\n" + "\n".join(lines) + "\n```"
+        + f"\nWorst stack (`{worst.command}`):\n```\n{worst.stack[-1500:]}\n```"
+    )
+
 @bot.command(name="shutdown", aliases=['exit', 'close', 'end', 'quit'])
 @has_recommend_admin()
 async def shutdown(ctx):
@@ -1171,103 +1198,138 @@ async def shutdown(ctx):
     await ctx.send("<:grass:1327507600379613194> Bidoof has been released to the wild (offline)")
     await bot.close()
 
-@bot.command(name='manual_admin', aliases=['ha', 'commands_admin'])
+@bot.command(name="reload", aliases=['rl'])
 @has_recommend_admin()
-async def get_manual(ctx):
-
+async def reload_commands(ctx, *, extension: str = ""):
+    """Reload one command extension (e.g. `display`), or all of them, without reconnecting."""
     if not await check_channel(ctx):
         return
 
-    manual_string = """
-```
-ADMIN ONLY COMMANDS
--------------------------
-Timezone Commands
--------------------------
-country_code_timezones | cctz <Country Code>   -> Get timezone for country code
-country_name_timezones | cntz <Country Name>   -> Get timezone for country by name
-settime | time <Timezone>                      -> Set Timezone of recommend bot admin
-addtime | at "<Movie Name>" "DD-MM-YYYY HH:MM" -> Schedule a movie
-
--------------------------
-Recommendation Commands
--------------------------
-delete | del <Movie Name>                     -> Remove movie from recommendation
-clearrec                                      -> Clear Recommendations
-
--------------------------
-Queue Commands
--------------------------
-queue | q <Movie Name>                        -> Move movie to Queue
-announce | am                                 -> Announce movie to watch
-deleteq | delq <Movie Name>                   -> Remove movie from Queue
-clearq                                        -> Clear Queue
-
--------------------------
-Watched List Commands
--------------------------
-watched | w <Movie Name>                      -> Move movie Watched List
-deletew | delw <Movie Name>                   -> Remove movie from Watched List
-clearw                                        -> Clear Watched list
-
--------------------------
-Maintenance Commands
--------------------------
-shutdown | exit | quit | close                -> Shutdown bot
-manual_admin | commands_admin | ha            -> Get admin manual
-manual | commands | h                         -> Get manual
-```
-    """
-
-    # Try sending the message to the user's DM
-    await ctx.send(manual_string)
-
-@bot.command(name='manual', aliases=['h', 'commands'])
-async def get_manual(ctx):
-
-    if not await check_channel(ctx):
+    names = [f"cogs.{extension}"] if extension else list(COMMAND_EXTENSIONS)
+    unknown = [name for name in names if name not in COMMAND_EXTENSIONS]
+    if unknown:
+        available = ", ".join(name.removeprefix("cogs.") for name in COMMAND_EXTENSIONS)
+        await ctx.send(f"Unknown extension `{extension}`. Available: {available}")
         return
 
-    manual_string = """
-```
--------------------------
-Recommendation Commands
--------------------------
-recommend | r <Movie Name>        -> Recommend a movie for Movie Night
-vote <Movie Name>                 -> Vote for a movie in the recommendation list
-delete | del <Movie Name>         -> Remove movie from recommendation
-
--------------------------
-Display Commands
--------------------------
-displayrec | dr | display         -> Display Top 5 Recommendations
-displayqueue | dq | displayq      -> Display Queued Movies
-displaywatchlist | dw | displayw  -> Display Latest 5 Watched Movies
-next_movie | upcoming | nm        -> Display upcoming movie in queue
-
--------------------------
-Maintenance Commands
--------------------------
-manual | commands | h             -> Get manual
-manual_admin | commands_admin| ha -> Get Admin Only commands
-```
-    """
-
-    # Try sending the message to the user's DM
-    await ctx.send(manual_string)
+    reloaded, failed = [], []
+    for name in names:
+        try:
+            # discord.py keeps the old version loaded if the new one fails to import or set up
+            if name in bot.extensions:
+                await bot.reload_extension(name)
+            else:
+                await bot.load_extension(name)
+            reloaded.append(name.removeprefix("cogs."))
+        except commands.ExtensionError as e:
+            failed.append(f"{name.removeprefix('cogs.')}: {e.__cause__ or e}")
+
+    message = f"Reloaded {', '.join(reloaded)}." if reloaded else "Nothing was reloaded."
+    if failed:
+        message += "\nKept the previous version of:\n" + "\n".join(failed)
+    await ctx.send(message)
+
+def record_command(ctx):
+    """Append a command invocation to the command log so it can be replayed."""
+    args = ctx.message.content[len(ctx.prefix or "") + len(ctx.invoked_with or ""):].strip()
+    entry = {
+        "time": ctx.message.created_at.timestamp() if getattr(ctx.message, "created_at", None) else datetime.now(UTC).timestamp(),
+        "guild_id": ctx.guild.id if ctx.guild else None,
+        "channel": ctx.channel.name if hasattr(ctx.channel, "name") else None,
+        "author_id": ctx.author.id,
+        "author_name": ctx.author.name,
+        "roles": [role.name for role in getattr(ctx.author, "roles", [])],
+        "command": ctx.invoked_with,
+        "args": args
+    }
+    command_log.info(json.dumps(entry))
 
 # Check if the command comes from the correct channel
 async def check_channel(ctx):
-    if ctx.channel.name != 'movie_night':
-        await ctx.send("Please use the 'movie_night' channel to interact with the bot.")
+    with tracing.span("check.channel"):
+        allowed = guild_directory.in_channel(ctx.channel, "commands")
+    if not allowed:
+        await ctx.send(f"Please use the '{guild_directory.channel_label(ctx.guild, 'commands')}' channel to interact with the bot.")
         return False
     return True
 
 # Events
 
+@bot.check
+async def throttle_commands(ctx):
+    command_throttle.check(
+        ctx.command.qualified_name, ctx.author.id, ctx.guild.id if ctx.guild else None, ctx.message.content
+    )
+    return True
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_latency(ctx):
+    started_at = getattr(ctx, "started_at", None)
+    if started_at is not None:
+        status = "error" if ctx.command_failed else "ok"
+        metrics.COMMAND_LATENCY.labels(str(ctx.command), status).observe(time.perf_counter() - started_at)
+
+@bot.event
+async def on_command_error(ctx, error):
+    metrics.COMMAND_ERRORS.labels(str(ctx.command), type(error).__name__).inc()
+    if isinstance(error, Throttled):
+        # Duplicates are dropped quietly; answering each one would only add to the spam
+        if error.reason != "duplicate":
+            await ctx.send(f"Slow down, {ctx.author.display_name}! Try that again in {max(1, round(error.retry_after))} seconds.")
+        return
+    if isinstance(getattr(error, "original", None), (BlockingTimeout, ExecutorBusy)):
+        await ctx.send("A lookup is taking too long right now. Please try again in a moment.")
+        return
+    if isinstance(getattr(error, "original", None), UpstreamUnavailable):
+        await ctx.send("Movie lookups are unavailable right now (IMDb/OMDb is not responding). Please try again later.")
+        return
+    # Keep discord.py's default error reporting
+    await commands.Bot.on_command_error(bot, ctx, error)
+
 @bot.event
 async def on_command(ctx):
     print(f"Command detected: {ctx.command} - Triggered by: {ctx.author.name}")
+    if COMMAND_LOG_FILE:
+        record_command(ctx)
+
+# Cached admin results and role/channel IDs follow guild changes
+@bot.event
+async def on_member_update(before, after):
+    if before.roles != after.roles:
+        guild_directory.forget_member(after.guild.id, after.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    guild_directory.forget_guild(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    guild_directory.forget_guild(role.guild.id)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    guild_directory.forget_ids(after.guild.id)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    guild_directory.forget_ids(channel.guild.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    guild_directory.forget_ids(channel.guild.id)
+
+# Votes by reaction on recommendation messages (see votes.py)
+@bot.event
+async def on_raw_reaction_add(payload):
+    buffer_vote_reaction(payload)
+
+@bot.event
+async def on_raw_reaction_remove(payload):
+    buffer_vote_reaction(payload)
 
 # Explicitly define on_message to handle command processing
 @bot.event
@@ -1297,25 +1359,42 @@ async def on_message(message):
 async def on_ready():
     print(f"Logged in as {bot.user}")
 
-    channel = discord.utils.get(bot.get_all_channels(), name='movie_night')
+    if "gateway" not in startup_timings:
+        end_startup_phase("gateway")
+        report_startup_timings()
+
+    # Start the metrics endpoint once; on_ready fires again after reconnects
+    global metrics_runner
+    if METRICS_PORT and metrics_runner is None:
+        metrics_runner = await metrics.start_metrics_server(int(METRICS_PORT))
+        bot.loop.create_task(metrics.monitor_loop_lag())
+        print(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+
+    global loop_watchdog
+    if STALL_THRESHOLD_MS and loop_watchdog is None:
+        loop_watchdog = LoopWatchdog(
+            threshold=float(STALL_THRESHOLD_MS) / 1000,
+            resolve_command=frame_resolver(command_code_names),
+            # The command handlers live in the cogs package since the split into extensions
+            source_paths=[__file__, os.path.dirname(cogs.__file__)]
+        )
+        loop_watchdog.start()
+        print(f"Watching for event loop stalls over {STALL_THRESHOLD_MS} ms")
+
+    channel = first_channel("commands")
     if channel:
         await channel.send(f"<:pokeball:1327507572206600223> Bidoof  I choose you! (ready to be commanded)")
     
-    # Load recommendations, queue, and watchlist from their respective JSON files
-    global recommendations, queue, watchlist
-    recommendations = load_recommendations()
-    queue = load_queue()
-    watchlist = load_watchlist()
-
     if not announce_scheduled_movies.is_running():
         announce_scheduled_movies.start()
+    if REVALIDATION_HOURS and not revalidate_metadata.is_running():
+        revalidate_metadata.start()
     print(f"Bot is ready and monitoring scheduled movies.")
     
     # Find the "recommendation" channel
-    channel = discord.utils.get(bot.get_all_channels(), name="movie-recommendations")
+    channel = first_channel("board")
     if channel:
         bot.loop.create_task(cycle_recommendation_channel(channel))
-        bot.loop.create_task(announce_scheduled_movies())
     
     # channel = discord.utils.get(bot.get_all_channels(), name="movie-recommendations")
     # if channel:
@@ -1325,5 +1404,16 @@ async def on_ready():
     #     await update_recommendation_channel(channel)
 
 
+def report_startup_timings():
+    """Print the startup phase breakdown and export it as metrics."""
+    total = time.perf_counter() - STARTUP_BEGAN
+    phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_timings.items())
+    print(f"Ready in {total:.2f} s ({phases})")
+    for name, seconds in startup_timings.items():
+        metrics.STARTUP_PHASE.labels(name).set(seconds)
+
+end_startup_phase("definitions")
+
 # Run the bot
-bot.run(DISCORD_TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    bot.run(DISCORD_TOKEN)
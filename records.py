@@ -0,0 +1,201 @@
+# Typed movie records
+#
+# Recommendations, queue and watchlist entries all share one slotted record
+# type. Runtime and release year are parsed once, when an entry is created or
+# loaded, instead of every time a renderer formats them. The JSON files keep
+# their existing layout: recommendations are keyed by title, queue and
+# watchlist entries carry the title as a field.
+
+import re
+
+_RUNTIME = re.compile(r"(\d+)\s*min")
+_YEAR_RANGE = re.compile(r"^(\d{4})\s*[–-]\s*(\d{4})?$")
+
+def parse_runtime(value):
+    """'90 min' -> 90; anything unparseable ("N/A", None) -> None."""
+    if isinstance(value, int):
+        return value
+    match = _RUNTIME.search(value or "")
+    return int(match.group(1)) if match else None
+
+def parse_year(value):
+    """'2023' -> 2023, '2007–2010' -> (2007, 2010), '2019–' -> (2019, None), else None."""
+    if isinstance(value, (int, tuple)):
+        return value
+    value = (value or "").strip()
+    if value.isdigit():
+        return int(value)
+    match = _YEAR_RANGE.match(value)
+    if match:
+        end = match.group(2)
+        return (int(match.group(1)), int(end) if end else None)
+    return None
+
+def format_year(year):
+    if year is None:
+        return "N/A"
+    if isinstance(year, tuple):
+        start, end = year
+        return f"{start}–{end if end is not None else ''}"
+    return str(year)
+
+class Movie:
+    """One movie in the recommendations, the queue or the watchlist.
+
+    `version` goes up on every attribute assignment, so renderers can cache
+    what they produced for an entry until it changes (see rendering.py).
+    """
+
+    __slots__ = ("title", "year", "runtime_minutes", "recommended_by", "poster_url", "votes", "voters",
+                 "vote_times", "recommended_at", "time", "watched_at", "added_directly", "version", "__weakref__")
+
+    def __init__(self, title, year=None, runtime_minutes=None, recommended_by=None, poster_url=None,
+                 votes=0, voters=None, vote_times=None, recommended_at=None, time=None, watched_at=None,
+                 added_directly=False):
+        object.__setattr__(self, "version", 0)
+        self.title = title
+        self.year = year
+        self.runtime_minutes = runtime_minutes
+        self.recommended_by = recommended_by
+        self.poster_url = poster_url
+        self.votes = votes
+        self.voters = voters if voters is not None else []
+        # When each of `voters` voted (None if unknown, for votes saved before
+        # the times were recorded)
+        self.vote_times = vote_times if vote_times is not None else [None] * len(self.voters)
+        self.recommended_at = recommended_at
+        self.time = time
+        self.watched_at = watched_at
+        # Put on the watchlist by an admin without ever being recommended
+        self.added_directly = added_directly
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "version", self.version + 1)
+
+    @classmethod
+    def from_omdb(cls, movie_data, recommended_by):
+        """Build a record from an OMDb response."""
+        return cls(
+            title=movie_data.get("Title", "N/A"),
+            year=parse_year(movie_data.get("Year")),
+            runtime_minutes=parse_runtime(movie_data.get("Runtime")),
+            recommended_by=recommended_by,
+            poster_url=movie_data.get("Poster", None),
+        )
+
+    @classmethod
+    def from_dict(cls, data, title=None):
+        return cls(
+            title=title if title is not None else data.get("title", "N/A"),
+            year=parse_year(data.get("release_year")),
+            runtime_minutes=parse_runtime(data.get("runtime")),
+            recommended_by=data.get("recommended_by"),
+            poster_url=data.get("poster_url"),
+            votes=data.get("votes", 0),
+            voters=list(data.get("voters", [])),
+            vote_times=list(data["vote_times"]) if "vote_times" in data else None,
+            recommended_at=data.get("recommended_at"),
+            time=data.get("time") or None,
+            watched_at=data.get("watched_at"),
+            added_directly=data.get("added_directly", False),
+        )
+
+    def to_dict(self, include_title=True, include_votes=False):
+        data = {"title": self.title} if include_title else {}
+        data["release_year"] = self.release_year
+        data["runtime"] = self.runtime
+        data["recommended_by"] = self.recommended_by
+        data["poster_url"] = self.poster_url
+        if include_votes:
+            data["votes"] = self.votes
+            data["voters"] = list(self.voters)
+            data["vote_times"] = list(self.vote_times)
+            if self.recommended_at:
+                data["recommended_at"] = self.recommended_at
+        if self.time:
+            data["time"] = self.time
+        if self.watched_at:
+            data["watched_at"] = self.watched_at
+        if self.added_directly:
+            data["added_directly"] = True
+        return data
+
+    def add_vote(self, user_id, at):
+        """Count a vote by `user_id` cast at unix time `at`."""
+        self.voters.append(user_id)
+        self.vote_times.append(at)
+        self.votes += 1
+
+    def remove_vote(self, user_id):
+        """Take back the vote of `user_id`; returns whether there was one."""
+        if user_id not in self.voters:
+            return False
+        index = self.voters.index(user_id)
+        del self.voters[index]
+        del self.vote_times[index]
+        self.votes -= 1
+        return True
+
+    def fill_missing_times(self, now):
+        """Date an entry saved before recommendation and vote times were recorded at `now`.
+
+        Returns whether anything was missing.
+        """
+        version = self.version
+        if self.recommended_at is None:
+            self.recommended_at = now
+        if None in self.vote_times or len(self.vote_times) != len(self.voters):
+            known = self.vote_times[:len(self.voters)]
+            self.vote_times = [now if at is None else at for at in known] + [now] * (len(self.voters) - len(known))
+        return self.version != version
+
+    def is_incomplete(self):
+        """Whether any of the OMDb-derived fields is missing ("N/A" when shown)."""
+        return self.year is None or self.runtime_minutes is None or not self.poster_url or self.poster_url == "N/A"
+
+    def patch_from_omdb(self, movie_data):
+        """Update year, runtime and poster from a fresh OMDb response.
+
+        Only fields whose value actually changed are assigned (each
+        assignment bumps `version`). Returns the names of the changed fields.
+        """
+        fresh = {
+            "year": parse_year(movie_data.get("Year")),
+            "runtime_minutes": parse_runtime(movie_data.get("Runtime")),
+            "poster_url": movie_data.get("Poster") or None,
+        }
+        changed = []
+        for name, value in fresh.items():
+            # Never replace a known value with a missing one
+            if value is None or value == "N/A":
+                continue
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed.append(name)
+        return changed
+
+    @property
+    def release_year(self):
+        return format_year(self.year)
+
+    @property
+    def runtime(self):
+        return f"{self.runtime_minutes} min" if self.runtime_minutes is not None else "N/A"
+
+    def __repr__(self):
+        return f"Movie({self.title!r}, {self.release_year}, {self.runtime})"
+
+# Whole-store conversions used by the load_* and save_* helpers
+
+def recommendations_from_json(data):
+    return {title: Movie.from_dict(fields, title=title) for title, fields in data.items()}
+
+def recommendations_to_json(recommendations):
+    return {title: movie.to_dict(include_title=False, include_votes=True) for title, movie in recommendations.items()}
+
+def movies_from_json(data):
+    return [Movie.from_dict(fields) for fields in data]
+
+def movies_to_json(movies):
+    return [movie.to_dict() for movie in movies]
@@ -0,0 +1,99 @@
+# Rendering of recommendations, queue and watchlist entries
+#
+# Every view (the board sections, !dr, the !dq/!dw pages, !nm) is assembled
+# from per-entry text fragments. A fragment is rendered once per entry
+# version and cached, so after a vote only the voted movie's fragment is
+# formatted again and the rest of the section is reused as is.
+
+import weakref
+
+from embed_layout import FIELD_NAME_LIMIT, FIELD_VALUE_LIMIT, truncate
+
+BOARD_WATCHLIST_SIZE = 10
+TOP_RECOMMENDATIONS = 5
+
+class FragmentCache:
+    """Caches `render(movie)` per movie until the movie's version changes."""
+
+    def __init__(self, render):
+        self.render = render
+        self.entries = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, movie):
+        cached = self.entries.get(movie)
+        if cached is not None and cached[0] == movie.version:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        text = self.render(movie)
+        self.entries[movie] = (movie.version, text)
+        return text
+
+def _summary(movie):
+    return (
+        f"Release Year: {movie.release_year}\n"
+        f"Runtime: {movie.runtime}\n"
+        f"Recommended By: {movie.recommended_by}\n"
+    )
+
+def _recommendation(movie):
+    return _summary(movie) + f"Votes: {movie.votes}\n"
+
+def _queued(movie):
+    return _summary(movie) + (f"Scheduled At: <t:{movie.time}:f>\n" if movie.time else "Movie Not Scheduled yet\n")
+
+def _watched(movie):
+    return _summary(movie) + (f"Watched: <t:{movie.watched_at}:D>\n" if movie.watched_at else "")
+
+# Entry details without the title, as shown in embed fields
+recommendation_details = FragmentCache(_recommendation)
+queued_details = FragmentCache(_queued)
+watched_details = FragmentCache(_watched)
+
+# The same details under a bold title, as shown in the board's descriptions
+recommendation_block = FragmentCache(lambda movie: f"**{movie.title}**\n{recommendation_details(movie)}")
+queued_block = FragmentCache(lambda movie: f"**{movie.title}**\n{queued_details(movie)}")
+watched_block = FragmentCache(lambda movie: f"**{movie.title}**\n{watched_details(movie)}")
+
+def by_votes(recommendations):
+    return sorted(recommendations.values(), key=lambda movie: movie.votes, reverse=True)
+
+def by_schedule(queue):
+    return sorted(queue, key=lambda movie: movie.time or float("inf"))
+
+def field(movie, number, details):
+    """An embed field for a numbered entry, within the field limits."""
+    return {
+        "name": truncate(f"{number}. {movie.title}", FIELD_NAME_LIMIT),
+        "value": truncate(details(movie), FIELD_VALUE_LIMIT),
+        "inline": False,
+    }
+
+def top_recommendation_fields(recommendations, limit=TOP_RECOMMENDATIONS, ranked=None):
+    """Fields for the best `limit` recommendations, by votes unless `ranked` gives the order."""
+    ranked = ranked if ranked is not None else by_votes(recommendations)
+    return [field(movie, number, recommendation_details) for number, movie in enumerate(ranked[:limit], start=1)]
+
+def board_section(section, recommendations, queue, watchlist, ranked=None, ranked_by=None):
+    """Title, one text block per entry, empty text and footer for a board section.
+
+    `ranked` orders the recommendations (default: by votes) and `ranked_by`
+    names that order in the footer.
+    """
+    if section == "recommendations":
+        ranked = ranked if ranked is not None else by_votes(recommendations)
+        blocks = [recommendation_block(movie) for movie in ranked]
+        footer = f"Ranked by {ranked_by}" if ranked_by else None
+        return "Movie Recommendations", blocks, "No movies recommended yet.", footer
+
+    if section == "queue":
+        blocks = [queued_block(movie) for movie in by_schedule(queue)]
+        return "Movie Queue", blocks, "The queue is empty.", None
+
+    blocks = [watched_block(movie) for movie in watchlist[-BOARD_WATCHLIST_SIZE:]]
+    footer = None
+    if len(watchlist) > BOARD_WATCHLIST_SIZE:
+        footer = f"Latest {BOARD_WATCHLIST_SIZE} of {len(watchlist)} watched movies. Browse them all with !dw"
+    return "Movies Watched list", blocks, "The watchlist is empty.", footer
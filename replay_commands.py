@@ -0,0 +1,329 @@
+# Command-log replay load generator
+#
+# Replays a JSONL command log (written by the bot when `command_log_file` is
+# set in keys.yaml) against the real bot with a mocked Discord transport and a
+# local OMDb stand-in. Every log is replayed twice from the same starting
+# state: once strictly in order to build a reference final state, then on the
+# recorded timeline at the requested speed. The report covers throughput,
+# event-loop lag and any divergence between the two final states.
+#
+#   python replay_commands.py command_log.jsonl --speed 10
+#   python replay_commands.py --synthesize 500 burst.jsonl
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from discord.ext import commands
+
+from benchmark_commands import FakeChannel, FakeMessage, FakeRole, FakeUser, Harness, percentile
+
+STATE_FILES = ["recommendations.json", "queue.json", "watchlist.json", "timezones.json", "stats.json",
+               "vote_messages.json", "ranking.json"]
+# Entry fields holding the time a command ran, left out of state comparisons
+WALL_CLOCK_FIELDS = ("recommended_at", "vote_times", "watched_at")
+
+class ReplayContext(commands.Context):
+    """Context whose replies go to the fake channel instead of the Discord API."""
+
+    async def send(self, content=None, *, embed=None, view=None, **kwargs):
+        # Confirmation prompts are accepted straight away, like a quick admin
+        if view is not None and hasattr(view, "value"):
+            view.value = True
+            view.stop()
+        return await self.channel.send(content=content, embed=embed, view=view)
+
+class OmdbStandIn:
+    """Local replacement for the IMDb search + OMDb request.
+
+    Stands in for fetch_movie_details, which commands run on the blocking
+    executor, so the `latency` seconds are spent on a worker thread like the
+    real IMDb/OMDb calls: they hold a pool slot and delay the command, but
+    the event loop keeps serving other commands meanwhile. The metadata
+    client's cache, retries and circuit breaker are bypassed.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, movie_name):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        title = movie_name.strip().title()
+        return {
+            "Title": title,
+            "Year": str(1970 + len(title) % 50),
+            "Runtime": f"{85 + len(title) % 60} min",
+            "Poster": "N/A",
+            "Plot": "Replayed movie.",
+            "imdbID": f"tt{abs(hash(title)) % 10000000:07d}",
+            "Response": "True",
+        }
+
+class Replayer:
+    def __init__(self, harness, state_dir, latency):
+        self.harness = harness
+        self.mod = harness.mod
+        self.state_dir = state_dir
+        self.omdb = OmdbStandIn(latency)
+        self.mod.fetch_movie_details = self.omdb
+        # A sequential reference run fires every command at once, which the
+        # rate limiter would turn into rejections the timed runs do not see
+        self.mod.command_throttle.enabled = False
+        self.members = {}
+
+    async def reset_state(self):
+        # Writes still queued from the previous run would overwrite the fresh copies
+        await self.mod.blocking_executor.flush()
+        for name in STATE_FILES:
+            target = os.path.join(self.harness.workdir, name)
+            source = os.path.join(self.state_dir, name) if self.state_dir else None
+            if source and os.path.exists(source):
+                shutil.copy(source, target)
+            elif os.path.exists(target):
+                os.remove(target)
+        self.mod.reload_lists()
+        for channel in self.harness.guild.text_channels:
+            channel.messages.clear()
+        self.mod.board_messages.clear()
+        self.mod.board_last_embeds.clear()
+
+    def snapshot(self):
+        # Round-trip through JSON so later mutations cannot leak into it
+        state = json.loads(json.dumps({
+            "recommendations": self.mod.recommendations_to_json(self.mod.recommendations),
+            "queue": self.mod.movies_to_json(self.mod.queue),
+            "watchlist": self.mod.movies_to_json(self.mod.watchlist),
+            "timezones": self.mod.load_timezones(),
+        }))
+        # When a command ran differs between the reference and the timed runs
+        entries = list(state["recommendations"].values()) + state["queue"] + state["watchlist"]
+        for entry in entries:
+            for name in WALL_CLOCK_FIELDS:
+                entry.pop(name, None)
+        return state
+
+    def member(self, record):
+        author_id = record["author_id"]
+        if author_id not in self.members:
+            guild = self.harness.guild
+            roles = []
+            for name in record.get("roles", []):
+                role = next((r for r in guild.roles if r.name == name), None)
+                if role is None:
+                    role = FakeRole(name, len(guild.roles) + 10)
+                    guild.roles.append(role)
+                roles.append(role)
+            self.members[author_id] = FakeUser(author_id, record.get("author_name", str(author_id)), roles)
+        return self.members[author_id]
+
+    def channel(self, name):
+        guild = self.harness.guild
+        channel = next((c for c in guild.text_channels if c.name == name), None)
+        if channel is None:
+            channel = FakeChannel(len(guild.text_channels) + 100, name, guild, self.mod.bot.user)
+            guild.text_channels.append(channel)
+        return channel
+
+    async def dispatch(self, record):
+        bot = self.mod.bot
+        content = f"{bot.command_prefix}{record['command']} {record.get('args', '')}".strip()
+        message = FakeMessage(self.member(record), content=content, channel=self.channel(record.get("channel")))
+        message._state = bot._connection
+        ctx = await bot.get_context(message, cls=ReplayContext)
+        started = time.perf_counter()
+        await bot.invoke(ctx)
+        return time.perf_counter() - started, ctx.command is not None and not ctx.command_failed
+
+    async def run_sequential(self, records):
+        for record in records:
+            await self.dispatch(record)
+
+    async def run_timed(self, records, speed):
+        loop = asyncio.get_running_loop()
+        lags = []
+        latencies = []
+        failures = 0
+        done = asyncio.Event()
+
+        async def monitor(interval=0.05):
+            # How late the loop wakes us up is the lag every other task sees
+            while not done.is_set():
+                expected = loop.time() + interval
+                await asyncio.sleep(interval)
+                lags.append(max(0.0, loop.time() - expected))
+
+        async def fire(record):
+            nonlocal failures
+            elapsed, ok = await self.dispatch(record)
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+
+        monitor_task = asyncio.create_task(monitor())
+        start_wall = time.perf_counter()
+        first = records[0]["time"] if records else 0
+        tasks = []
+        for record in records:
+            delay = (record["time"] - first) / speed - (time.perf_counter() - start_wall)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(record)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start_wall
+        done.set()
+        await monitor_task
+
+        return {
+            "commands": len(records),
+            "failed": failures,
+            "wall_seconds": wall,
+            "throughput_per_second": len(records) / wall if wall else None,
+            "command_latency_ms": {
+                "p50": (percentile(latencies, 50) or 0) * 1000,
+                "p99": (percentile(latencies, 99) or 0) * 1000,
+                "max": max(latencies, default=0) * 1000,
+            },
+            "loop_lag_ms": {
+                "p50": (percentile(lags, 50) or 0) * 1000,
+                "p99": (percentile(lags, 99) or 0) * 1000,
+                "max": max(lags, default=0) * 1000,
+            },
+        }
+
+def diff_state(reference, actual):
+    """Describe how the replayed final state differs from the reference."""
+    divergence = {}
+    for store in reference:
+        expected, got = reference[store], actual[store]
+        if expected == got:
+            continue
+        if isinstance(expected, dict):
+            missing = sorted(set(expected) - set(got))
+            extra = sorted(set(got) - set(expected))
+            changed = sorted(k for k in set(expected) & set(got) if expected[k] != got[k])
+        else:
+            expected_titles = [m.get("title") for m in expected]
+            got_titles = [m.get("title") for m in got]
+            missing = [t for t in expected_titles if t not in got_titles]
+            extra = [t for t in got_titles if t not in expected_titles]
+            changed = [
+                m.get("title") for m in got
+                if m.get("title") in expected_titles and m not in expected
+            ]
+        divergence[store] = {"missing": missing, "extra": extra, "changed": changed}
+        if not isinstance(expected, dict) and expected_titles != got_titles \
+                and sorted(expected_titles, key=str) == sorted(got_titles, key=str):
+            # Same entries in a different order, which the lists above cannot show
+            divergence[store]["order"] = got_titles
+    return divergence
+
+def synthesize(count, path, seed=0):
+    """Write a synthetic movie-night burst: recommendations, votes and queueing."""
+    rng = random.Random(seed)
+    members = [(2000 + i, f"member{i}", []) for i in range(30)]
+    admin = (1, "admin", ["recommend-admin"])
+    titles = [f"movie {i}" for i in range(max(5, count // 10))]
+    now = time.time()
+    with open(path, "w") as file:
+        for i in range(count):
+            author_id, name, roles = rng.choice(members)
+            roll = rng.random()
+            if roll < 0.25:
+                command, args = "recommend", rng.choice(titles)
+            elif roll < 0.80:
+                command, args = "vote", rng.choice(titles).title()
+            elif roll < 0.90:
+                command, args = rng.choice(["displayrec", "displayqueue", "displaywatchlist"]), ""
+            else:
+                author_id, name, roles = admin
+                command, args = "queue", rng.choice(titles).title()
+            entry = {
+                "time": now + i * rng.uniform(0.05, 2.0),
+                "guild_id": 1,
+                "channel": "movie_night",
+                "author_id": author_id,
+                "author_name": name,
+                "roles": roles,
+                "command": command,
+                "args": args,
+            }
+            file.write(json.dumps(entry) + "\n")
+
+def load_log(path):
+    with open(path, "r") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return sorted(records, key=lambda r: r["time"])
+
+async def replay(harness, records, args):
+    replayer = Replayer(harness, args.state_dir, args.omdb_latency)
+    await harness.mod.bot._async_setup_hook()
+    await harness.mod.load_command_extensions()
+
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    with quiet:
+        await replayer.reset_state()
+        await replayer.run_sequential(records)
+        reference = replayer.snapshot()
+
+        runs = []
+        for speed in args.speed:
+            await replayer.reset_state()
+            stats = await replayer.run_timed(records, speed)
+            stats["speed"] = speed
+            stats["divergence"] = diff_state(reference, replayer.snapshot())
+            runs.append(stats)
+        await harness.mod.blocking_executor.flush()
+    return {"omdb_calls": replayer.omdb.calls, "runs": runs}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded command log against the bot.")
+    parser.add_argument("log", help="JSONL command log to replay (or to write with --synthesize)")
+    parser.add_argument("--speed", type=float, nargs="+", default=[1.0],
+                        help="Replay speed multipliers, e.g. 1 10 100")
+    parser.add_argument("--state-dir", help="Directory holding the starting JSON state files")
+    parser.add_argument("--omdb-latency", type=float, default=0.05,
+                        help="Seconds each OMDb stand-in lookup blocks for")
+    parser.add_argument("--synthesize", type=int, metavar="N",
+                        help="Write a synthetic log of N commands to LOG and exit")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Keep the bot's own output")
+    args = parser.parse_args(argv)
+
+    if args.synthesize:
+        synthesize(args.synthesize, args.log)
+        return
+
+    records = load_log(args.log)
+    if args.state_dir:
+        args.state_dir = os.path.abspath(args.state_dir)
+
+    workdir = tempfile.mkdtemp(prefix="bot-replay-")
+    original_dir = os.getcwd()
+    try:
+        harness = Harness(workdir, scheduled=0)
+        report = asyncio.run(replay(harness, records, args))
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report["log"] = args.log
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Interval index over the scheduled queue
+#
+# A queued movie with a start time occupies [start, start + runtime). Schedule
+# keeps those intervals sorted by start, next to a running maximum of their end
+# times, which answers the questions the bot asks about the schedule with
+# binary searches instead of a scan of the queue:
+#
+# - conflicts(): does a screening overlap another one (O(log n) to decide, plus
+#   one step per overlapping screening to list them),
+# - due(): which screenings have started,
+# - free_slot(): the earliest gap of a given length after some time,
+# - between(): the screenings starting in a time range, in order.
+#
+# Adding or removing a screening is a list insertion (like bisect.insort) and
+# refreshes the running maximum from that position on; the queue holds a few
+# hundred movies at most, so that stays cheap.
+
+import bisect
+
+# Used for movies whose runtime OMDb did not report
+DEFAULT_RUNTIME_MINUTES = 120
+
+class Schedule:
+    def __init__(self, default_runtime=DEFAULT_RUNTIME_MINUTES):
+        self.default_runtime = default_runtime
+        self._starts = []
+        # (start, end, movie), sorted by start
+        self._entries = []
+        # _max_end[i] is the latest end among _entries[:i + 1]
+        self._max_end = []
+        # movie -> (start, end) of its entry
+        self._intervals = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def interval(self, movie, start=None):
+        """The (start, end) a movie occupies, in unix seconds, if it starts at `start` (default: its time)."""
+        start = movie.time if start is None else start
+        runtime = movie.runtime_minutes or self.default_runtime
+        return start, start + runtime * 60
+
+    def rebuild(self, queue):
+        """Index the scheduled movies of `queue`, replacing whatever was indexed."""
+        self._entries = sorted((self.interval(movie) + (movie,) for movie in queue if movie.time),
+                               key=lambda entry: entry[0])
+        self._starts = [entry[0] for entry in self._entries]
+        self._intervals = {entry[2]: entry[:2] for entry in self._entries}
+        self._max_end = []
+        self._refresh(0)
+
+    def clear(self):
+        self._starts.clear()
+        self._entries.clear()
+        self._max_end.clear()
+        self._intervals.clear()
+
+    def _refresh(self, index):
+        running = self._max_end[index - 1] if index else None
+        del self._max_end[index:]
+        for entry in self._entries[index:]:
+            running = entry[1] if running is None else max(running, entry[1])
+            self._max_end.append(running)
+
+    def add(self, movie):
+        """Index a movie at its current time (and runtime), moving it if it was already indexed."""
+        self.remove(movie)
+        if not movie.time:
+            return
+        start, end = self.interval(movie)
+        index = bisect.bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._entries.insert(index, (start, end, movie))
+        self._intervals[movie] = (start, end)
+        self._refresh(index)
+
+    def remove(self, movie):
+        """Drop a movie from the index; returns whether it was indexed."""
+        interval = self._intervals.pop(movie, None)
+        if interval is None:
+            return False
+        index = bisect.bisect_left(self._starts, interval[0])
+        while self._entries[index][2] is not movie:
+            index += 1
+        del self._starts[index]
+        del self._entries[index]
+        self._refresh(index)
+        return True
+
+    def conflicts(self, start, end, ignore=None):
+        """The (start, end, movie) entries overlapping [start, end), latest first.
+
+        `ignore` is left out, so a movie being rescheduled does not clash with
+        its own current slot.
+        """
+        # Only entries starting before `end` can overlap; of those, the walk
+        # stops as soon as no earlier entry ends after `start`
+        index = bisect.bisect_left(self._starts, end)
+        found = []
+        while index and self._max_end[index - 1] > start:
+            index -= 1
+            entry = self._entries[index]
+            if entry[1] > start and entry[2] is not ignore:
+                found.append(entry)
+        return found
+
+    def due(self, now):
+        """Movies whose screening has started by `now`, earliest first."""
+        return [entry[2] for entry in self._entries[:bisect.bisect_right(self._starts, now)]]
+
+    def free_slot(self, after, duration):
+        """The earliest start at or after `after` where `duration` seconds overlap no screening."""
+        index = bisect.bisect_left(self._starts, after)
+        candidate = after
+        if index and self._max_end[index - 1] > candidate:
+            # Something that started earlier is still running
+            candidate = self._max_end[index - 1]
+        while index < len(self._entries):
+            start, end, _ = self._entries[index]
+            if start >= candidate + duration:
+                break
+            candidate = max(candidate, end)
+            index += 1
+        return candidate
+
+    def between(self, start, end):
+        """The (start, end, movie) entries starting in [start, end), earliest first."""
+        return self._entries[bisect.bisect_left(self._starts, start):bisect.bisect_left(self._starts, end)]
@@ -0,0 +1,94 @@
+# Watch history statistics for !stats
+#
+# The aggregates are updated as entries move through the bot (recommended,
+# voted for, watched) and saved in stats.json, so `!stats` only formats
+# counters instead of walking and re-parsing the whole history. They cover
+# everything that ever passed through the bot: removing or clearing entries
+# (`!del`, `!clearrec`, `!deletew`, `!clearw`) keeps their history. Only a
+# retracted vote is taken back out, since the vote itself is undone.
+
+from collections import Counter
+from datetime import datetime, UTC
+
+class WatchStats:
+    def __init__(self):
+        self.watched = 0
+        self.runtime_total = 0
+        self.runtime_known = 0
+        # Per member: movies recommended, recommendations that were watched,
+        # and votes received on their recommendations
+        self.recommended = Counter()
+        self.accepted = Counter()
+        self.votes_received = Counter()
+        # "YYYY-MM" -> movies watched that month
+        self.by_month = Counter()
+
+    @classmethod
+    def rebuild(cls, recommendations, queue, watchlist):
+        """Seed the aggregates from the current state, for a bot that had no stats file yet."""
+        stats = cls()
+        for movie in recommendations.values():
+            stats.record_recommendation(movie)
+            stats.votes_received[movie.recommended_by] += movie.votes
+        for movie in queue:
+            stats.record_recommendation(movie)
+        for movie in watchlist:
+            if not movie.added_directly:
+                stats.record_recommendation(movie)
+            stats.record_watched(movie, from_recommendation=not movie.added_directly)
+        return stats
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.watched = data.get("watched", 0)
+        stats.runtime_total = data.get("runtime_total", 0)
+        stats.runtime_known = data.get("runtime_known", 0)
+        stats.recommended = Counter(data.get("recommended", {}))
+        stats.accepted = Counter(data.get("accepted", {}))
+        stats.votes_received = Counter(data.get("votes_received", {}))
+        stats.by_month = Counter(data.get("by_month", {}))
+        return stats
+
+    def to_dict(self):
+        return {
+            "watched": self.watched,
+            "runtime_total": self.runtime_total,
+            "runtime_known": self.runtime_known,
+            "recommended": dict(self.recommended),
+            "accepted": dict(self.accepted),
+            "votes_received": dict(self.votes_received),
+            "by_month": dict(self.by_month),
+        }
+
+    def record_recommendation(self, movie):
+        self.recommended[movie.recommended_by] += 1
+
+    def record_vote(self, movie, count=1):
+        """Count a vote for `movie`; `count=-1` takes one back out."""
+        self.votes_received[movie.recommended_by] += count
+        if self.votes_received[movie.recommended_by] <= 0:
+            del self.votes_received[movie.recommended_by]
+
+    def record_watched(self, movie, from_recommendation):
+        self.watched += 1
+        if movie.runtime_minutes is not None:
+            self.runtime_total += movie.runtime_minutes
+            self.runtime_known += 1
+        if from_recommendation:
+            self.accepted[movie.recommended_by] += 1
+        if movie.watched_at:
+            self.by_month[datetime.fromtimestamp(movie.watched_at, UTC).strftime("%Y-%m")] += 1
+
+    @property
+    def average_runtime(self):
+        return self.runtime_total / self.runtime_known if self.runtime_known else None
+
+    @property
+    def acceptance_rate(self):
+        recommended = sum(self.recommended.values())
+        return sum(self.accepted.values()) / recommended if recommended else None
+
+    def member_acceptance(self, member):
+        recommended = self.recommended[member]
+        return self.accepted[member] / recommended if recommended else None
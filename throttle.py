@@ -0,0 +1,117 @@
+# Command rate limiting
+#
+# Every command belongs to a class ("lookup" commands cost an IMDb search and
+# an OMDb call against the shared API key, "display" commands are cheap, the
+# rest are "default"). Each class has a token bucket per user and one per
+# guild; a command runs only if both buckets have a token. The same command
+# with the same arguments sent again by the same user within
+# `duplicate_window` seconds is dropped as a duplicate.
+
+import time
+
+from discord.ext import commands
+
+import metrics
+
+REJECTIONS = metrics.REGISTRY.counter(
+    "bot_throttled_commands_total", "Commands refused by the rate limiter.", ["command_class", "reason"]
+)
+
+# (tokens, seconds): a bucket holds `tokens` and refills them over `seconds`
+DEFAULT_LIMITS = {
+    "lookup": {"user": (4, 60), "guild": (30, 60)},
+    "display": {"user": (10, 30), "guild": (60, 30)},
+    "default": {"user": (20, 60), "guild": (120, 60)},
+}
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity, per, now):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self):
+        """Seconds until one token is available (after refill)."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class Throttled(commands.CheckFailure):
+    def __init__(self, command_class, reason, retry_after=0.0):
+        super().__init__(f"{command_class} commands throttled ({reason}), retry in {retry_after:.1f}s")
+        self.command_class = command_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Throttle:
+    def __init__(self, limits=None, command_classes=None, duplicate_window=5.0, clock=time.monotonic):
+        """
+        Args:
+            limits (dict): Per class, {"user": (tokens, seconds), "guild": (tokens, seconds)};
+                merged over DEFAULT_LIMITS.
+            command_classes (dict): Command name -> class; unlisted commands are "default".
+            duplicate_window (float): Seconds within which a repeated identical command is dropped.
+        """
+        self.limits = {name: dict(scopes) for name, scopes in DEFAULT_LIMITS.items()}
+        for name, scopes in (limits or {}).items():
+            self.limits.setdefault(name, {}).update({scope: tuple(limit) for scope, limit in scopes.items()})
+        self.command_classes = command_classes or {}
+        self.duplicate_window = duplicate_window
+        self.clock = clock
+        self.enabled = True
+        self.buckets = {}
+        self.recent = {}
+
+    def command_class(self, command_name):
+        return self.command_classes.get(command_name, "default")
+
+    def _prune(self, now):
+        # Full buckets behave exactly like new ones, so they can be dropped
+        for key, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.buckets[key]
+        for key, seen in list(self.recent.items()):
+            if now - seen > self.duplicate_window:
+                del self.recent[key]
+
+    def check(self, command_name, user_id, guild_id, content):
+        """Take a token for the command or raise Throttled."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        command_class = self.command_class(command_name)
+        if len(self.buckets) + len(self.recent) > 10_000:
+            self._prune(now)
+
+        signature = (user_id, " ".join(content.lower().split()))
+        seen = self.recent.get(signature)
+        if seen is not None and now - seen < self.duplicate_window:
+            REJECTIONS.labels(command_class, "duplicate").inc()
+            raise Throttled(command_class, "duplicate", self.duplicate_window - (now - seen))
+
+        limits = self.limits.get(command_class, self.limits["default"])
+        buckets = []
+        for scope, scope_id in (("user", user_id), ("guild", guild_id)):
+            if scope not in limits:
+                continue
+            key = (command_class, scope, scope_id)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(*limits[scope], now)
+            else:
+                bucket.refill(now)
+            if bucket.tokens < 1:
+                REJECTIONS.labels(command_class, scope).inc()
+                raise Throttled(command_class, scope, bucket.retry_after())
+            buckets.append(bucket)
+
+        # Only take tokens once every bucket has agreed
+        for bucket in buckets:
+            bucket.tokens -= 1
+        self.recent[signature] = now
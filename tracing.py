@@ -0,0 +1,189 @@
+# Structured per-command tracing
+#
+# Every command invocation becomes a tree of spans (checks, metadata lookup,
+# state mutation, persistence, board refresh, replies). The current span is
+# kept in a context variable, so nested `span()` blocks inside a command's
+# coroutine become its children without passing anything around. Finished
+# spans go to every configured exporter: JSON lines in a rotating local file
+# and, optionally, an OTLP/HTTP collector.
+#
+# With no exporter configured `span()` does nothing, so the instrumentation
+# can stay in place permanently.
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue as queue_module
+import threading
+import time
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_exporters = []
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+def enabled():
+    return bool(_exporters)
+
+def current_span():
+    return _current_span.get()
+
+def set_attribute(key, value):
+    """Set an attribute on the innermost open span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(key, value)
+
+@contextmanager
+def span(name, **attributes):
+    """Open a child of the current span (or a new trace) for the duration of the block."""
+    if not _exporters:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        for exporter in _exporters:
+            exporter.export(current)
+
+def add_exporter(exporter):
+    _exporters.append(exporter)
+
+class JsonLinesExporter:
+    """Write each finished span as one JSON line to a size-rotated file.
+
+    The span is only queued on the calling thread; a logging QueueListener
+    thread does the file writes and rotation, so the event loop never waits
+    on the disk. Queued lines are written out when the process exits.
+    """
+
+    def __init__(self, filename, max_bytes=5_000_000, backup_count=3):
+        self.logger = logging.getLogger(f"tracing.{filename}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        handler = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue_module.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(records))
+        self.listener = logging.handlers.QueueListener(records, handler)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def export(self, span):
+        self.logger.info(json.dumps(span.to_dict(), default=str))
+
+class OtlpHttpExporter:
+    """Batch spans and POST them to an OTLP/HTTP collector as JSON.
+
+    Spans are handed to a daemon thread so a slow collector never blocks the
+    event loop; if the buffer fills up new spans are dropped.
+    """
+
+    def __init__(self, endpoint, service_name="recommendation_bot", interval=5.0, max_buffer=10_000):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.interval = interval
+        self.buffer = queue_module.Queue(maxsize=max_buffer)
+        self.dropped = 0
+        threading.Thread(target=self._run, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span):
+        try:
+            self.buffer.put_nowait(span)
+        except queue_module.Full:
+            self.dropped += 1
+
+    def _run(self):
+        import requests
+
+        while True:
+            time.sleep(self.interval)
+            batch = []
+            while True:
+                try:
+                    batch.append(self.buffer.get_nowait())
+                except queue_module.Empty:
+                    break
+            if batch:
+                try:
+                    requests.post(self.url, json=self._payload(batch), timeout=10)
+                except requests.RequestException as e:
+                    print(f"Failed to export {len(batch)} spans to {self.url}: {e}")
+
+    @staticmethod
+    def _attribute(key, value):
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        return {"key": key, "value": typed}
+
+    def _payload(self, batch):
+        spans = []
+        for span in batch:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "recommendation_bot"}, "spans": spans}],
+            }]
+        }
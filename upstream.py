@@ -0,0 +1,230 @@
+# Resilient movie metadata lookups
+#
+# MetadataClient sits in front of the IMDb search + OMDb request:
+#
+# - Transient failures (timeouts, connection errors, 5xx/429 responses) are
+#   retried with jittered exponential backoff, within the lookup's latency
+#   budget.
+# - After `failure_threshold` failed lookups in a row the circuit breaker
+#   opens and lookups stop reaching the upstreams for `reset_after` seconds.
+#   Then a single trial lookup is let through; its outcome closes or re-opens
+#   the circuit.
+# - Successful results are cached. A result older than `fresh_for` is still
+#   returned straight away while a background refresh fetches a new one
+#   (stale-while-revalidate). While the circuit is open, or when the
+#   upstreams fail, cached results of any age are served instead of an error.
+#
+# The client is synchronous and meant to run on the blocking executor, so
+# backoff sleeps never block the event loop.
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import tracing
+
+CIRCUIT_STATE = metrics.REGISTRY.gauge(
+    "bot_upstream_circuit_state", "Metadata circuit breaker state: 0 closed, 1 half-open, 2 open."
+)
+RETRIES = metrics.REGISTRY.counter(
+    "bot_upstream_retries_total", "Metadata lookups retried after a transient failure."
+)
+CACHE_LOOKUPS = metrics.REGISTRY.counter(
+    "bot_metadata_cache_total", "Metadata lookups by cache result (fresh, stale, miss).", ["result"]
+)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half-open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class UpstreamError(Exception):
+    """A lookup failed; `retryable` says whether trying again may help."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class UpstreamUnavailable(Exception):
+    """No fresh result and nothing cached to fall back on."""
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_after=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state])
+
+    def allow(self):
+        """Whether a call may go upstream now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_after:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def retry_in(self):
+        """Seconds until a trial call is allowed, 0 if calls are allowed now."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.reset_after - (time.monotonic() - self.opened_at))
+
+def backoff_delays(attempts, base_delay, max_delay):
+    """Full-jitter exponential backoff: a random delay before each retry."""
+    for attempt in range(attempts - 1):
+        yield random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+class MetadataClient:
+    def __init__(self, lookup, background=None, budget=8.0, attempts=3, base_delay=0.5, max_delay=4.0,
+                 fresh_for=24 * 3600, max_entries=2000, failure_threshold=5, reset_after=60.0):
+        """
+        Args:
+            lookup (callable): lookup(query, timeout) -> OMDb response dict; raises UpstreamError.
+            background (callable): Schedules fn() off the caller's thread; returns False if it cannot.
+            budget (float): Seconds one lookup may spend across all its attempts.
+            attempts (int): Upstream attempts per lookup, including the first.
+            fresh_for (float): Seconds a cached result is served without refreshing it.
+        """
+        self.lookup = lookup
+        self.background = background
+        self.budget = budget
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fresh_for = fresh_for
+        self.max_entries = max_entries
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.cache = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query):
+        return " ".join(query.lower().split())
+
+    def cached(self, query):
+        """(movie_data, fetched_at) from the cache, or None."""
+        with self._lock:
+            entry = self.cache.get(self.key(query))
+            if entry is not None:
+                self.cache.move_to_end(self.key(query))
+            return entry
+
+    def _store(self, query, movie_data):
+        entry = (movie_data, time.time())
+        with self._lock:
+            keys = {self.key(query)}
+            # Also file it under the title, so lookups by stored title hit the cache
+            if movie_data.get("Title"):
+                keys.add(self.key(movie_data["Title"]))
+            for key in keys:
+                self.cache[key] = entry
+                self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def get(self, query):
+        """Movie data for `query`, from the cache or upstream.
+
+        Returns an OMDb-style dict ({"Response": "False", ...} when nothing
+        matches). Raises UpstreamUnavailable when the upstreams are failing
+        and nothing is cached.
+        """
+        entry = self.cached(query)
+        if entry is not None:
+            movie_data, fetched_at = entry
+            if time.time() - fetched_at < self.fresh_for:
+                CACHE_LOOKUPS.labels("fresh").inc()
+                tracing.set_attribute("cache", "fresh")
+                return movie_data
+            CACHE_LOOKUPS.labels("stale").inc()
+            tracing.set_attribute("cache", "stale")
+            self._refresh_later(query)
+            return movie_data
+
+        CACHE_LOOKUPS.labels("miss").inc()
+        tracing.set_attribute("cache", "miss")
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(
+                f"Movie lookups are paused after repeated failures; retrying in {self.breaker.retry_in():.0f}s"
+            )
+        try:
+            return self.fetch(query)
+        except UpstreamError as e:
+            raise UpstreamUnavailable(str(e)) from e
+
+    def fetch(self, query):
+        """Go upstream (with retries) and cache the result. The caller checks the breaker."""
+        deadline = time.monotonic() + self.budget
+        delays = backoff_delays(self.attempts, self.base_delay, self.max_delay)
+        while True:
+            try:
+                movie_data = self.lookup(query, max(0.5, deadline - time.monotonic()))
+            except UpstreamError as e:
+                delay = next(delays, None) if e.retryable else None
+                if delay is None or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    raise
+                RETRIES.inc()
+                time.sleep(delay)
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            if movie_data.get("Response") == "True":
+                self._store(query, movie_data)
+            return movie_data
+
+    def revalidate(self, query):
+        """Refresh `query` now if the circuit allows it; returns the new data or None."""
+        if not self.breaker.allow():
+            return None
+        try:
+            return self.fetch(query)
+        except UpstreamError:
+            return None
+
+    def _refresh_later(self, query):
+        key = self.key(query)
+        with self._lock:
+            if key in self._refreshing or self.background is None:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.revalidate(query)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        if not self.background(refresh):
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,53 @@
+# Voting by reaction
+#
+# Every recommendation posted by `!r` (or `!ballot`) gets its own message
+# with a VOTE_EMOJI reaction; members vote by adding the reaction and take
+# the vote back by removing it. Reaction events only land in a VoteBuffer.
+# The bot applies the buffer in batches, a few seconds after the first
+# buffered reaction, so a burst of votes costs one save of the
+# recommendations and one board refresh instead of one per vote.
+#
+# The rules are the same as for !vote (one vote per member, none for your own
+# recommendation). They are checked when the batch is applied, against the
+# recommendations as they are then, so votes cast with !vote in between and
+# recommendations removed in between are taken into account.
+
+VOTE_EMOJI = "👍"
+
+class VoteBuffer:
+    def __init__(self):
+        # (title, member id) -> (guild id, member name, added, unix time of
+        # the vote); a member's later reaction on the same movie replaces the
+        # earlier one
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, title, guild_id, user_id, user_name, at):
+        self._pending[(title, user_id)] = (guild_id, user_name, True, at)
+
+    def remove(self, title, guild_id, user_id):
+        self._pending[(title, user_id)] = (guild_id, None, False, None)
+
+    def apply(self, recommendations):
+        """Apply the buffered reactions to `recommendations` and empty the buffer.
+
+        Returns:
+            tuple: (votes, retractions), each a list of (guild id, member id,
+            movie) for the reactions that changed a vote.
+        """
+        pending, self._pending = self._pending, {}
+        votes, retractions = [], []
+        for (title, user_id), (guild_id, user_name, added, at) in pending.items():
+            movie = recommendations.get(title)
+            if movie is None:
+                continue
+            if added:
+                if user_id in movie.voters or user_name == movie.recommended_by:
+                    continue
+                movie.add_vote(user_id, at)
+                votes.append((guild_id, user_id, movie))
+            elif movie.remove_vote(user_id):
+                retractions.append((guild_id, user_id, movie))
+        return votes, retractions